@@ -0,0 +1,66 @@
+"""
+Benchmark of building a new version of a file from its previous version, against downloading the whole new version.
+The new version has some bytes inserted near its start, so every chunk after them is moved.
+
+Usage:
+  python benchmarks/bench_delta.py [size_in_mib]
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registry.File import Delta  # noqa: E402
+from registry.File.FileInfo import FileInfo, CHUNK_SIZE  # noqa: E402
+from registry.File.Manifest import ChunkHasher, Manifest  # noqa: E402
+
+
+def measure(name: str, operations: int, func):
+  """
+  Runs the function and prints the time taken per operation
+  Args:
+    name: The name of the benchmark
+    operations: The count of operations done by the function
+    func: The function to run
+  """
+  start = time.perf_counter()
+  func()
+  elapsed = time.perf_counter() - start
+  print(f"{name:<28} {operations:>8} ops  {elapsed:8.3f} s  {elapsed / operations * 1e6:8.2f} us/op")
+
+
+def main():
+  size = (int(sys.argv[1]) if len(sys.argv) > 1 else 256) * 1024 * 1024
+  previous = os.urandom(size)
+  new = previous[:1000] + b"inserted" + previous[1000:]
+
+  hasher = ChunkHasher(CHUNK_SIZE)
+  hasher.update(new)
+  hashes = hasher.hexdigests()
+  fileinfo = FileInfo(hashlib.sha512(new).hexdigest(), len(new), 0, len(hashes), "", CHUNK_SIZE)
+  with_checksums = Manifest(len(hashes), hashes, hasher.checksums())
+  without_checksums = Manifest(len(hashes), hashes)
+
+  with tempfile.TemporaryDirectory() as tmpdir:
+    basis = os.path.join(tmpdir, "basis")
+    with open(basis, "wb") as f:
+      f.write(previous)
+
+    def build(manifest: Manifest):
+      fd = os.open(os.path.join(tmpdir, "new"), os.O_RDWR | os.O_CREAT, 0o644)
+      try:
+        os.ftruncate(fd, len(new))
+        patched = Delta.patch(basis, fd, fileinfo, manifest, set())
+      finally:
+        os.close(fd)
+      print(f"  {len(patched)} of {len(hashes)} chunks built, {len(hashes) - len(patched)} left to download")
+
+    measure("rolling checksums (per MiB)", size // (1024 * 1024), lambda: build(with_checksums))
+    measure("same offsets (per MiB)", size // (1024 * 1024), lambda: build(without_checksums))
+
+
+if __name__ == "__main__":
+  main()
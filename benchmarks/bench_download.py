@@ -0,0 +1,113 @@
+"""
+Benchmark of the /download endpoint, the streaming implementation against the previous one which read the requested bytes into memory, and the chunks served from the cache.
+
+Usage:
+  python benchmarks/bench_download.py [size_in_mib]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings  # noqa: E402
+
+settings.configure(DEBUG=False, ALLOWED_HOSTS=["*"])
+
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from environments import Env  # noqa: E402
+from registry import views  # noqa: E402
+from registry.File.FileInfo import FileInfo  # noqa: E402
+from registry.File.List import FileList  # noqa: E402
+from registry.File.Cache import ChunkCache  # noqa: E402
+
+
+def previous_download(response):
+  """
+  The previous implementation of the endpoint, kept for comparison
+  """
+  filename = response.GET.get("file")
+  file_path: str = os.path.join(Env.get("DOWNLOADS"), filename)
+  file_size = os.path.getsize(file_path)
+  if (range_header := response.headers.get("Range")) is not None:
+    start, end = range_header.strip().split("=")[1].split("-")
+    start = int(start)
+    if end.isdigit():
+      end = int(end)
+    with open(file_path, "rb") as f:
+      f.seek(start)
+      if isinstance(end, int):
+        data = f.read((end - start) + 1)
+      else:
+        data = f.read()
+      final_response = HttpResponse(data, status=206)
+      final_response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+      return final_response
+  else:
+    with open(file_path, "rb") as f:
+      return HttpResponse(f.read(), status=200)
+
+
+def consume(response) -> int:
+  """
+  Reads the body of the response the way a server would
+  Returns:
+    int: The count of bytes in the body
+  """
+  total = 0
+  if response.streaming:
+    for part in response.streaming_content:
+      total += len(part)
+  else:
+    total = len(response.content)
+  response.close()
+  return total
+
+
+def measure(name: str, view, request, repeat: int):
+  """
+  Runs the view and prints the throughput and the peak memory allocated while serving
+  """
+  tracemalloc.start()
+  start = time.perf_counter()
+  total = 0
+  for _ in range(repeat):
+    total += consume(view(request))
+  elapsed = time.perf_counter() - start
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  print(f"{name:<32} {total / elapsed / 2**20:10.1f} MiB/s  peak {peak / 2**20:8.2f} MiB")
+
+
+def main():
+  size = int(sys.argv[1]) * 2**20 if len(sys.argv) > 1 else 256 * 2**20
+  factory = RequestFactory()
+
+  with tempfile.TemporaryDirectory() as tmpdir:
+    with open(os.path.join(tmpdir, "data.bin"), "wb") as f:
+      for _ in range(size // 2**20):
+        f.write(os.urandom(2**20))
+
+    filelist = FileList()
+    filelist.add("data.bin", FileInfo("hash", size, 0, -(-size // 2**22)), downloaded=True)
+    Env.set("DOWNLOADS", tmpdir)
+    Env.set("FILES", filelist)
+    Env.set("CHUNK_CACHE", ChunkCache(0))
+
+    whole = factory.get("/download", {"file": "data.bin"})
+    chunk = factory.get("/download", {"file": "data.bin"}, headers={"Range": "bytes=0-4194303"})
+
+    measure("previous, whole file", previous_download, whole, 3)
+    measure("streaming, whole file", views.download, whole, 3)
+    measure("previous, 4 MiB range", previous_download, chunk, 50)
+    measure("streaming, 4 MiB range", views.download, chunk, 50)
+
+    Env.update("CHUNK_CACHE", ChunkCache(64 * 2**20))
+    measure("cached, 4 MiB chunk", views.download, chunk, 50)
+
+
+if __name__ == "__main__":
+  main()
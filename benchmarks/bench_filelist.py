@@ -0,0 +1,70 @@
+"""
+Benchmark of recording the downloaded chunks in a large FileList, the journal against rewriting the whole list for every chunk.
+
+Usage:
+  python benchmarks/bench_filelist.py [files]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registry.File.FileInfo import FileInfo  # noqa: E402
+from registry.File.List import FileList  # noqa: E402
+
+
+def measure(name: str, operations: int, func):
+  """
+  Runs the function and prints the time taken per operation
+  Args:
+    name: The name of the benchmark
+    operations: The count of operations done by the function
+    func: The function to run
+  """
+  start = time.perf_counter()
+  func()
+  elapsed = time.perf_counter() - start
+  print(f"{name:<28} {operations:>8} ops  {elapsed:8.3f} s  {elapsed / operations * 1e6:8.2f} us/op")
+
+
+def main():
+  files = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+  chunks = 2_000
+  names = [f"file-{i}.bin" for i in range(files)]
+
+  with tempfile.TemporaryDirectory() as tmpdir:
+    def fill(filelist: FileList):
+      for name in names:
+        filelist.add(name, FileInfo("hash", 256 * 4194304, 0, 256))
+
+    previous = FileList()
+    fill(previous)
+    previous_path = os.path.join(tmpdir, "previous.bin")
+
+    def rewrite():
+      for _ in range(chunks):
+        previous.completed(random.choice(names), random.randint(1, 256))
+        previous.save(previous_path)
+
+    path = os.path.join(tmpdir, "filelist.bin")
+    journaled = FileList()
+    fill(journaled)
+    journaled.attach(path)
+
+    def journal():
+      for _ in range(chunks):
+        journaled.completed(random.choice(names), random.randint(1, 256))
+
+    def load():
+      FileList().load(path)
+
+    measure("completed + full rewrite", chunks, rewrite)
+    measure("completed (journal)", chunks, journal)
+    measure("load (snapshot + journal)", 1, load)
+
+
+if __name__ == "__main__":
+  main()
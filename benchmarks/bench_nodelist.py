@@ -0,0 +1,70 @@
+"""
+Benchmark of the NodeList with a very large membership.
+
+Usage:
+  python benchmarks/bench_nodelist.py [nodes]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registry.Node.List import NodeList  # noqa: E402
+
+
+def measure(name: str, operations: int, func):
+  """
+  Runs the function and prints the time taken per operation
+  Args:
+    name: The name of the benchmark
+    operations: The count of operations done by the function
+    func: The function to run
+  """
+  start = time.perf_counter()
+  func()
+  elapsed = time.perf_counter() - start
+  print(f"{name:<28} {operations:>8} ops  {elapsed:8.3f} s  {elapsed / operations * 1e6:8.2f} us/op")
+
+
+def main():
+  nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+  ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(nodes)]
+
+  with tempfile.TemporaryDirectory() as tmpdir:
+    path = os.path.join(tmpdir, "nodelist.bin")
+    nodelist = NodeList()
+    nodelist.attach(path)
+
+    def join():
+      for ip in ips:
+        nodelist.add(ip, 8000)
+
+    def churn():
+      for _ in range(nodes):
+        ip = random.choice(ips)
+        if not nodelist.remove(ip):
+          nodelist.add(ip, 8000)
+
+    def sample():
+      for _ in range(nodes):
+        nodelist.random_picks(4)
+
+    def weighted_sample():
+      for _ in range(nodes):
+        nodelist.weighted_picks(4)
+
+    def load():
+      NodeList().load(path)
+
+    measure("join", nodes, join)
+    measure("join/leave churn", nodes, churn)
+    measure("random_picks(4)", nodes, sample)
+    measure("weighted_picks(4)", nodes, weighted_sample)
+    measure("load (snapshot + journal)", 1, load)
+
+
+if __name__ == "__main__":
+  main()
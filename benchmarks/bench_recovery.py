@@ -0,0 +1,77 @@
+"""
+Benchmark of the recovery of the partial downloads when the node starts.
+Every file has half of its chunks written, and the last few chunks written were not recorded, like a node stopped while downloading.
+
+Usage:
+  python benchmarks/bench_recovery.py [files] [size_in_mib]
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filefetcher.Recovery import Recovery  # noqa: E402
+from registry.File.FileInfo import FileInfo  # noqa: E402
+from registry.File.List import FileList  # noqa: E402
+from registry.File.Manifest import Manifest, ManifestStore  # noqa: E402
+
+CHUNK_SIZE = 1024 * 1024
+
+# Chunks of every file which are written but not recorded
+UNRECORDED = 8
+
+
+def measure(name: str, operations: int, func):
+  """
+  Runs the function and prints the time taken per operation
+  Args:
+    name: The name of the benchmark
+    operations: The count of operations done by the function
+    func: The function to run
+  """
+  start = time.perf_counter()
+  func()
+  elapsed = time.perf_counter() - start
+  print(f"{name:<28} {operations:>8} ops  {elapsed:8.3f} s  {elapsed / operations * 1e6:8.2f} us/op")
+
+
+def main():
+  files = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+  size = (int(sys.argv[2]) if len(sys.argv) > 2 else 64) * 1024 * 1024
+  total = size // CHUNK_SIZE
+  chunk = os.urandom(CHUNK_SIZE)
+  sha1 = hashlib.sha1(chunk).hexdigest()
+
+  with tempfile.TemporaryDirectory() as downloads:
+    os.makedirs(os.path.join(downloads, "manifests"))
+    manifests = ManifestStore(os.path.join(downloads, "manifests"), downloads)
+
+    def prepare() -> FileList:
+      filelist = FileList()
+      for i in range(files):
+        filename = f"file{i}.bin"
+        filelist.add(filename, FileInfo(f"hash{i}", size, 0, total, "root", CHUNK_SIZE))
+        manifests.save(filename, Manifest(total, [sha1] * total))
+        fd = os.open(os.path.join(downloads, filename), os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+          os.ftruncate(fd, size)
+          for number in range(1, total // 2 + 1):
+            os.pwrite(fd, chunk, (number - 1) * CHUNK_SIZE)
+            if number <= total // 2 - UNRECORDED:
+              filelist.completed(filename, number)
+        finally:
+          os.close(fd)
+      return filelist
+
+    for workers in (1, Recovery(downloads).workers):
+      filelist = prepare()
+      results: list = []
+      measure(f"recovery ({workers} workers)", files, lambda: results.extend(Recovery(downloads, workers).run(filelist, manifests)))
+      print(f"  {sum(len(r.adopted) for r in results)} chunks adopted, {files * size // (1024 * 1024)} MiB in the catalog")
+
+
+if __name__ == "__main__":
+  main()
@@ -4,9 +4,10 @@ from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 from cryptography.hazmat.primitives import serialization
 from .chain import Key
 import os
-from .chain import Block, Blockchain
+from .chain import Block, Blockchain, Reconciler, Bootstrap
 from .chain.ActionData import Node
 from registry.Node.List import NodeList
+from registry.Node.Gossip import Gossip
 
 
 class BlockchainConfig(AppConfig):
@@ -50,23 +51,11 @@ class BlockchainConfig(AppConfig):
     os.makedirs(key_dir, exist_ok=True)
     key = self.loadKey(os.path.join(key_dir, "localkey.pem"))
 
-    # If IP Address is not into Environment then set localhost IP as default
-    currentNodeIP = os.getenv("MACHINE_IP", "127.0.0.1")
-
-    # If Port number is not into Environment then make 8000 as default
-    port = os.getenv("PORT", "8000")
-    if not port.isnumeric():
-      raise ValueError("PORT Environment variable can only be integers")
-
-    port = int(port)
-    if port >= 65536:
-      raise ValueError("port number can't be more than 65535")
-    if port <= 0:
-      raise ValueError("port number can't be less than 1")
+    # The address of the current node is resolved by the registry, before any background thread starts
+    currentNodeIP: str = Env.get("IPADDRESS")
+    port: int = Env.get("PORT")
 
     Env.set("KEY", key)  # Loads the Private Key
-    Env.set("IPADDRESS", currentNodeIP)
-    Env.set("PORT", port)
 
     if (pubkey := key.get_private_key_raw()) is not None:
       genesis_block = Block.Block(
@@ -84,11 +73,35 @@ class BlockchainConfig(AppConfig):
     Env.set("CHAINDATA", chain_file)
 
     chain: Blockchain.Blockchain = Env.get("CHAIN")
+
+    # Bootstrapping the new nodes in the background, continuing the ones left before a restart
+    rate = os.getenv("BOOTSTRAP_RATE", "20")
+    if not rate.isnumeric():
+      raise ValueError("BOOTSTRAP_RATE Environment variable can only be integers")
+    bootstrapper = Bootstrap.Bootstrapper(chain, os.path.join(chain_dir, "bootstrap.json"), int(rate))
+    try:
+      bootstrapper.load()
+    except FileNotFoundError:
+      pass
+    Env.set("BOOTSTRAP", bootstrapper)
+
     try:
       chain.load(chain_file)
     except FileNotFoundError:
       pass
 
+    # Receiving the new blocks spread by gossip
+    from .views import gossip_block_handler
+    gossip: Gossip = Env.get("GOSSIP")
+    gossip.register("block", gossip_block_handler)
+
+    # Repairing the blockchain in the background, the tips of the nodes are piggybacked on the gossip traffic
+    reconciler = Reconciler.Reconciler(chain, Env.get("NODES"))
+    Env.set("RECONCILER", reconciler)
+    gossip.piggyback("X-Chain-Tip", reconciler.local_tip, reconciler.observe)
+    reconciler.start()
+    bootstrapper.start()
+
     # Adding current node IP into the node list
     # nodelist: NodeList = Env.get("NODES")
     # nodelist.add(currentNodeIP, port)
@@ -1,31 +1,50 @@
 from dataclasses import dataclass
 from . import ActionData
+from registry.File.FileInfo import CHUNK_SIZE
 
 
 @dataclass(frozen=True)
 class File(ActionData):
   """
   File record refers to the actionData which only applies to the actionTypes:
-  'add_file', 'remove_file'
+  'add_file', 'remove_file', 'update_file'
   Args:
     filename: The name of the file
     filehash: The sha512 hash of the file
     filesize: The size of the file (In Bytes)
+    merkle_root: The root of the Merkle tree over the sha1 hashes of the chunks, empty for the files added before the Merkle tree
+    chunksize: The size of a chunk of the file (In Bytes), the files added before it have 4 MiB chunks
+    previous: The sha512 hash of the version which an update_file block replaces, empty for the other blocks
   """
 
   filename: str
   filehash: str
   filesize: int
+  merkle_root: str = ""
+  chunksize: int = CHUNK_SIZE
+  previous: str = ""
+
+  def __post_init__(self):
+    if self.chunksize <= 0:
+      raise ValueError("chunksize must be positive")
 
   def to_dict(self) -> dict:
     """
     Method converts the File object to Dictionary object
     """
-    return {
+    data = {
         "filename": self.filename,
         "filehash": self.filehash,
         "filesize": self.filesize,
     }
+    # Left out when empty, so that the blocks created before it keep their signature
+    if self.merkle_root:
+      data["merkle_root"] = self.merkle_root
+    if self.chunksize != CHUNK_SIZE:
+      data["chunksize"] = self.chunksize
+    if self.previous:
+      data["previous"] = self.previous
+    return data
 
   @classmethod
   def from_dict(cls, data: dict) -> "File":
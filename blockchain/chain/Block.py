@@ -2,7 +2,6 @@ import time
 import json
 import hashlib
 import base64
-from dataclasses import asdict
 from cryptography.hazmat.primitives.asymmetric.ed25519 import (
     Ed25519PrivateKey,
     Ed25519PublicKey,
@@ -56,7 +55,7 @@ class Block:
         creator_port=creator_port
     )
 
-    self.__json: str = json.dumps(asdict(self.__data))
+    self.__json: str = json.dumps(self.__data.to_dict())
     self.__signature: bytes = self.__sign(key)
     self.__hash: str = self.__generate_hash()
     self.__bytes: bytes = self._convert_to_bytes()
@@ -195,7 +194,7 @@ class Block:
     """
     instance = cls.__new__(cls)
     instance.__data = block_data
-    instance.__json = json.dumps(asdict(block_data))
+    instance.__json = json.dumps(block_data.to_dict())
     instance.__signature = signature
     instance.__hash = hashstr
     instance.__bytes = bytes_data
@@ -1,7 +1,5 @@
-import hashlib
 import re
 from typing import List
-from io import BytesIO
 from .Block import Block
 from .BlockData import BlockData
 from . import Variables, Key
@@ -14,13 +12,35 @@ from .exceptions import (
 from .ActionData import Node, File
 from registry.Node.List import NodeList
 from registry.File.List import FileList
-from registry.File.FileInfo import FileInfo
+from registry.File.FileInfo import FileInfo, chunk_count
+from registry.File.ChunkStore import ChunkStore
+from registry.File import Delta
 from environments import Env
-import httpx
+from threading import RLock
 import os
 import time
 
 
+def parse_blocks(data: bytes) -> List[Block]:
+  """
+  Deserializes the blocks from byte data, as sent by `/getBlockDatas`.
+
+  Args:
+    data: Byte stream containing one or more blocks.
+
+  Returns:
+    List[Block]: The blocks in their order.
+  """
+  blocks: List[Block] = []
+  buffer = bytearray()
+  for b in data:
+    buffer.append(b)
+    if b == Variables.EOF[0]:
+      blocks.append(Block.from_bytes(buffer))
+      buffer = bytearray()
+  return blocks
+
+
 class Blockchain:
   """
   Blockchain refers to a list of blocks which allows secure addition, validation,
@@ -35,6 +55,7 @@ class Blockchain:
       genesis_block: The first block of the blockchain.
     """
     self.__blocks: List[Block] = [genesis_block]
+    self.__lock = RLock()
 
   def add(self, block: Block, blockOperation: bool = True) -> None:
     """
@@ -53,6 +74,32 @@ class Blockchain:
       TypeError: If it doesn't get the expected type of action_data.
       ValueError: If it doesn't get the expected action_type.
     """
+    with self.__lock:
+      self.__add(block, blockOperation)
+
+  def is_signed(self, block: Block) -> bool:
+    """
+    Check if the block is signed by the node which it names as its creator, the block isn't added
+
+    Args:
+      block: The block to be checked.
+
+    Returns:
+      bool: True if the signature is valid, False if it's invalid or the public key of the creator can't be found.
+    """
+    data: BlockData = block.to_blockdata()
+    key = Key.Key()
+    try:
+      key.get_key(data.creator_ip, data.creator_port)
+    except RuntimeError:
+      return False
+    kpub = key.get_public_key_raw()
+    return kpub is not None and block.verify_signature(kpub)
+
+  def __add(self, block: Block, blockOperation: bool) -> None:
+    """
+    Adds a block to the blockchain, must be called while holding the lock of the blockchain
+    """
     data: BlockData = block.to_blockdata()
 
     if data.block_number != self.last_block_number() + 1:
@@ -95,49 +142,10 @@ class Blockchain:
       case "add_node":
         if isinstance(data.action_data, Node.Node):
           machine_ip: str = Env.get("IPADDRESS")
-          port: int = int(Env.get("PORT"))
           if machine_ip != data.action_data.nodeIP and nodelist.add(data.action_data.nodeIP, data.action_data.port):
-            # Sending the whole blockchain data to the new node
-            blocks_data = self.get_blocks_data(0)
-            try:
-              httpx.post(
-                  url=f"http://{data.action_data.nodeIP}:{data.action_data.port}/overwriteBlockchain",
-                  content=blocks_data,
-                  headers={"Content-Type": "application/octet-stream"}
-              )
-            except Exception:
-              pass
-
-            nodelist.save(Env.get("NODELIST_PATH"))
-
-            # Sending response to download files of current node
-            downloads = Env.get("DOWNLOADS")
-            for filename in filelist.getFiles():
-              file_info = filelist.get(filename)
-              if file_info.total_chunks == 1:
-                end_byte = file_info.size - 1
-              else:
-                end_byte = (4 * 1024 * 1024) - 1
-
-              with open(os.path.join(downloads, filename), "rb") as f:
-                sha1 = hashlib.sha1(f.read(end_byte + 1)).hexdigest()
-
-              try:
-                httpx.post(
-                    url=f"http://{data.action_data.nodeIP}:{data.action_data.port}/response",
-                    data={
-                        "filename": filename,
-                        "chunk": 1,
-                        "total_chunks": filelist.get(filename).total_chunks,
-                        "start_byte": 0,
-                        "end_byte": end_byte,
-                        "sha1": sha1,
-                        "ip_address": machine_ip,
-                        "port": port,
-                    },
-                )
-              except Exception:
-                pass
+            # Sending the blockchain and the files of current node to the new node in the background
+            bootstrapper = Env.get("BOOTSTRAP")
+            bootstrapper.add(data.action_data.nodeIP, data.action_data.port)
         else:
           raise TypeError("Invalid action_data")
       case "remove_node":
@@ -149,13 +157,26 @@ class Blockchain:
       case "add_file":
         if isinstance(data.action_data, File.File):
           f = data.action_data
-          total_chunks = f.filesize // (4 * 1024 * 1024)
-          if (f.filesize % (4 * 1024 * 1024)) != 0:
-            total_chunks += 1
           if not filelist.exist(f.filename):
-            filelist.add(f.filename, FileInfo(
-                f.filehash, f.filesize, int(time.time()), total_chunks
-            ))
+            fileinfo = FileInfo(
+                f.filehash, f.filesize, int(time.time()), chunk_count(f.filesize, f.chunksize), f.merkle_root, f.chunksize
+            )
+            # A file identical to a downloaded file is linked to it instead of being downloaded
+            store: ChunkStore | None = Env.get("CHUNK_STORE")
+            linked = store is not None and store.alias(filelist, Env.get("MANIFESTS"), f.filename, fileinfo)
+            filelist.add(f.filename, fileinfo, downloaded=linked)
+        else:
+          raise TypeError("Invalid action_data")
+
+      case "update_file":
+        if isinstance(data.action_data, File.File):
+          f = data.action_data
+          fileinfo = FileInfo(
+              f.filehash, f.filesize, int(time.time()), chunk_count(f.filesize, f.chunksize), f.merkle_root, f.chunksize
+          )
+          # The node which uploaded the new version holds it already
+          if not filelist.exist(f.filename) or filelist.get(f.filename).filehash != f.filehash:
+            self.__replace_file(f.filename, fileinfo)
         else:
           raise TypeError("Invalid action_data")
 
@@ -163,14 +184,41 @@ class Blockchain:
         if isinstance(data.action_data, File.File):
           f = data.action_data
 
-          if not filelist.exist(f.filename):
-            filelist.remove(f.filename)
+          if filelist.exist(f.filename):
+            self.__forget_file(f.filename)
         else:
           raise TypeError("Invalid action_data")
 
       case _:
         raise ValueError("Invalid action_type")
 
+  def __forget_file(self, filename: str):
+    """
+    Removes a file from the FileList, along with everything known about its chunks (The chunk index, the manifest, the cached chunks, the availability and the queued downloads)
+    """
+    Env.get("FILES").remove(filename)
+    if (store := Env.get("CHUNK_STORE")) is not None:
+      store.forget(filename)
+    Env.get("MANIFESTS").remove(filename)
+    Env.get("CHUNK_CACHE").invalidate(filename)
+    Env.get("AVAILABILITY").remove(filename)
+    Env.get("FILE_DOWNLOADER").forget(filename)
+
+  def __replace_file(self, filename: str, fileinfo: FileInfo):
+    """
+    Replaces a file by its new version. The bytes held of the previous version are kept as the basis of the file, from where the Fetcher builds the chunks which didn't change, so only the changed chunks are downloaded
+    """
+    filelist: FileList = Env.get("FILES")
+    store: ChunkStore | None = Env.get("CHUNK_STORE")
+    if filelist.exist(filename):
+      if filelist.getCompletedCount(filename) > 0:
+        Delta.keep_basis(Env.get("DOWNLOADS"), Env.get("BASES"), filename)
+      self.__forget_file(filename)
+
+    # A version identical to a downloaded file is linked to it instead of being downloaded
+    linked = store is not None and store.alias(filelist, Env.get("MANIFESTS"), filename, fileinfo)
+    filelist.add(filename, fileinfo, downloaded=linked)
+
   def last_block_number(self) -> int:
     """
     Returns the block number of the last block in the blockchain.
@@ -260,24 +308,20 @@ class Blockchain:
       data: Byte stream containing one or more blocks.
       start_block_num: Index to start replacing from.
     """
-    # Removing the blocks till specific index
-    for _ in range(self.last_block_number(), start_block_num - 1, -1):
-      self.__blocks.pop()
+    with self.__lock:
+      # Removing the blocks till specific index
+      for _ in range(self.last_block_number(), start_block_num - 1, -1):
+        self.__blocks.pop()
 
-    buffer = bytearray()
-    for b in data:
-      buffer.append(b)
-      if b == Variables.EOF[0]:
-        blk = Block.from_bytes(buffer)
+      for blk in parse_blocks(data):
         if self.size() == 0:
           self.add_genesis(blk)
         else:
           # Check if the action_type is related to files, if yes then perform file operations like delete file or download file
-          if blk.to_blockdata().action_type in ("add_file", "remove_file"):
+          if blk.to_blockdata().action_type in Variables.FileMethods:
             self.add(blk)
           else:
             self.add(blk, blockOperation=False)
-        buffer = bytearray()
 
   def get_block_hash(self, position: int) -> str:
     """
@@ -0,0 +1,234 @@
+from dataclasses import dataclass, asdict
+from threading import Thread, Condition
+import json
+import logging
+import os
+import time
+import httpx
+from .Blockchain import Blockchain
+from registry.Node.List import NodeList
+from registry.File.List import FileList
+from registry.File.Manifest import ManifestStore
+from filefetcher import Announcer
+from environments import Env
+
+# Count of files announced to the new nodes per second
+DEFAULT_RATE = 20.0
+
+# Count of files announced to a node in a turn, before the next node gets its turn
+BATCH = 16
+
+# Delay before trying a node again which couldn't be reached, doubled on every failure (In Seconds)
+RETRY_AFTER = 5.0
+MAX_RETRY_AFTER = 300.0
+
+# A node is given up after this many failures in a row
+MAX_ATTEMPTS = 8
+
+
+@dataclass
+class JoinJob:
+  """
+  Class refers to the bootstrap of a node which joined the network
+  Args:
+    ip_address: The IP Address of the node
+    port: The port number of the node
+    chain_sent: If the blockchain is sent to the node
+    last_file: The last file announced to the node, the files are announced in the order of their names
+    attempts: The count of failures in a row
+    retry_at: The time after which the node is tried again (Unix Time)
+  """
+
+  ip_address: str
+  port: int
+  chain_sent: bool = False
+  last_file: str = ""
+  attempts: int = 0
+  retry_at: float = 0.0
+
+
+class Bootstrapper:
+  """
+  Class bootstraps the nodes which joined the network in the background, so applying an `add_node` block doesn't wait for it. A new node gets the blockchain first, and then the first chunk of every file held by the current node is announced to it. The files are announced at a bounded rate, and the nodes take turns. The progress is saved, so the bootstrap continues after a restart.
+  """
+
+  def __init__(self, chain: Blockchain, filepath: str, rate: float = DEFAULT_RATE):
+    """
+    Args:
+      chain: The local blockchain
+      filepath: The path where the progress of the bootstraps is saved
+      rate: The count of files announced per second, 0 removes the limit
+    """
+    self.__chain = chain
+    self.filepath = filepath
+    self.rate = rate
+    self.__cond = Condition()
+    self.__jobs: dict[str, JoinJob] = {}
+    self.__next_at = 0.0
+    self.__job = Thread(target=self.__work, daemon=True)
+
+  def add(self, ip_address: str, port: int):
+    """
+    Adds the bootstrap of a node, a node joining again starts over
+    Args:
+      ip_address: The IP Address of the node
+      port: The port number of the node
+    """
+    with self.__cond:
+      self.__jobs[ip_address] = JoinJob(ip_address, port)
+      self.__save()
+      self.__cond.notify_all()
+
+  def pending(self) -> list[JoinJob]:
+    """
+    Get the bootstraps which are not finished yet
+    """
+    with self.__cond:
+      return [JoinJob(**asdict(job)) for job in self.__jobs.values()]
+
+  def load(self):
+    """
+    Loads the saved progress of the bootstraps
+    Raises:
+      FileNotFoundError: If nothing is saved
+    """
+    with open(self.filepath, 'r') as f:
+      jobs = [JoinJob(**job) for job in json.load(f)]
+    with self.__cond:
+      self.__jobs = {job.ip_address: job for job in jobs}
+      self.__cond.notify_all()
+
+  def __save(self):
+    """
+    Atomically saves the progress of the bootstraps, must be called while holding the condition
+    """
+    tmp_path = f"{self.filepath}.tmp"
+    with open(tmp_path, 'w') as f:
+      json.dump([asdict(job) for job in self.__jobs.values()], f, separators=(",", ":"))
+    os.replace(tmp_path, self.filepath)
+
+  def __next_job(self, now: float) -> JoinJob | None:
+    """
+    Picks the node which waited the longest among the ones due, must be called while holding the condition
+    """
+    due = [job for job in self.__jobs.values() if job.retry_at <= now]
+    return min(due, key=lambda job: job.retry_at, default=None)
+
+  def __throttle(self):
+    """
+    Waits till the next file can be announced
+    """
+    if self.rate <= 0:
+      return
+    now = time.monotonic()
+    if self.__next_at > now:
+      time.sleep(self.__next_at - now)
+    self.__next_at = max(now, self.__next_at) + 1 / self.rate
+
+  def __send_chain(self, job: JoinJob):
+    """
+    Sends the whole blockchain to the node
+    Raises:
+      Exception: If the node couldn't take the blockchain
+    """
+    nodelist: NodeList = Env.get("NODES")
+    with nodelist.track(job.ip_address):
+      response = httpx.post(
+          url=f"http://{job.ip_address}:{job.port}/overwriteBlockchain",
+          content=self.__chain.get_blocks_data(0),
+          headers={"Content-Type": "application/octet-stream"},
+          timeout=30,
+      )
+      response.raise_for_status()
+
+  def __announce_files(self, job: JoinJob) -> bool:
+    """
+    Announces the first chunk of the next files to the node
+    Returns:
+      bool: Returns True if every file is announced
+    """
+    filelist: FileList = Env.get("FILES")
+    manifests: ManifestStore = Env.get("MANIFESTS")
+    announcer: Announcer.Announcer = Env.get("ANNOUNCER")
+    files = sorted(f for f in filelist.getFiles() if f > job.last_file)
+    for filename in files[:BATCH]:
+      job.last_file = filename
+      # The first chunk is not downloaded yet
+      if not filelist.exist(filename) or not filelist.hasChunk(filename, 1):
+        continue
+      self.__throttle()
+      file_info = filelist.get(filename)
+      sha1 = manifests.chunk_hash(filename, file_info, 1)
+      announcer.announce(job.ip_address, job.port, Announcer.Announcement(filename, file_info.total_chunks, 1, sha1))
+    return len(files) <= BATCH
+
+  def step(self, now: float | None = None) -> bool:
+    """
+    Gives a turn to the node which is due next
+    Args:
+      now: The current time (Unix Time)
+    Returns:
+      bool: Returns True if a node got its turn
+    """
+    now = time.time() if now is None else now
+    with self.__cond:
+      original = self.__next_job(now)
+      if original is None:
+        return False
+      job = JoinJob(**asdict(original))
+
+    nodelist: NodeList = Env.get("NODES")
+    done = False
+    if not nodelist.exists(job.ip_address):
+      # The node left the network meanwhile
+      done = True
+    else:
+      try:
+        if not job.chain_sent:
+          self.__send_chain(job)
+          job.chain_sent = True
+        done = self.__announce_files(job)
+        job.attempts = 0
+        # Going to the back of the line, so the other nodes get their turns
+        job.retry_at = time.time()
+      except Exception as e:
+        job.attempts += 1
+        job.retry_at = time.time() + min(RETRY_AFTER * 2 ** (job.attempts - 1), MAX_RETRY_AFTER)
+        logging.warning(f"failed to bootstrap node {job.ip_address}: {e}")
+        done = job.attempts >= MAX_ATTEMPTS
+
+    with self.__cond:
+      # The node may have joined again meanwhile, then its new bootstrap is kept
+      if self.__jobs.get(job.ip_address) is original:
+        if done:
+          del self.__jobs[job.ip_address]
+        else:
+          self.__jobs[job.ip_address] = job
+        self.__save()
+    return True
+
+  def __work(self):
+    """
+    Method refers to the job which will be done by the Bootstrapper, it sleeps till a node is due
+    """
+    while True:
+      with self.__cond:
+        now = time.time()
+        if self.__next_job(now) is None:
+          wakeup = min((job.retry_at for job in self.__jobs.values()), default=None)
+          self.__cond.wait(None if wakeup is None else max(wakeup - now, 0.05))
+          continue
+      try:
+        self.step()
+      except Exception as e:
+        logging.error(f"node bootstrap failed: {e}")
+
+  def start(self):
+    """
+    Starts the background bootstrap
+    Raises:
+      ChildProcessError: If the bootstrap is already running
+    """
+    if self.__job.is_alive():
+      raise ChildProcessError("job is already started")
+    self.__job.start()
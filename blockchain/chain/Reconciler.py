@@ -0,0 +1,320 @@
+from dataclasses import dataclass
+from collections import Counter
+from threading import Thread, Event, Lock
+import logging
+import random
+import time
+import httpx
+from .Block import Block
+from .Blockchain import Blockchain, parse_blocks
+from .exceptions import InconsistentBlockchainException
+from registry.Node.List import NodeList
+from environments import Env
+
+# Seconds between two reconciliation rounds
+RECONCILE_INTERVAL = 10.0
+
+# Seconds after which the tip of a node is refreshed
+REFRESH_AFTER = 30.0
+
+# Seconds after which the tip of a node is not trusted anymore
+STALE_AFTER = 120.0
+
+# Count of nodes whose tip is refreshed in a round
+REFRESH_PER_ROUND = 3
+
+# Least count of nodes which must agree on a tip before the local blockchain is repaired from it, fewer when the network has fewer other nodes
+QUORUM = 2
+
+
+@dataclass(frozen=True)
+class PeerTip:
+  """
+  Class refers to the top of the blockchain of a remote node
+  Args:
+    number: The block number of the top block
+    hash: The hash of the top block
+    port: The port number of the node
+    updated: The time when the tip was learned (Unix Time)
+  """
+
+  number: int
+  hash: str
+  port: int
+  updated: float
+
+
+def collided_block(ip_address: str, port: int, chain: Blockchain) -> int:
+  """
+  Checks a remote node's blockchain and finds the first mismatch block index.
+
+  Args:
+    ip_address: Remote node IP.
+    port: Remote node port.
+    chain: The local blockchain.
+
+  Returns:
+    int: -1 if same, otherwise the first mismatched block index.
+
+  Raises:
+    InconsistentBlockchainException: If remote blockchain is inconsistent.
+  """
+  end_block = NodeList.get_last_block_number(ip_address, port)
+  total_blocks = NodeList.get_total_block_count(ip_address, port)
+
+  if (end_block + 1) != total_blocks:
+    raise InconsistentBlockchainException(
+        "Remote blockchain is inconsistent")
+
+  # Comparing till one block after the shorter chain, the blocks of a chain are linked so all blocks before the first mismatch are same
+  low, high = 0, min(end_block, chain.last_block_number()) + 1
+
+  # Binary Search
+  while low < high:
+    mid = (high - low) // 2 + low
+    remote_hash = NodeList.get_hash(ip_address, port, mid)
+    local_hash = chain.get_block_hash(mid)
+
+    if remote_hash == local_hash:
+      low = mid + 1
+    else:
+      high = mid
+
+  if low > end_block and low > chain.last_block_number():
+    return -1
+  return low
+
+
+class Reconciler:
+  """
+  Class keeps a table of the blockchain tips of other nodes, and repairs the local blockchain in the background when it is lagging behind or forked
+
+  Only the tips fetched from the nodes themselves (`/tip`) and the tips of the blocks signed by their creators are trusted. The tips piggybacked on the gossip traffic can't be authenticated, so they only make the node refresh the tip of the sender. The local blockchain follows the tip agreed by the most nodes (At least a quorum of them, and at least half of the known tips), so a single node signing a long fork can't rewrite the chain of the others, and the tip of the chosen node is fetched again and checked right before the local blocks are replaced.
+  """
+
+  def __init__(self, chain: Blockchain, nodelist: NodeList):
+    """
+    Args:
+      chain: The local blockchain
+      nodelist: The nodes of the network
+    """
+    self.__chain = chain
+    self.__nodelist = nodelist
+    self.__tips: dict[str, PeerTip] = {}
+    # Nodes whose piggybacked tip differs from the local tip, their tips are refreshed first
+    self.__hinted: set[str] = set()
+    self.__lock = Lock()
+    self.__wakeup = Event()
+    self.__job = Thread(target=self.__work, daemon=True)
+
+  def local_tip(self) -> str:
+    """
+    Get the tip of the local blockchain in the piggyback format
+    Returns:
+      str: The block number and the hash of the top block separated by a space
+    """
+    return f"{self.__chain.last_block_number()} {self.__chain.last_block_hash()}"
+
+  def record(self, ip_address: str, port: int, number: int, hashstr: str):
+    """
+    Record the tip of a remote node
+    Args:
+      ip_address: The IP Address of the node
+      port: The port number of the node
+      number: The block number of the top block of the node
+      hashstr: The hash of the top block of the node
+    """
+    with self.__lock:
+      self.__tips[ip_address] = PeerTip(number, hashstr, port, time.time())
+
+    # The node has blocks which the current node doesn't have
+    if number > self.__chain.last_block_number():
+      self.nudge()
+
+  def observe(self, ip_address: str, port: int, value: str):
+    """
+    Take the tip piggybacked by a remote node as a hint, the tip of the node is refreshed before it's trusted
+    Args:
+      ip_address: The IP Address of the node
+      port: The port number of the node, the port number in the node list is used instead
+      value: The tip in the piggyback format
+    Raises:
+      ValueError: If the value is not in the piggyback format
+    """
+    number, hashstr = value.split(" ")
+    if not self.__nodelist.exists(ip_address) or (int(number), hashstr) == (self.__chain.last_block_number(), self.__chain.last_block_hash()):
+      return
+    with self.__lock:
+      self.__hinted.add(ip_address)
+    self.nudge()
+
+  def tips(self) -> dict[str, PeerTip]:
+    """
+    Get the known tips of the remote nodes
+    Returns:
+      dict[str, PeerTip]: The tips by the IP Address of the nodes
+    """
+    with self.__lock:
+      return dict(self.__tips)
+
+  def nudge(self):
+    """
+    Wake up the reconciliation before the next round is due
+    """
+    self.__wakeup.set()
+
+  def refresh(self, ip_address: str, port: int):
+    """
+    Fetch the tip of a remote node
+    Args:
+      ip_address: The IP Address of the node
+      port: The port number of the node
+    Raises:
+      ValueError: If the answer is not in the piggyback format
+    """
+    with self.__lock:
+      self.__hinted.discard(ip_address)
+    with self.__nodelist.track(ip_address):
+      response = httpx.get(f"http://{ip_address}:{port}/tip", timeout=5)
+      response.raise_for_status()
+    number, hashstr = response.text.strip().split(" ")
+    self.record(ip_address, port, int(number), hashstr)
+
+  def target(self) -> tuple[str, int] | None:
+    """
+    Find the node from where the local blockchain must be repaired. The tip agreed by the most nodes among the fresh tips wins, and for tips agreed by as many nodes the longer chain wins (The current node counts for its own tip, and wins the ties). The winning tip must be agreed by a quorum of nodes and by at least half of the fresh tips.
+    Returns:
+      tuple[str, int] | None: The IP Address and the port of the node, None if the local blockchain is up to date
+    """
+    local = (self.__chain.last_block_number(), self.__chain.last_block_hash())
+    now = time.time()
+    fresh = {
+        ip: tip for ip, tip in self.tips().items()
+        if now - tip.updated < STALE_AFTER and self.__nodelist.exists(ip)
+    }
+    support = Counter((tip.number, tip.hash) for tip in fresh.values())
+    support[local] += 1
+
+    best = max(support, key=lambda t: (support[t], t[0], t == local))
+    quorum = min(QUORUM, max(self.__nodelist.size() - 1, 1))
+    if best == local or support[best] < quorum or support[best] * 2 < sum(support.values()):
+      return None
+
+    candidates = [(ip, tip.port) for ip, tip in fresh.items() if (tip.number, tip.hash) == best]
+    return random.choice(candidates)
+
+  def reconcile(self) -> bool:
+    """
+    Repair the local blockchain from the best known node. The tip of the node is fetched again first, and the blocks are checked before any local block is dropped
+    Returns:
+      bool: Returns True if the local blockchain is changed, otherwise False
+    """
+    if (node := self.target()) is None:
+      return False
+
+    ip_address, port = node
+    expected = self.tips()[ip_address]
+    try:
+      # The tip may have changed since it was learned, a stale tip must not truncate the local blockchain
+      self.refresh(ip_address, port)
+      tip = self.tips()[ip_address]
+      if (tip.number, tip.hash) != (expected.number, expected.hash):
+        self.nudge()
+        return False
+
+      with self.__nodelist.track(ip_address):
+        position_of_collision = collided_block(ip_address, port, self.__chain)
+        if position_of_collision == -1:
+          return False
+        blocks_data = NodeList.get_blocks_data(ip_address, port, position_of_collision)
+      # The node doesn't have the blocks anymore, replacing with nothing would only drop the local blocks
+      if len(blocks_data) == 0:
+        return False
+      self.__check(parse_blocks(blocks_data), position_of_collision, tip)
+      self.__chain.load_blocks_data(blocks_data, position_of_collision)
+    except Exception as e:
+      logging.warning(f"unable to reconcile blockchain with {ip_address}: {e}")
+      # Forgetting the tip, so that other node is tried next time
+      with self.__lock:
+        self.__tips.pop(ip_address, None)
+      return False
+
+    self.__chain.save(Env.get("CHAINDATA"))
+    return True
+
+  def __check(self, blocks: list[Block], position: int, tip: PeerTip):
+    """
+    Check the blocks which replace the local blocks from the position, they must be signed by their creators, follow the local blocks kept, end at the tip, and not make the local blockchain shorter
+    Raises:
+      InconsistentBlockchainException: If the blocks can't replace the local blocks
+    """
+    if not blocks or position + len(blocks) - 1 != tip.number or blocks[-1].get_hash() != tip.hash:
+      raise InconsistentBlockchainException("blocks don't end at the tip of the node")
+    if tip.number < self.__chain.last_block_number():
+      raise InconsistentBlockchainException("blocks would make the blockchain shorter")
+
+    previous = self.__chain.get_block_hash(position - 1) if position > 0 else None
+    for blk in blocks:
+      if previous is not None and blk.to_blockdata().previous_block_hash != previous:
+        raise InconsistentBlockchainException("blocks are not linked")
+      if not self.__chain.is_signed(blk):
+        raise InconsistentBlockchainException("block signature verification failed")
+      previous = blk.get_hash()
+
+  def start(self):
+    """
+    Starts the background reconciliation
+    Raises:
+      ChildProcessError: If the reconciliation is already running
+    """
+    if self.__job.is_alive():
+      raise ChildProcessError("job is already started")
+    self.__job.start()
+
+  def __refresh_stale(self):
+    """
+    Refresh the tips of few nodes, the nodes which hinted at a different tip first, and then the nodes which are not heard from recently
+    """
+    machine_ip: str = Env.get("IPADDRESS")
+    tips = self.tips()
+    now = time.time()
+    refreshed = 0
+    with self.__lock:
+      hinted = list(self.__hinted)[:REFRESH_PER_ROUND]
+    for ip in hinted:
+      if (port := self.__nodelist.get_port(ip)) is None:
+        with self.__lock:
+          self.__hinted.discard(ip)
+        continue
+      refreshed += 1
+      try:
+        self.refresh(ip, port)
+      except Exception:
+        continue
+
+    for ip, port in self.__nodelist.weighted_picks(REFRESH_PER_ROUND * 2):
+      if refreshed >= REFRESH_PER_ROUND:
+        break
+      if ip == machine_ip or (ip in tips and now - tips[ip].updated < REFRESH_AFTER):
+        continue
+      refreshed += 1
+      try:
+        self.refresh(ip, port)
+      except Exception:
+        continue
+
+  def __work(self):
+    """
+    Method refers to the reconciliation rounds
+    """
+    while True:
+      self.__wakeup.wait(RECONCILE_INTERVAL)
+      self.__wakeup.clear()
+      try:
+        self.__refresh_stale()
+        # Repairing till there is nothing left to repair
+        for _ in range(3):
+          if not self.reconcile():
+            break
+      except Exception as e:
+        logging.error(f"blockchain reconciliation failed: {e}")
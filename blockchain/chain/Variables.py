@@ -1,4 +1,4 @@
-FileMethods = set(["add_file", "remove_file"])
+FileMethods = set(["add_file", "remove_file", "update_file"])
 NodeMethods = set(["add_node", "remove_node"])
 
 START = b"\x02"
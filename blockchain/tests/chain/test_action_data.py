@@ -25,6 +25,32 @@ class FileActionDataTest(TestCase):
     new_instance = File.from_dict(self.file_data)
     self.assertEqual(new_instance, self.file_instance)
 
+  def test_merkle_root(self):
+    """Test that the Merkle root is only serialized when it's set."""
+    self.assertNotIn("merkle_root", self.file_instance.to_dict())
+    with_root = File(**self.file_data, merkle_root="ab" * 32)
+    self.assertEqual(with_root.to_dict()["merkle_root"], "ab" * 32)
+    self.assertEqual(File.from_dict(with_root.to_dict()), with_root)
+
+  def test_chunksize(self):
+    """Test that the chunk size is only serialized when it's not the default 4 MiB."""
+    self.assertEqual(self.file_instance.chunksize, 4 * 1024 * 1024)
+    self.assertNotIn("chunksize", self.file_instance.to_dict())
+    with_size = File(**self.file_data, chunksize=1024 * 1024)
+    self.assertEqual(with_size.to_dict()["chunksize"], 1024 * 1024)
+    self.assertEqual(File.from_dict(with_size.to_dict()), with_size)
+
+  def test_previous(self):
+    """Test that the previous version is only serialized for an update."""
+    self.assertNotIn("previous", self.file_instance.to_dict())
+    update = File(**self.file_data, previous="cd" * 64)
+    self.assertEqual(update.to_dict()["previous"], "cd" * 64)
+    self.assertEqual(File.from_dict(update.to_dict()), update)
+
+  def test_invalid_chunksize(self):
+    with self.assertRaises(ValueError):
+      File(**self.file_data, chunksize=0)
+
 
 class NodeActionDataTest(TestCase):
   """Tests for the Node ActionData class."""
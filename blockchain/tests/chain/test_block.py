@@ -122,6 +122,24 @@ class BlockTest(TestCase):
     self.assertIsInstance(deserialized_block.to_blockdata().action_data, File.File)
     self.assertEqual(deserialized_block.to_blockdata().action_data, self.file_action)
 
+  def test_file_action_with_merkle_root(self):
+    """Test that a block carrying a Merkle root keeps a valid signature after deserialization."""
+    file_action = File.File(
+        filename="data.zip", filehash="some_sha512_hash", filesize=2048, merkle_root="ab" * 32
+    )
+    block = Block.Block(
+        block_number=2,
+        previous_block_hash=self.block_with_node.get_hash(),
+        action_type="add_file",
+        action_data=file_action,
+        creator_ip="127.0.0.1",
+        creator_port=8000,
+        key=self.private_key,
+    )
+    deserialized_block = Block.Block.from_bytes(block.to_bytes())
+    self.assertEqual(deserialized_block.to_blockdata().action_data.merkle_root, "ab" * 32)
+    self.assertTrue(deserialized_block.verify_signature(self.public_key))
+
   def test_from_bytes_unsupported_action_type(self):
     """Test that from_bytes raises ValueError for an unsupported action type."""
     # Manually construct a byte stream with an invalid action type
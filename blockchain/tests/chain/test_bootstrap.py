@@ -0,0 +1,71 @@
+import os
+import tempfile
+from unittest.mock import patch, MagicMock
+from django.test import TestCase
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from ...chain import Block, Blockchain, Bootstrap
+from ...chain.ActionData import Node
+from registry.Node.List import NodeList
+from environments import Env
+
+
+class BootstrapperTest(TestCase):
+  """Tests for the background bootstrap of the new nodes."""
+
+  def setUp(self):
+    """Set up a blockchain with only the genesis block and a node which joined."""
+    genesis = Block.Block(
+        0, "0", "add_node", Node.Node("127.0.0.1", 8000),
+        "127.0.0.1", 8000, Ed25519PrivateKey.generate(),
+    )
+    self.chain = Blockchain.Blockchain(genesis)
+    nodelist = NodeList()
+    nodelist.add("10.0.0.1", 8001)
+    self.addCleanup(Env.update, "NODES", Env.get("NODES"))
+    Env.update("NODES", nodelist)
+
+    directory = tempfile.mkdtemp()
+    self.filepath = os.path.join(directory, "bootstrap.json")
+    self.bootstrapper = Bootstrap.Bootstrapper(self.chain, self.filepath, rate=0)
+    self.bootstrapper.add("10.0.0.1", 8001)
+
+  @patch("blockchain.chain.Bootstrap.httpx.post")
+  def test_chain_sent_once(self, post: MagicMock):
+    """Test that the blockchain is sent to the new node, and the bootstrap finishes."""
+    self.assertTrue(self.bootstrapper.step())
+    self.assertEqual(post.call_count, 1)
+    self.assertTrue(post.call_args.kwargs["url"].endswith("/overwriteBlockchain"))
+    self.assertEqual(self.bootstrapper.pending(), [])
+    self.assertFalse(self.bootstrapper.step())
+
+  @patch("blockchain.chain.Bootstrap.httpx.post")
+  def test_unreachable_node_retried(self, post: MagicMock):
+    """Test that a node which couldn't be reached is tried again after a delay."""
+    post.side_effect = ConnectionError("unreachable")
+    self.bootstrapper.step()
+    job, = self.bootstrapper.pending()
+    self.assertEqual(job.attempts, 1)
+    self.assertFalse(job.chain_sent)
+    self.assertFalse(self.bootstrapper.step(now=job.retry_at - 1))
+    self.assertTrue(self.bootstrapper.step(now=job.retry_at))
+
+  @patch("blockchain.chain.Bootstrap.httpx.post")
+  def test_given_up(self, post: MagicMock):
+    """Test that a node failing too many times is given up."""
+    post.side_effect = ConnectionError("unreachable")
+    for _ in range(Bootstrap.MAX_ATTEMPTS):
+      self.bootstrapper.step(now=float("inf"))
+    self.assertEqual(self.bootstrapper.pending(), [])
+
+  def test_removed_node_dropped(self):
+    """Test that the bootstrap of a node which left the network is dropped."""
+    Env.get("NODES").remove("10.0.0.1")
+    self.assertTrue(self.bootstrapper.step())
+    self.assertEqual(self.bootstrapper.pending(), [])
+
+  def test_progress_saved(self):
+    """Test that the bootstraps are continued after a restart."""
+    restarted = Bootstrap.Bootstrapper(self.chain, self.filepath)
+    restarted.load()
+    self.assertEqual(restarted.pending(), [Bootstrap.JoinJob("10.0.0.1", 8001)])
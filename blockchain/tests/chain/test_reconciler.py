@@ -0,0 +1,95 @@
+from unittest.mock import patch, MagicMock
+from django.test import TestCase
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from ...chain import Block, Blockchain, Reconciler
+from ...chain.ActionData import Node
+from registry.Node.List import NodeList
+
+
+class ReconcilerTest(TestCase):
+  """Tests for the peer tip table of the Reconciler class."""
+
+  def setUp(self):
+    """Set up a blockchain with only the genesis block and few nodes."""
+    genesis = Block.Block(
+        0, "0", "add_node", Node.Node("127.0.0.1", 8000),
+        "127.0.0.1", 8000, Ed25519PrivateKey.generate(),
+    )
+    self.chain = Blockchain.Blockchain(genesis)
+    self.nodelist = NodeList()
+    for i in range(3):
+      self.nodelist.add(f"10.0.0.{i}", 8000)
+    self.reconciler = Reconciler.Reconciler(self.chain, self.nodelist)
+    self.local_hash = self.chain.last_block_hash()
+
+  def test_up_to_date(self):
+    """Test that nothing is repaired when every node has the same tip."""
+    for i in range(3):
+      self.reconciler.record(f"10.0.0.{i}", 8000, 0, self.local_hash)
+    self.assertIsNone(self.reconciler.target())
+
+  def test_longer_chain_needs_quorum(self):
+    """Test that a longer chain is only followed when a quorum of nodes agrees on it."""
+    self.reconciler.record("10.0.0.1", 8001, 3, "ab" * 32)
+    self.assertIsNone(self.reconciler.target())
+
+    self.reconciler.record("10.0.0.2", 8000, 3, "ab" * 32)
+    self.assertIn(self.reconciler.target(), [("10.0.0.1", 8001), ("10.0.0.2", 8000)])
+
+  def test_single_peer(self):
+    """Test that a node with a single other node follows its longer chain."""
+    nodelist = NodeList()
+    nodelist.add("10.0.0.1", 8000)
+    nodelist.add("10.0.0.2", 8000)
+    reconciler = Reconciler.Reconciler(self.chain, nodelist)
+    reconciler.record("10.0.0.1", 8000, 3, "ab" * 32)
+    self.assertEqual(reconciler.target(), ("10.0.0.1", 8000))
+
+  def test_fork_needs_more_support(self):
+    """Test that a fork of the same length is only followed when more nodes agree on it."""
+    self.reconciler.record("10.0.0.0", 8000, 0, "cd" * 32)
+    self.assertIsNone(self.reconciler.target())
+
+    self.reconciler.record("10.0.0.1", 8000, 0, "cd" * 32)
+    self.assertIn(self.reconciler.target(), [("10.0.0.0", 8000), ("10.0.0.1", 8000)])
+
+  def test_unknown_nodes_are_ignored(self):
+    """Test that tips of nodes outside the node list are not trusted."""
+    self.reconciler.record("192.168.0.1", 8000, 5, "ef" * 32)
+    self.assertIsNone(self.reconciler.target())
+
+  def test_observe_piggyback(self):
+    """Test that a piggybacked tip is only a hint, the tip is trusted once it's fetched from the node."""
+    self.reconciler.observe("10.0.0.2", 8000, f"4 {'ab' * 32}")
+    self.assertEqual(self.reconciler.tips(), {})
+    self.assertEqual(self.reconciler.local_tip(), f"0 {self.local_hash}")
+
+    with patch("blockchain.chain.Reconciler.httpx.get") as get:
+      get.return_value.text = f"4 {'ab' * 32}\n"
+      self.reconciler.refresh("10.0.0.2", 8000)
+    tip = self.reconciler.tips()["10.0.0.2"]
+    self.assertEqual((tip.number, tip.hash, tip.port), (4, "ab" * 32, 8000))
+
+  @patch("blockchain.chain.Reconciler.collided_block")
+  @patch("blockchain.chain.Reconciler.httpx.get")
+  def test_stale_tip_not_loaded(self, get: MagicMock, collided: MagicMock):
+    """Test that the tip of the target is fetched again, and a tip which changed doesn't replace any block."""
+    for i in (1, 2):
+      self.reconciler.record(f"10.0.0.{i}", 8000, 3, "ab" * 32)
+    get.return_value.text = f"0 {self.local_hash}"
+    self.assertFalse(self.reconciler.reconcile())
+    collided.assert_not_called()
+    self.assertEqual(self.chain.size(), 1)
+
+  @patch("blockchain.chain.Reconciler.NodeList.get_blocks_data")
+  @patch("blockchain.chain.Reconciler.collided_block", return_value=1)
+  @patch("blockchain.chain.Reconciler.httpx.get")
+  def test_blocks_must_end_at_tip(self, get: MagicMock, collided: MagicMock, blocks: MagicMock):
+    """Test that blocks which don't end at the confirmed tip don't replace any block."""
+    for i in (1, 2):
+      self.reconciler.record(f"10.0.0.{i}", 8000, 3, "ab" * 32)
+    get.return_value.text = f"3 {'ab' * 32}"
+    blocks.return_value = self.chain.get_blocks_data(0)
+    self.assertFalse(self.reconciler.reconcile())
+    self.assertEqual(self.chain.size(), 1)
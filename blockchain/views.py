@@ -1,19 +1,16 @@
 from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from environments import Env
-from .chain import Blockchain, Key, Block
+from .chain import Blockchain, Key, Block, Reconciler
 from .chain.ActionData import Node
 from .chain.exceptions import (
     InvalidNextBlock,
     InconsistentTimeline,
     InconsistentHash,
     InvalidSignature,
-    InconsistentBlockchainException,
 )
 from registry.Node.List import NodeList
-import math
-import random
-import httpx
+from registry.Node.Gossip import Gossip
 import logging
 
 
@@ -26,91 +23,21 @@ def get_client_ip(request):
   return ip
 
 
-def collided_block(ip_address: str, port: int, chain: Blockchain.Blockchain) -> int:
+def receive_block(blk: Block.Block) -> JsonResponse:
   """
-  Checks a remote node's blockchain and finds the first mismatch block index.
-
+  Validates the block and adds it into the blockchain, if the block doesn't fit the local blockchain then the background reconciliation is woken up. Accepted blocks are spread to other nodes by gossip.
   Args:
-    ip_address: Remote node IP.
-    port: Remote node port.
-    chain: The local blockchain.
-
+    blk: The received Block
   Returns:
-    int: -1 if same, otherwise the first mismatched block index.
-
-  Raises:
-    InconsistentBlockchainException: If remote blockchain is inconsistent.
-  """
-  end_block = NodeList.get_last_block_number(ip_address, port)
-  total_blocks = NodeList.get_total_block_count(ip_address, port)
-
-  if (end_block + 1) < total_blocks:
-    raise InconsistentBlockchainException(
-        "Remote blockchain is inconsistent")
-
-  start = end_block - total_blocks
-  low, high = start, end_block
-
-  # Binary Search
-  while low < high:
-    mid = (high - low) // 2 + low
-    remote_hash = NodeList.get_hash(ip_address, port, mid)
-    local_hash = chain.get_block_hash(mid)
-
-    if remote_hash == local_hash:
-      low = mid + 1
-    else:
-      high = mid
-
-  remote_hash = NodeList.get_hash(ip_address, port, low)
-  local_hash = chain.get_block_hash(low)
-
-  if remote_hash == local_hash:
-    return -1
-  else:
-    return low
-
-
-def send_block(ip_address: str, port: int, blk: Block.Block):
-  """
-  Send the Blockchain block to the specific IP Address
-  Args:
-    ip_address: The IP address of the remote node
-    port: The port number of the remote node
-    blk: The Block object which refers to the Block
+    JsonResponse: The result of adding the block, status 200 if the block is accepted
   """
-  try:
-    httpx.post(
-        url=f"http://{ip_address}:{port}/addBlock",
-        headers={"Content-Type": "application/octet-stream"},
-        content=blk.to_bytes(),
-    )
-  except httpx.ReadTimeout:
-    pass
-
-
-# Create your views here.
-@csrf_exempt
-def add_block(response: HttpRequest):
-  """
-  HTTP Handler for Adding a block into blockchain
-  """
-  if response.method != "POST":
-    return JsonResponse({'status': False, 'reason': f'{response.method} method is not allowed'}, status=405)
-
-  try:
-    blk = Block.Block.from_bytes(response.body)
-  except ValueError as v:
-    return JsonResponse({'status': False, 'reason': str(v)}, status=400)
-
   # Verifying if the block is from authorized node
   nodelist: NodeList = Env.get("NODES")
   creator_ip = blk.to_blockdata().creator_ip
   machine_ip = Env.get("IPADDRESS")
   if (not nodelist.exists(creator_ip)):
     if creator_ip != machine_ip:
-      logging.critical(nodelist.random_picks(nodelist.size()))
-      logging.critical(f"blocked /addBlock response from: {get_client_ip(response)}")
+      logging.critical(f"blocked block created by: {creator_ip}")
       return JsonResponse({'status': False, 'reason': "client unauthorized"}, status=401)
 
   chain: Blockchain.Blockchain = Env.get("CHAIN")
@@ -131,60 +58,56 @@ def add_block(response: HttpRequest):
       InconsistentTimeline.InconsistentTimeline,
       InconsistentHash.InconsistentHash,
   ):
-    # Trying to sync the blockchain with other peers
-    port: int = Env.get("PORT")
-    ip_address: str = Env.get("IPADDRESS")
+    # The creator of the block has a blockchain which doesn't fit the local one
+    # The blockchain is repaired in the background, so that the request doesn't wait for the sync
+    # The tip is only recorded from a block signed by its creator, as the fields of the block are told by the sender
+    data = blk.to_blockdata()
+    reconciler: Reconciler.Reconciler = Env.get("RECONCILER")
+    if not chain.is_signed(blk):
+      return JsonResponse({'status': False, 'reason': "block signature verification failed"}, status=403)
+    reconciler.record(data.creator_ip, data.creator_port, data.block_number, blk.get_hash())
+    reconciler.nudge()
+    return JsonResponse({'status': False, 'reason': "blockchain is out of sync, reconciling in background"}, status=409)
 
-    most_common_hash_nodes = NodeList.most_matched_hash_nodes(
-        nodelist.random_picks(int(math.sqrt(nodelist.size()))),
-        chain.last_block_number()
-    )
+  chain_path: str = Env.get("CHAINDATA")
+  chain.save(chain_path)
 
-    # If the current node ip is into the most common hash nodes then stop
-    if most_common_hash_nodes.count((ip_address, port)) != 0:
-      return JsonResponse({'status': False, 'reason': "The new block is invalid"}, status=409)
-
-    # Pick a random node from the list and then copy the blockchain data
-    if len(most_common_hash_nodes) == 0:
-      return JsonResponse({'status': False, 'reason': "Unable to find Most common hash among the network"}, status=500
-                          )
-
-    for _ in range(5):
-      try:
-        choosed_node_ip, choosed_node_port = random.choice(most_common_hash_nodes)
-        position_of_collision = collided_block(
-            choosed_node_ip, choosed_node_port, chain)
-        blocks_data = NodeList.get_blocks_data(
-            choosed_node_ip, choosed_node_port, position_of_collision
-        )
-        chain.load_blocks_data(blocks_data, position_of_collision)
-        break
-      except Exception:
-        continue
-    else:
-      return JsonResponse({'status': False, 'reason':
-                           "Unable to copy blockchain data from other nodes"}, status=500
-                          )
+  # Telling other nodes about the new block
+  gossip: Gossip = Env.get("GOSSIP")
+  gossip.publish("block", blk.to_bytes(), msg_id=blk.get_hash())
 
-    # Now retrying adding the new block to the blockchain
-    try:
-      chain.add(blk)
-    except Exception:
-      return JsonResponse({'status': False, 'reason': "The new block is invalid"}, status=409)
+  return JsonResponse({'status': True, 'reason': ''}, status=200)
 
-  finally:
-    chain_path: str = Env.get("CHAINDATA")
-    chain.save(chain_path)
-    # Telling random 4 or less nodes about the new block
-    if nodelist.size() > 4:
-      nodes = nodelist.random_picks(4)
-    else:
-      nodes = nodelist.random_picks(nodelist.size())
 
-    for nodeIP, nodePort in nodes:
-      send_block(nodeIP, nodePort, blk)
+def gossip_block_handler(payload: bytes) -> bool:
+  """
+  Gossip handler of the 'block' messages
+  Args:
+    payload: The serialized block
+  Returns:
+    bool: Returns True if the block is added into the blockchain, so that it's spread further
+  """
+  return receive_block(Block.Block.from_bytes(payload)).status_code == 200
 
-    return HttpResponse({'status': True, 'reason': ''}, status=200)
+
+# Create your views here.
+@csrf_exempt
+def add_block(response: HttpRequest):
+  """
+  HTTP Handler for Adding a block into blockchain
+  """
+  if response.method != "POST":
+    return JsonResponse({'status': False, 'reason': f'{response.method} method is not allowed'}, status=405)
+
+  try:
+    blk = Block.Block.from_bytes(response.body)
+  except ValueError as v:
+    return JsonResponse({'status': False, 'reason': str(v)}, status=400)
+
+  result = receive_block(blk)
+  if result.status_code == 401:
+    logging.critical(f"blocked /addBlock response from: {get_client_ip(response)}")
+  return result
 
 
 @csrf_exempt
@@ -211,6 +134,15 @@ def get_top_block_number(response: HttpRequest):
   return HttpResponse(chain.last_block_number(), content_type="text/plain")
 
 
+@csrf_exempt
+def get_tip(response: HttpRequest):
+  """
+  HTTP Handler for getting the block number and the hash of the top block, separated by a space
+  """
+  reconciler: Reconciler.Reconciler = Env.get("RECONCILER")
+  return HttpResponse(reconciler.local_tip(), content_type="text/plain")
+
+
 @csrf_exempt
 def get_total_blocks_count(response: HttpRequest):
   """
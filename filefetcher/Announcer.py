@@ -0,0 +1,203 @@
+from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Thread, Condition
+from environments import Env
+from registry.Node import Gossip
+from . import Worker
+import hashlib
+import httpx
+import json
+import logging
+import time
+
+# Time for which the announcements are gathered before they're sent together (In Seconds)
+FLUSH_INTERVAL = 0.2
+
+# Most announcements sent in a single request
+MAX_BATCH = 4096
+
+
+@dataclass(frozen=True)
+class Announcement:
+  """
+  Class refers to a chunk which a node holds
+  Args:
+    filename: The name of the file
+    total_chunks: The total chunks of the file
+    chunk: The number of the chunk
+    sha1: The sha1 hash of the chunk
+  """
+
+  filename: str
+  total_chunks: int
+  chunk: int
+  sha1: str
+
+
+def encode(ip_address: str, port: int, announcements: list[Announcement]) -> bytes:
+  """
+  Encodes announcements of a node, the chunks are grouped by their file. The byte ranges are left out, as every node derives them from the chunk size in the add_file block.
+  The encoded json would look like this:
+  {
+    "ip_address": <ip_address_of_the_node_holding_the_chunks>,
+    "port": <port_number>,
+    "files": {
+      "example.iso": {"total_chunks": 1045, "chunks": [[1, <sha1_of_chunk_1>], [2, <sha1_of_chunk_2>]]}
+    }
+  }
+  Args:
+    ip_address: The IP Address of the node holding the chunks
+    port: The port number of the node
+    announcements: The chunks held by the node
+  Returns:
+    bytes: The encoded announcements
+  """
+  files: dict[str, dict] = {}
+  for a in announcements:
+    entry = files.setdefault(a.filename, {"total_chunks": a.total_chunks, "chunks": []})
+    entry["chunks"].append([a.chunk, a.sha1])
+  return json.dumps(
+      {"ip_address": ip_address, "port": port, "files": files}, separators=(",", ":")
+  ).encode('utf-8')
+
+
+def decode(payload: bytes) -> list[Worker.FileWorker]:
+  """
+  Decodes the announcements made by `encode()`
+  Args:
+    payload: The encoded announcements
+  Returns:
+    list[FileWorker]: The announced chunks, their byte ranges are zero and must be derived from the FileInfo of the file
+  Raises:
+    ValueError: If the payload is invalid
+  """
+  try:
+    data = json.loads(payload)
+    ip_address, port = data["ip_address"], int(data["port"])
+    return [
+        Worker.FileWorker(filename, int(chunk), int(entry["total_chunks"]), 0, 0, str(sha1), ip_address, port)
+        for filename, entry in data["files"].items()
+        for chunk, sha1 in entry["chunks"]
+    ]
+  except (KeyError, TypeError, AttributeError) as e:
+    raise ValueError(f"invalid announcements: {e}") from e
+
+
+class Announcer:
+  """
+  Class gathers the chunk announcements for a short interval, and sends them together. The announcements to a single node go in one `/announce` request, and the announcements to the whole network go in one gossip message.
+  """
+
+  def __init__(self, interval: float = FLUSH_INTERVAL):
+    """
+    Args:
+      interval: The time for which the announcements are gathered (In Seconds)
+    """
+    self.interval = interval
+    self.__cond = Condition()
+    self.__direct: dict[tuple[str, int], list[tuple[Announcement, Future]]] = {}
+    self.__broadcast: list[Announcement] = []
+    self.__pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="announcer")
+    self.__job = Thread(target=self.__work, daemon=True)
+
+  def announce(self, ip_address: str, port: int, announcement: Announcement) -> Future:
+    """
+    Tells a single node that the current node holds a chunk
+    Args:
+      ip_address: The IP Address of the node
+      port: The port number of the node
+      announcement: The chunk
+    Returns:
+      Future: Gives True if the node queued the chunk, False if the node doesn't need it, and raises if the node couldn't be reached
+    """
+    future: Future = Future()
+    with self.__cond:
+      self.__direct.setdefault((ip_address, port), []).append((announcement, future))
+      self.__cond.notify_all()
+    return future
+
+  def publish(self, announcement: Announcement):
+    """
+    Tells the whole network through gossip that the current node holds a chunk
+    Args:
+      announcement: The chunk
+    """
+    with self.__cond:
+      self.__broadcast.append(announcement)
+      self.__cond.notify_all()
+
+  def pending(self) -> int:
+    """
+    Get the count of announcements waiting to be sent
+    """
+    with self.__cond:
+      return len(self.__broadcast) + sum(len(v) for v in self.__direct.values())
+
+  def flush(self):
+    """
+    Sends all the waiting announcements now
+    """
+    with self.__cond:
+      direct, self.__direct = self.__direct, {}
+      broadcast, self.__broadcast = self.__broadcast, []
+
+    for (ip_address, port), entries in direct.items():
+      for i in range(0, len(entries), MAX_BATCH):
+        self.__pool.submit(self.__send, ip_address, port, entries[i:i + MAX_BATCH])
+    for i in range(0, len(broadcast), MAX_BATCH):
+      self.__gossip(broadcast[i:i + MAX_BATCH])
+
+  def __send(self, ip_address: str, port: int, entries: list[tuple[Announcement, Future]]):
+    """
+    Sends the announcements to a node, and resolves their futures with the answer of the node
+    """
+    try:
+      response = httpx.post(
+          url=f"http://{ip_address}:{port}/announce",
+          content=encode(Env.get("IPADDRESS"), Env.get("PORT"), [a for a, _ in entries]),
+          headers={"Content-Type": "application/json"},
+          timeout=10,
+      )
+      response.raise_for_status()
+      queued = response.json().get("queued", {})
+    except Exception as e:
+      logging.error(f"failed to announce {len(entries)} chunks to {ip_address}: {e}")
+      for _, future in entries:
+        future.set_exception(e)
+      return
+
+    for announcement, future in entries:
+      future.set_result(announcement.chunk in queued.get(announcement.filename, []))
+
+  def __gossip(self, announcements: list[Announcement]):
+    """
+    Publishes the announcements as a single gossip message
+    """
+    payload = encode(Env.get("IPADDRESS"), Env.get("PORT"), announcements)
+    gossip: Gossip.Gossip = Env.get("GOSSIP")
+    gossip.publish("chunks", payload, msg_id=hashlib.sha1(payload).hexdigest(), ttl=Gossip.CHUNK_TTL)
+
+  def __work(self):
+    """
+    Method refers to the job which will be done by the Announcer, it sleeps till an announcement arrives, and sends it along with the ones arriving within the interval
+    """
+    while True:
+      with self.__cond:
+        while not self.__direct and not self.__broadcast:
+          self.__cond.wait()
+      # Gathering the announcements arriving within the interval
+      time.sleep(self.interval)
+      try:
+        self.flush()
+      except Exception as e:
+        logging.error(f"failed to send the announcements: {e}")
+
+  def start(self):
+    """
+    Starts the operation of the Announcer
+    Raises:
+      ChildProcessError: If the Announcer is already running
+    """
+    if self.__job.is_alive():
+      raise ChildProcessError("job is already started")
+    self.__job.start()
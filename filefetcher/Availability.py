@@ -0,0 +1,216 @@
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import logging
+import time
+import httpx
+import numpy as np
+from environments import Env
+from registry.File import List as FileList
+from registry.File.Bitmap import ChunkBitmap
+from registry.Node import List as NodeList
+
+# Seconds after which the bitmap of a node is fetched again
+REFRESH_AFTER = 60.0
+
+
+@dataclass
+class PeerChunks:
+  """
+  Class keeps the chunks of a file which are available at a remote node
+  Args:
+    port: The port number of the node
+    bitmap: The chunks held by the node
+    updated: The time when the whole bitmap was last fetched from the node (Unix Time), 0 if it's only known from the announcements
+  """
+
+  port: int
+  bitmap: ChunkBitmap
+  updated: float = 0.0
+
+
+def unpack(bitmap: ChunkBitmap) -> np.ndarray:
+  """
+  Converts the bitmap into an array with one element per chunk
+  Args:
+    bitmap: The bitmap of the chunks
+  Returns:
+    np.ndarray: 1 where the chunk is available, otherwise 0
+  """
+  bits = np.frombuffer(bitmap.to_bytes(), dtype=np.uint8)
+  return np.unpackbits(bits, count=bitmap.total, bitorder="little").astype(np.int32)
+
+
+class Availability:
+  """
+  Class keeps which chunks of the files are held by which nodes, together with the count of the holders of every chunk, which is used for downloading the rarest chunks first
+  """
+
+  def __init__(self):
+    self.__lock = Lock()
+    self.__files: dict[str, dict[str, PeerChunks]] = {}
+    self.__counts: dict[str, np.ndarray] = {}
+    self.__pending: set[tuple[str, str]] = set()
+    self.__pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="availability")
+
+  def __peers_of(self, filename: str, total_chunks: int) -> dict[str, PeerChunks]:
+    """
+    Get the nodes of the file, must be called while holding the lock
+    Raises:
+      ValueError: If the total chunks doesn't match the already known total chunks of the file
+    """
+    if filename not in self.__counts:
+      self.__files[filename] = {}
+      self.__counts[filename] = np.zeros(total_chunks, dtype=np.int32)
+    elif len(self.__counts[filename]) != total_chunks:
+      raise ValueError(f"file `{filename}` has {len(self.__counts[filename])} chunks, not {total_chunks}")
+    return self.__files[filename]
+
+  def update(self, filename: str, ip_address: str, port: int, bitmap: ChunkBitmap):
+    """
+    Replace the chunks held by a node with the bitmap sent by the node
+    Args:
+      filename: The name of the file
+      ip_address: The IP Address of the node
+      port: The port number of the node
+      bitmap: The chunks held by the node
+    Raises:
+      ValueError: If the total chunks of the bitmap doesn't match the file
+    """
+    with self.__lock:
+      peers = self.__peers_of(filename, bitmap.total)
+      counts = self.__counts[filename]
+      if (old := peers.get(ip_address)) is not None:
+        counts -= unpack(old.bitmap)
+      counts += unpack(bitmap)
+      peers[ip_address] = PeerChunks(port, bitmap, time.time())
+
+  def have(self, filename: str, ip_address: str, port: int, chunk: int, total_chunks: int):
+    """
+    Record that a node holds a chunk
+    Args:
+      filename: The name of the file
+      ip_address: The IP Address of the node
+      port: The port number of the node
+      chunk: The number of the chunk
+      total_chunks: The total chunks of the file
+    Raises:
+      ValueError: If the total chunks doesn't match the file
+      IndexError: If the chunk is out of the range
+    """
+    with self.__lock:
+      peers = self.__peers_of(filename, total_chunks)
+      if (peer := peers.get(ip_address)) is None:
+        peer = peers[ip_address] = PeerChunks(port, ChunkBitmap(total_chunks))
+      peer.port = port
+      if peer.bitmap.set(chunk):
+        self.__counts[filename][chunk - 1] += 1
+
+  def forget(self, ip_address: str):
+    """
+    Remove the chunks held by a node, used when the node leaves the network
+    Args:
+      ip_address: The IP Address of the node
+    """
+    with self.__lock:
+      for filename, peers in self.__files.items():
+        if (old := peers.pop(ip_address, None)) is not None:
+          self.__counts[filename] -= unpack(old.bitmap)
+
+  def remove(self, filename: str):
+    """
+    Remove everything known about a file
+    Args:
+      filename: The name of the file
+    """
+    with self.__lock:
+      self.__files.pop(filename, None)
+      self.__counts.pop(filename, None)
+
+  def counts(self, filename: str) -> np.ndarray | None:
+    """
+    Get the count of the nodes holding every chunk of the file
+    Args:
+      filename: The name of the file
+    Returns:
+      np.ndarray | None: The counts indexed by the chunk number minus one, None if nothing is known about the file
+    """
+    with self.__lock:
+      if filename not in self.__counts:
+        return None
+      return self.__counts[filename].copy()
+
+  def holders(self, filename: str, chunk: int) -> list[tuple[str, int]]:
+    """
+    Get the nodes holding a chunk of the file
+    Args:
+      filename: The name of the file
+      chunk: The number of the chunk
+    Returns:
+      list[tuple[str, int]]: The IP Address and the port of the nodes
+    """
+    with self.__lock:
+      return [
+          (ip, peer.port) for ip, peer in self.__files.get(filename, {}).items()
+          if peer.bitmap.has(chunk)
+      ]
+
+  def refresh(self, filename: str, ip_address: str, port: int):
+    """
+    Exchange the bitmaps of the file with a remote node, the remote node learns the chunks of the current node and the current node learns the chunks of the remote node
+    Args:
+      filename: The name of the file
+      ip_address: The IP Address of the node
+      port: The port number of the node
+    Raises:
+      httpx.HTTPError: If the node can't be reached
+      ValueError: If the node sent an invalid bitmap
+    """
+    filelist: FileList.FileList = Env.get("FILES")
+    nodelist: NodeList.NodeList = Env.get("NODES")
+    fileinfo = filelist.get(filename)
+
+    with nodelist.track(ip_address):
+      response = httpx.post(
+          url=f"http://{ip_address}:{port}/have",
+          data={
+              "filename": filename,
+              "bitmap": filelist.getBitmap(filename).to_base64(),
+              "ip_address": Env.get("IPADDRESS"),
+              "port": Env.get("PORT"),
+          },
+          timeout=5,
+      )
+      response.raise_for_status()
+    data = response.json()
+    self.update(filename, ip_address, port, ChunkBitmap.from_base64(fileinfo.total_chunks, data["bitmap"]))
+
+  def request(self, filename: str, ip_address: str, port: int):
+    """
+    Exchange the bitmaps with a remote node in the background, if the bitmap of the node is not fetched recently
+    Args:
+      filename: The name of the file
+      ip_address: The IP Address of the node
+      port: The port number of the node
+    """
+    nodelist: NodeList.NodeList = Env.get("NODES")
+    if not nodelist.is_available(ip_address):
+      return
+
+    key = (filename, ip_address)
+    with self.__lock:
+      peer = self.__files.get(filename, {}).get(ip_address)
+      if key in self.__pending or (peer is not None and time.time() - peer.updated < REFRESH_AFTER):
+        return
+      self.__pending.add(key)
+
+    def job():
+      try:
+        self.refresh(filename, ip_address, port)
+      except Exception as e:
+        logging.warning(f"unable to fetch the chunks of `{filename}` from {ip_address}: {e}")
+      finally:
+        with self.__lock:
+          self.__pending.discard(key)
+
+    self.__pool.submit(job)
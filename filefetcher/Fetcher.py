@@ -1,18 +1,28 @@
-import base64
-import json
-import time
-from blockchain.chain import Variables
-from . import Worker
-from threading import Thread, Lock
+from . import Worker, Picker, Availability, Sender, Announcer, WorkQueue
+from .Session import DownloadSession
+from threading import Thread, Lock, Condition, Event
+from concurrent.futures import ThreadPoolExecutor
 import httpx
+import logging
 import os
 from environments import Env
 import hashlib
-from registry.File import List as FileList
+from registry.File import List as FileList, FileInfo, Manifest, Cache, ChunkStore, Delta, Compression
+from registry.File.Merkle import merkle_root
 from registry.Node import List as NodeList
 from datetime import datetime
 from collections import deque
-import persistqueue
+from dataclasses import replace
+import time
+
+# Count of nodes asked for their chunks when the download of a file starts
+DISCOVER_PEERS = 8
+
+# Size of the buffer used for receiving a chunk (In Bytes)
+BUFFER_SIZE = 64 * 1024
+
+# Adjacent chunks pulled from the same node are requested together, up to this many bytes (In Bytes)
+MAX_COALESCE_BYTES = 16 * 1024 * 1024
 
 
 class Fetcher:
@@ -20,117 +30,636 @@ class Fetcher:
   Class refers to the download manager which will download chunks, in multi thread environment
   """
 
-  def __init__(self):
-    self.__queue: persistqueue.FIFOSQLiteQueue = persistqueue.FIFOSQLiteQueue(
-        path=Env.get("FILE_DOWNLOADER_SAVE"), auto_commit=True, multithreading=True)
-    self.__job = Thread(target=self.__work)
+  def __init__(self, workers: int = 8, per_peer: int = 2, pull: bool = True):
+    """
+    Args:
+      workers: The count of chunks downloaded at the same time
+      per_peer: The count of chunks downloaded at the same time from a single node
+      pull: If True then the chunks of the files with a verified manifest are requested from the nodes holding them, without waiting for their announcements
+    """
+    self.__queue = WorkQueue.WorkQueue(Env.get("FILE_DOWNLOADER_SAVE"))
+    self.__job = Thread(target=self.__work, daemon=True)
+    self.__pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetcher")
+    self.__workers = workers
+    self.__per_peer = per_peer
+    self.__pull = pull
+
+    # State of the running downloads, guarded by the condition
+    self.__cond = Condition()
+    self.__running = 0
+    self.__active: dict[str, int] = {}
+    self.__inflight: set[tuple[str, int]] = set()
+    self.__deferred: deque[Worker.FileWorker] = deque()
+    self.__sessions: dict[str, DownloadSession] = {}
+    self.__file_lock = Lock()
+    # The worker thread is started, it's cleared by the thread itself when it stops
+    self.__started = False
 
-  def add_work(self, job: Worker.FileWorker):
+    # Files whose manifest matches the Merkle root of their add_file block
+    self.__verified: set[str] = set()
+    # Files being built from their previous version, the downloads of the file wait till it's done
+    self.__patching: dict[str, Event] = {}
+
+  def add_work(self, job: Worker.FileWorker, priority: int = 0):
     """
-    Adding a new job to the worker list
+    Adding a new job to the worker list, a chunk which is queued already is not added again
     Args:
       job: The FileWorker object representing the job which needs to done
+      priority: The jobs with a higher priority are started first
     """
-    self.__queue.put(job)
+    with self.__cond:
+      if self.__queue.put(job, priority):
+        self.__cond.notify_all()
 
   def get_work(self) -> Worker.FileWorker | None:
     """
-    Getting the job from the worker list
+    Getting the job from the worker list, the job stays queued till it's done
+    Returns:
+      FileWorker: If a job is ready
+    """
+    works = self.__queue.take(1)
+    return works[0] if works else None
+
+  def __is_needed(self, work: Worker.FileWorker) -> bool:
+    """
+    Check if the chunk still needs to be downloaded, must be called while holding the condition
+    """
+    filelist: FileList.FileList = Env.get("FILES")
+    if not filelist.exist(work.filename) or filelist.isDownloaded(work.filename):
+      return False
+    if filelist.hasChunk(work.filename, work.chunk):
+      return False
+    # The chunk belongs to a version of the file which is replaced
+    fileinfo = filelist.get(work.filename)
+    if work.total_chunks != fileinfo.total_chunks or fileinfo.chunk_range(work.chunk) != (work.start_byte, work.end_byte):
+      return False
+    return (work.filename, work.chunk) not in self.__inflight
+
+  def __is_held(self, work: Worker.FileWorker) -> bool:
+    """
+    Check if the chunk is held by the current node already
+    """
+    filelist: FileList.FileList = Env.get("FILES")
+    return filelist.exist(work.filename) and filelist.hasChunk(work.filename, work.chunk)
+
+  def __can_start(self, ip_address: str) -> bool:
+    """
+    Check if the node has a free download slot, must be called while holding the condition
+    """
+    nodelist: NodeList.NodeList = Env.get("NODES")
+    return (
+        self.__active.get(ip_address, 0) < self.__per_peer
+        and nodelist.is_available(ip_address)
+    )
+
+  def session(self, filename: str) -> DownloadSession | None:
+    """
+    Get the download session of a file
+    Args:
+      filename: The name of the file
+    Returns:
+      DownloadSession | None: The session, None if the file is not being downloaded
+    """
+    with self.__cond:
+      return self.__sessions.get(filename)
+
+  def forget(self, filename: str):
+    """
+    Forgets the manifest and the download session of a file, used when the file is replaced by its new version
+    Args:
+      filename: The name of the file
+    """
+    with self.__file_lock:
+      self.__verified.discard(filename)
+    with self.__cond:
+      self.__sessions.pop(filename, None)
+
+  def __session(self, work: Worker.FileWorker) -> DownloadSession:
+    """
+    Get the download session of the file of the chunk, a new session asks few nodes for the chunks they hold. Must be called while holding the condition
+    """
+    if (session := self.__sessions.get(work.filename)) is not None:
+      return session
+
+    session = self.__sessions[work.filename] = DownloadSession(work.filename, work.total_chunks)
+    nodelist: NodeList.NodeList = Env.get("NODES")
+    availability: Availability.Availability = Env.get("AVAILABILITY")
+    machine_ip: str = Env.get("IPADDRESS")
+    for ip, port in nodelist.weighted_picks(DISCOVER_PEERS):
+      if ip != machine_ip:
+        availability.request(work.filename, ip, port)
+    return session
+
+  def __assign(self, work: Worker.FileWorker) -> Worker.FileWorker | None:
+    """
+    Pick the node from where the chunk is downloaded, among all the nodes holding the chunk the fastest one with a free slot is picked, and the slow nodes are only used when no other node is free. Must be called while holding the condition
     Returns:
-      FileWorker: If the worker list is not empty
+      FileWorker | None: The chunk with the picked node, None if no node holding the chunk has a free slot
     """
-    if self.__queue.empty():
+    nodelist: NodeList.NodeList = Env.get("NODES")
+    availability: Availability.Availability = Env.get("AVAILABILITY")
+    session = self.__session(work)
+
+    sources = availability.holders(work.filename, work.chunk)
+    if (work.ip_address, work.port) not in sources:
+      sources.append((work.ip_address, work.port))
+    free = [
+        (ip, port) for ip, port in session.rank(sources)
+        if nodelist.exists(ip) and self.__can_start(ip)
+    ]
+    if not free:
       return None
 
-    return self.__queue.get()
+    fast = [source for source in free if not session.is_slow(source[0])]
+    ip_address, port = (fast or free)[0]
+    if (ip_address, port) == (work.ip_address, work.port):
+      return work
+    return replace(work, ip_address=ip_address, port=port)
 
-  def __work(self):
+  def __pull_works(self):
     """
-    Method refers to the job which will be done by the fetcher
+    Adds the missing chunks of the files with a verified manifest into the pool, from the nodes known to hold them. The downloader drives these downloads itself, so they don't wait for the announcements of the senders. Must be called while holding the condition
     """
-    while (work := self.get_work()) is not None:
-      destination_path: str = os.path.join(Env.get("DOWNLOADS"), work.filename)
-      filelist: FileList.FileList = Env.get("FILES")
+    filelist: FileList.FileList = Env.get("FILES")
+    availability: Availability.Availability = Env.get("AVAILABILITY")
+    limit = self.__workers * 16
 
-      # Check if the whole file is downloaded
-      if filelist.isDownloaded(work.filename):
+    with self.__file_lock:
+      verified = list(self.__verified)
+    for filename in verified:
+      if not filelist.exist(filename) or filelist.isDownloaded(filename):
         continue
+      fileinfo = filelist.get(filename)
+      for chunk in filelist.getMissingChunks(filename):
+        if len(self.__queue) >= limit:
+          return
+        if (filename, chunk) in self.__inflight:
+          continue
+        if not (holders := availability.holders(filename, chunk)):
+          continue
+        start_byte, end_byte = fileinfo.chunk_range(chunk)
+        ip_address, port = holders[0]
+        self.__queue.put(Worker.FileWorker(
+            filename, chunk, fileinfo.total_chunks, start_byte, end_byte, "", ip_address, port
+        ))
+
+  def __coalesce(self, work: Worker.FileWorker) -> list[Worker.FileWorker]:
+    """
+    Extends the chunk with the following chunks which are needed and held by the same node, so that they are downloaded with a single request. Only the chunks of the files with a verified manifest are joined, as their hashes are known. Must be called while holding the condition
+    Returns:
+      list[FileWorker]: The adjacent chunks in their order, starting with the given chunk
+    """
+    with self.__file_lock:
+      if work.filename not in self.__verified:
+        return [work]
 
-      # If not downloaded the exact next chunk, then take the work and add it to the end of the work queue
-      if (filelist.getLastDownloadedChunk(work.filename) + 1) != work.chunk:
-        self.add_work(work)
+    filelist: FileList.FileList = Env.get("FILES")
+    availability: Availability.Availability = Env.get("AVAILABILITY")
+    manifests: Manifest.ManifestStore = Env.get("MANIFESTS")
+    store: ChunkStore.ChunkStore | None = Env.get("CHUNK_STORE")
+    fileinfo = filelist.get(work.filename)
+    manifest = manifests.get(work.filename)
+    run = [work]
+    size = work.end_byte - work.start_byte + 1
+    for chunk in range(work.chunk + 1, fileinfo.total_chunks + 1):
+      start_byte, end_byte = fileinfo.chunk_range(chunk)
+      if size + (end_byte - start_byte + 1) > MAX_COALESCE_BYTES:
+        break
+      if filelist.hasChunk(work.filename, chunk) or (work.filename, chunk) in self.__inflight:
+        break
+      if (work.ip_address, work.port) not in availability.holders(work.filename, chunk):
+        break
+      # The chunk is held locally in other file, so it's not downloaded
+      if store is not None and manifest is not None and store.has(manifest.get(chunk) or ""):
+        break
+      run.append(replace(work, chunk=chunk, start_byte=start_byte, end_byte=end_byte, sha1=""))
+      size += end_byte - start_byte + 1
+    return run
+
+  def __next_work(self) -> list[Worker.FileWorker] | None:
+    """
+    Pick the next chunks which can be downloaded now, must be called while holding the condition
+    Returns:
+      list[FileWorker] | None: The adjacent chunks downloaded together from a single node, None if all download slots are taken or nothing can be started
+    """
+    if self.__running >= self.__workers:
+      return None
+
+    nodelist: NodeList.NodeList = Env.get("NODES")
+    availability: Availability.Availability = Env.get("AVAILABILITY")
+
+    # Taking the ready chunks into the pool, the chunks wait in memory till their node has a free slot
+    if self.__pull:
+      self.__pull_works()
+    free = self.__workers * 16 - len(self.__deferred)
+    if free > 0:
+      known = {(work.filename, work.chunk) for work in self.__deferred}
+      self.__deferred.extend(work for work in self.__queue.take(free) if (work.filename, work.chunk) not in known)
+
+    pool: list[Worker.FileWorker] = []
+    waiting: list[Worker.FileWorker] = []
+    for work in self.__deferred:
+      # The chunk is being downloaded as a part of other run, it's kept till the run ends
+      if (work.filename, work.chunk) in self.__inflight:
+        waiting.append(work)
+        continue
+      if not self.__is_needed(work):
+        self.__queue.remove(work)
         continue
+      if not nodelist.exists(work.ip_address):
+        availability.forget(work.ip_address)
+        self.__queue.remove(work)
+        continue
+      pool.append(work)
+
+    # Starting the rarest chunk which can be downloaded from any node with a free slot
+    self.__deferred = deque(waiting + pool)
+    for i in Picker.rarest_first(pool, availability):
+      if (work := self.__assign(pool[i])) is not None:
+        self.__deferred.remove(pool[i])
+        return self.__coalesce(work)
+
+    return None
+
+  def __work(self):
+    """
+    Method refers to the job which will be done by the fetcher, it hands the chunks to the download pool while respecting the limits per node and in total
+    """
+    while True:
+      with self.__cond:
+        # A failure of picking the chunks doesn't stop the downloads, the queued chunks are picked again
+        try:
+          run = self.__next_work()
+        except Exception as e:
+          logging.error(f"failed to pick the next chunks: {e}")
+          self.__cond.wait(1.0)
+          continue
+        if run is None:
+          self.__queue.flush()
+          if self.__running == 0 and not self.__deferred and self.__queue.empty():
+            self.__started = False
+            return
+          # Waking up when a failed chunk can be retried, or to check the pulled files
+          now = time.time()
+          due = self.__queue.next_due(now)
+          self.__cond.wait(1.0 if due is None else min(max(due - now, 0.05), 1.0))
+          continue
+
+        ip_address = run[0].ip_address
+        self.__running += 1
+        self.__active[ip_address] = self.__active.get(ip_address, 0) + 1
+        self.__inflight.update((work.filename, work.chunk) for work in run)
+
+      self.__pool.submit(self.__download, run)
+
+  def __download(self, run: list[Worker.FileWorker]):
+    """
+    Downloads adjacent chunks from a single node, and gives back their download slot
+    """
+    ip_address = run[0].ip_address
+    verified: dict[int, str] = {}
+    try:
+      verified = self.__fetch(run)
+      for work in run:
+        if work.chunk in verified:
+          self.__completed(replace(work, sha1=verified[work.chunk]))
+          self.__queue.remove(work)
+    except Exception as e:
+      logging.error(f"failed to download chunks {run[0].chunk}-{run[-1].chunk} of `{run[0].filename}`: {e}")
+    finally:
+      # The chunks built from the previous version of the file meanwhile are not needed anymore
+      # The failed chunks are retried after a delay, the other nodes holding them are tried too
+      failed: list[Worker.FileWorker] = []
+      for work in run:
+        if work.chunk in verified:
+          continue
+        if self.__is_held(work):
+          self.__queue.remove(work)
+        else:
+          failed.append(work)
+      if failed:
+        destination_path: str = os.path.join(Env.get("DOWNLOADS"), run[0].filename)
+        with open(Env.get("LOGFILE"), "a") as f:
+          for work in failed:
+            f.write(
+                f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] failed to download chunk {work.chunk} of `{destination_path}`\n"
+            )
+        for work in failed:
+          self.__queue.retry(work)
+      with self.__cond:
+        self.__running -= 1
+        self.__active[ip_address] -= 1
+        if self.__active[ip_address] == 0:
+          del self.__active[ip_address]
+        for work in run:
+          self.__inflight.discard((work.filename, work.chunk))
+        self.__cond.notify_all()
+
+  def __fetch(self, run: list[Worker.FileWorker]) -> dict[int, str]:
+    """
+    Downloads adjacent chunks from a single node with one ranged request, and writes them at their offsets into the destination file. Every chunk is verified as soon as its last byte arrives, so a bad chunk doesn't reject the chunks around it.
+    Args:
+      run: The adjacent chunks of a file in their order, all from the same node
+    Returns:
+      dict[int, str]: The verified SHA-1 hashes of the downloaded chunks, by the number of the chunk
+    """
+    nodelist: NodeList.NodeList = Env.get("NODES")
+    first = run[0]
+    with self.__cond:
+      session = self.__session(first)
+
+    expected: dict[int, str] = {}
+    for work in run:
+      if (sha1 := self.__expected_hash(work)) is None:
+        break
+      expected[work.chunk] = sha1
+    run = run[:len(expected)]
+    if not run:
+      return {}
+
+    # A new version of the file is built from its previous version first, the chunks found there are not downloaded
+    self.__patch(first)
+    held = {work.chunk for work in run if self.__is_held(work)}
+
+    # Downloading the chunks (If failed then retry 3 times from the first chunk not verified yet)
+    # The chunks are written at their offsets while they're received, so only a small buffer is kept in memory
+    # The compressed chunks are decoded while they're received, so the hashes are checked on the bytes of the chunks
+    chunk_encoding = Compression.ENCODING if Env.get("COMPRESSOR") is not None else "identity"
+    verified: dict[int, str] = {}
+    fd = self.__open(first)
+    try:
+      # The chunks held locally in other files are copied from them instead
+      filelist: FileList.FileList = Env.get("FILES")
+      store: ChunkStore.ChunkStore | None = Env.get("CHUNK_STORE")
+      if store is not None:
+        for work in run:
+          if store.has(expected[work.chunk]) and (data := store.read(expected[work.chunk], filelist.get)) is not None:
+            os.pwrite(fd, data, work.start_byte)
+            verified[work.chunk] = expected[work.chunk]
 
-      # Downloading the file (If failed then retry 3 times)
       for _ in range(3):
+        remaining: list[Worker.FileWorker] = []
+        for work in run:
+          if work.chunk in verified or work.chunk in held:
+            if remaining:
+              break
+            continue
+          remaining.append(work)
+        if not remaining:
+          break
+        rejected = False
+        size = remaining[-1].end_byte - remaining[0].start_byte + 1
+        started = time.monotonic()
+        deadline = started + session.chunk_timeout(size)
+        received = 0
+        current = 0
+        sha1 = hashlib.sha1()
+        written = 0
         with httpx.Client() as client:
           try:
-            response = client.get(
-                url=f"http://{work.ip_address}:{work.port}/download",
-                params={"file": work.filename},
-                headers={
-                    "Range": f"bytes={work.start_byte}-{work.end_byte}"},
-            )
+            with nodelist.track(first.ip_address):
+              with client.stream(
+                  "GET",
+                  url=f"http://{first.ip_address}:{first.port}/download",
+                  params={"file": first.filename},
+                  headers={
+                      "Range": f"bytes={remaining[0].start_byte}-{remaining[-1].end_byte}",
+                      "Accept-Encoding": "identity",
+                      Compression.HEADER: chunk_encoding,
+                  },
+              ) as response:
+                if response.status_code not in (200, 206):
+                  raise ValueError(f"unexpected status {response.status_code}")
+                parts = response.iter_raw(BUFFER_SIZE)
+                if response.headers.get(Compression.HEADER) == Compression.ENCODING:
+                  parts = Compression.inflate(parts, BUFFER_SIZE)
+                for part in parts:
+                  view = memoryview(part)
+                  while len(view) > 0:
+                    if current == len(remaining):
+                      raise ValueError("received more bytes than the chunks")
+                    work = remaining[current]
+                    take = min(len(view), work.end_byte - work.start_byte + 1 - written)
+                    os.pwrite(fd, view[:take], work.start_byte + written)
+                    sha1.update(view[:take])
+                    written += take
+                    view = view[take:]
+                    if written < work.end_byte - work.start_byte + 1:
+                      continue
+
+                    # If hash doesn't match, then discard the chunk and download it again, the following chunks are still kept
+                    if sha1.hexdigest() != expected[work.chunk]:
+                      self.__discard(fd, work.start_byte, written)
+                      nodelist.record_failure(first.ip_address)
+                      session.fail(first.ip_address)
+                      rejected = True
+                    else:
+                      verified[work.chunk] = sha1.hexdigest()
+                      received += written
+                    current += 1
+                    sha1 = hashlib.sha1()
+                    written = 0
+                  # The node is too slow, so the chunks are given to other node
+                  if time.monotonic() > deadline:
+                    raise TimeoutError(f"chunks {first.chunk}-{run[-1].chunk} of `{first.filename}` timed out")
+            if current < len(remaining):
+              raise ValueError("received less bytes than the chunks")
+            if rejected:
+              continue
+          except TimeoutError:
+            if current < len(remaining):
+              self.__discard(fd, remaining[current].start_byte, written)
+            session.fail(first.ip_address)
+            return verified
           except Exception:
+            if current < len(remaining):
+              self.__discard(fd, remaining[current].start_byte, written)
             continue
+          finally:
+            if received > 0:
+              session.record(first.ip_address, received, time.monotonic() - started)
+    finally:
+      os.close(fd)
 
-          # If hash doesn't match, then retry downloading
-          sha1 = hashlib.sha1(response.content).hexdigest()
-          if sha1 != work.sha1:
-            continue
+    return verified
 
-          if response.status_code not in (200, 206):
-            continue
-
-          filelist_path = Env.get("FILELIST_PATH")
-          filelist.save(filelist_path)
-          # Appending the at the end of the file
-          with open(destination_path, 'ab') as writeF:
-            writeF.write(response.content)
-          filelist.completed(work.filename, work.chunk)
-          filelist.save(filelist_path)
-          break
+  def __patch(self, work: Worker.FileWorker):
+    """
+    Builds the chunks of a new version of the file which are found in its previous version, and removes the previous version afterwards. Only one download builds the file, the other downloads of the file wait for it so that they don't download the chunks being built.
+    """
+    filelist: FileList.FileList = Env.get("FILES")
+    manifests: Manifest.ManifestStore = Env.get("MANIFESTS")
+    basis = os.path.join(Env.get("BASES"), work.filename)
+    with self.__file_lock:
+      if (done := self.__patching.get(work.filename)) is not None:
+        owner = False
+      elif os.path.exists(basis) and filelist.get(work.filename).merkle_root:
+        done = self.__patching[work.filename] = Event()
+        owner = True
       else:
-        print(f"invalid chunk {work.chunk}")
-        destination_path: str = os.path.join(
-            Env.get("DOWNLOADS"), work.filename
+        return
+    if not owner:
+      done.wait()
+      return
+
+    try:
+      fileinfo = filelist.get(work.filename)
+      held = {chunk for chunk in range(1, fileinfo.total_chunks + 1) if filelist.hasChunk(work.filename, chunk)}
+      fd = self.__open(work)
+      try:
+        patched = Delta.patch(basis, fd, fileinfo, manifests.get(work.filename), held)
+      finally:
+        os.close(fd)
+      for chunk, sha1 in sorted(patched.items()):
+        start_byte, end_byte = fileinfo.chunk_range(chunk)
+        self.__completed(replace(work, chunk=chunk, start_byte=start_byte, end_byte=end_byte, sha1=sha1))
+    except Exception as e:
+      logging.error(f"failed to build `{work.filename}` from its previous version: {e}")
+    finally:
+      # The previous version isn't used again, the missing chunks are downloaded
+      try:
+        os.remove(basis)
+      except OSError:
+        pass
+      with self.__file_lock:
+        self.__patching.pop(work.filename, None)
+      done.set()
+
+  def __is_verified(self, filename: str, fileinfo: FileInfo.FileInfo) -> bool:
+    """
+    Check if the manifest of the file is complete and matches the Merkle root of the file
+    """
+    with self.__file_lock:
+      if filename in self.__verified:
+        return True
+
+    manifests: Manifest.ManifestStore = Env.get("MANIFESTS")
+    manifest = manifests.get(filename)
+    if manifest is None or manifest.total != fileinfo.total_chunks or not manifest.is_complete():
+      return False
+    if merkle_root(manifest.hashes()) != fileinfo.merkle_root:
+      return False
+
+    with self.__file_lock:
+      self.__verified.add(filename)
+    return True
+
+  def __fetch_manifest(self, work: Worker.FileWorker, fileinfo: FileInfo.FileInfo) -> bool:
+    """
+    Downloads the manifest of the file from the node of the chunk, the manifest is only kept if it matches the Merkle root of the file
+    Returns:
+      bool: Returns True if a valid manifest is downloaded, otherwise False
+    """
+    nodelist: NodeList.NodeList = Env.get("NODES")
+    manifests: Manifest.ManifestStore = Env.get("MANIFESTS")
+    try:
+      with nodelist.track(work.ip_address):
+        response = httpx.get(
+            url=f"http://{work.ip_address}:{work.port}/manifest",
+            params={"file": work.filename},
+            timeout=10,
         )
-        with open(Env.get("LOGFILE"), "a") as f:
-          f.write(
-              f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] failed to download chunk {work.chunk} of `{destination_path}`\n"
-          )
-        self.add_work(work)
-        continue
+        response.raise_for_status()
+      manifest = Manifest.Manifest.from_dict(response.json())
+      if (
+          manifest.total != fileinfo.total_chunks
+          or not manifest.is_complete()
+          or merkle_root(manifest.hashes()) != fileinfo.merkle_root
+      ):
+        return False
+    except Exception:
+      return False
 
-      # Tell random 4 nodes about the new chunk
-      port: int = Env.get("PORT")
-      machine_ip: str = Env.get("IPADDRESS")
-      nodelist: NodeList.NodeList = Env.get("NODES")
-      if nodelist.size() > 4:
-        nodes = nodelist.random_picks(4)
-      else:
-        nodes = nodelist.random_picks(nodelist.size())
+    manifests.save(work.filename, manifest)
+    with self.__file_lock:
+      self.__verified.add(work.filename)
+    return True
 
-      for ipAddress, portNum in nodes:
-        try:
-          httpx.post(
-              url=f"http://{ipAddress}:{portNum}/response",
-              data={
-                  "filename": work.filename,
-                  "chunk": work.chunk,
-                  "total_chunks": work.total_chunks,
-                  "start_byte": work.start_byte,
-                  "end_byte": work.end_byte,
-                  "sha1": work.sha1,
-                  "ip_address": machine_ip,
-                  "port": port,
-              },
-          )
-        except Exception:
-          continue
+  def __expected_hash(self, work: Worker.FileWorker) -> str | None:
+    """
+    Get the hash which the downloaded chunk must have. For the files with a Merkle tree the hash comes from the manifest matching the root of the tree, so a node can't send a wrong chunk along with its hash. The files without a Merkle tree trust the hash of the announcement.
+    Returns:
+      str | None: The SHA-1 hash of the chunk, None if no valid manifest could be found
+    """
+    filelist: FileList.FileList = Env.get("FILES")
+    fileinfo = filelist.get(work.filename)
+    if not fileinfo.merkle_root:
+      return work.sha1
+
+    if not self.__is_verified(work.filename, fileinfo) and not self.__fetch_manifest(work, fileinfo):
+      return None
 
-      # Tell the sender of the chunk that the current node have downloaded the chunk
-      # So that the sender will tell the nodes when the other chunks will be available
+    manifests: Manifest.ManifestStore = Env.get("MANIFESTS")
+    return manifests.get(work.filename).get(work.chunk)
+
+  def __open(self, work: Worker.FileWorker) -> int:
+    """
+    Opens the destination file of the chunk, the file is preallocated (sparse) to the full size of the file so that the chunks can be written in any order. A file sharing its bytes with an identical file through a hard link is copied first
+    Returns:
+      int: The file descriptor of the destination file
+    """
+    filelist: FileList.FileList = Env.get("FILES")
+    size = filelist.get(work.filename).size
+    destination_path: str = os.path.join(Env.get("DOWNLOADS"), work.filename)
+
+    with self.__file_lock:
+      ChunkStore.unshare(destination_path)
+      fd = os.open(destination_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+      if os.fstat(fd).st_size != size:
+        os.ftruncate(fd, size)
+    except Exception:
+      os.close(fd)
+      raise
+    return fd
+
+  def __discard(self, fd: int, start_byte: int, length: int):
+    """
+    Overwrites the bytes of a rejected chunk with zeros, so that no unverified data is left in the file
+    """
+    zeros = bytes(BUFFER_SIZE)
+    for offset in range(0, length, BUFFER_SIZE):
+      os.pwrite(fd, zeros[:min(BUFFER_SIZE, length - offset)], start_byte + offset)
+
+  def __completed(self, work: Worker.FileWorker):
+    """
+    Records the downloaded chunk, tells other nodes about it, and verifies the file when all the chunks are downloaded
+    """
+    filelist: FileList.FileList = Env.get("FILES")
+    destination_path: str = os.path.join(Env.get("DOWNLOADS"), work.filename)
+
+    # The verified hash of the chunk is kept, so that the chunk can be announced without reading it
+    manifests: Manifest.ManifestStore = Env.get("MANIFESTS")
+    manifests.record(work.filename, work.total_chunks, work.chunk, work.sha1)
+    store: ChunkStore.ChunkStore | None = Env.get("CHUNK_STORE")
+    if store is not None:
+      store.add(work.sha1, work.filename, work.chunk)
+
+    with self.__file_lock:
+      # The chunk is appended into the journal of the FileList, the whole list isn't rewritten
+      filelist.completed(work.filename, work.chunk)
+      downloaded = filelist.isDownloaded(work.filename)
+
+    if downloaded:
+      with self.__cond:
+        self.__sessions.pop(work.filename, None)
+
+    # The downloaders waiting for the chunk get it announced
+    sender: Sender.Sender = Env.get("FILE_SENDER")
+    sender.notify(work.filename)
+
+    # Tell other nodes about the new chunk, along with the other chunks downloaded meanwhile
+    port: int = Env.get("PORT")
+    machine_ip: str = Env.get("IPADDRESS")
+    announcer: Announcer.Announcer = Env.get("ANNOUNCER")
+    announcer.publish(Announcer.Announcement(work.filename, work.total_chunks, work.chunk, work.sha1))
+
+    # Tell the sender of the chunk that the current node have downloaded the chunk
+    # So that the sender will tell the nodes when the other chunks will be available
+    # The files which are pulled don't need the announcements of the senders
+    with self.__file_lock:
+      pulled = self.__pull and work.filename in self.__verified
+    if not pulled:
       try:
         httpx.post(
             url=f"http://{work.ip_address}:{work.port}/webhook",
@@ -148,15 +677,25 @@ class Fetcher:
       except Exception:
         pass
 
-      # If the chunk is the last part of the file then check if the whole file is intact
-      if work.chunk == work.total_chunks:
-        with open(destination_path, 'rb') as f:
-          sha512 = hashlib.sha512(f.read()).hexdigest()
-          fileinfo = filelist.get(work.filename)
-          if sha512 != fileinfo.filehash:
-            # Invalid File, so delete it
-            if os.path.exists(destination_path):
-              os.remove(destination_path)
+    # Every chunk of a file with a Merkle tree is verified on arrival, so the file is intact
+    # The files without it are checked as a whole, piece by piece
+    fileinfo = filelist.get(work.filename)
+    if downloaded and not fileinfo.merkle_root:
+      sha512 = hashlib.sha512()
+      with open(destination_path, 'rb') as f:
+        while piece := f.read(1024 * 1024):
+          sha512.update(piece)
+      if sha512.hexdigest() != fileinfo.filehash:
+        # Invalid File, so delete it and download again
+        if os.path.exists(destination_path):
+          os.remove(destination_path)
+        with self.__file_lock:
+          filelist.reset(work.filename)
+        if store is not None:
+          store.forget(work.filename)
+        manifests.remove(work.filename)
+        cache: Cache.ChunkCache = Env.get("CHUNK_CACHE")
+        cache.invalidate(work.filename)
 
   def start(self):
     """
@@ -165,16 +704,26 @@ class Fetcher:
       ChildProcessError: If the Fetcher is already running
       IndexError: If the task queue is empty
     """
-    if self.__job.is_alive():
-      raise ChildProcessError("job is already started")
-    elif self.__queue.empty():
-      raise IndexError("task queue is empty")
+    with self.__cond:
+      if self.__started:
+        raise ChildProcessError("job is already started")
+      elif self.__queue.empty():
+        raise IndexError("task queue is empty")
 
-    try:
-      self.__job.start()
-    except RuntimeError:
-      self.__job = Thread(target=self.__work)
-      self.__job.start()
+      self.__started = True
+      try:
+        self.__job.start()
+      except RuntimeError:
+        self.__job = Thread(target=self.__work, daemon=True)
+        self.__job.start()
+
+  def resume(self):
+    """
+    Starts the Fetcher if it's not running and some jobs are queued, the check and the start are done together so that the concurrent requests start it only once
+    """
+    with self.__cond:
+      if not self.__started and not self.__queue.empty():
+        self.start()
 
   def join(self, timeout: float | None = None):
     """
@@ -186,4 +735,5 @@ class Fetcher:
     """
     Tells if the Fetcher is doing some jobs
     """
-    return self.__job.is_alive()
+    with self.__cond:
+      return self.__started
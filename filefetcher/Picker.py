@@ -0,0 +1,32 @@
+import numpy as np
+from . import Worker
+from .Availability import Availability
+
+
+def rarest_first(works: list[Worker.FileWorker], availability: Availability, rng: np.random.Generator | None = None) -> list[int]:
+  """
+  Orders the chunks so that the chunks held by the fewest nodes come first, chunks which are equally rare are shuffled so that the nodes downloading the same file don't all pick the same chunk
+  Args:
+    works: The chunks which can be downloaded
+    availability: The chunks held by the nodes
+    rng: The random generator used for shuffling (Default a new generator)
+  Returns:
+    list[int]: The positions of the works, rarest first
+  """
+  if not works:
+    return []
+  rng = rng or np.random.default_rng()
+
+  # Looking up the counts of every file once, chunks of an unknown file are treated as held by a single node
+  rarity = np.ones(len(works), dtype=np.int64)
+  positions: dict[str, list[int]] = {}
+  for i, work in enumerate(works):
+    positions.setdefault(work.filename, []).append(i)
+  for filename, indexes in positions.items():
+    if (counts := availability.counts(filename)) is None:
+      continue
+    chunks = np.fromiter((works[i].chunk for i in indexes), dtype=np.int64, count=len(indexes))
+    valid = (chunks >= 1) & (chunks <= len(counts))
+    rarity[np.asarray(indexes)[valid]] = np.maximum(counts[chunks[valid] - 1], 1)
+
+  return np.lexsort((rng.random(len(works)), rarity)).tolist()
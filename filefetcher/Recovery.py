@@ -0,0 +1,264 @@
+from . import Worker
+from registry.File.FileInfo import FileInfo
+from registry.File.List import FileList
+from registry.File.Manifest import ManifestStore
+from registry.File.ChunkStore import ChunkStore, unshare
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import errno
+import hashlib
+import os
+
+# Count of chunks hashed at the same time, hashlib releases the GIL while hashing
+WORKERS = min(32, (os.cpu_count() or 1) * 2)
+
+# Size of the buffer used for zeroing a rejected chunk (In Bytes)
+BUFFER_SIZE = 64 * 1024
+
+# Count of nodes the recovered downloads are spread over
+PEERS = 4
+
+
+def data_ranges(fd: int, size: int) -> list[tuple[int, int]]:
+  """
+  Finds the parts of a file which hold data, the files are preallocated sparse so the chunks never written are holes. A filesystem which doesn't keep holes tells the whole file as data.
+  Args:
+    fd: The file descriptor of the file
+    size: The length of the file (In Bytes)
+  Returns:
+    list[tuple[int, int]]: The starting byte address and the byte address after the end of every part, in increasing order
+  """
+  if not hasattr(os, "SEEK_DATA"):
+    return [(0, size)] if size > 0 else []
+  ranges: list[tuple[int, int]] = []
+  offset = 0
+  while offset < size:
+    try:
+      start = os.lseek(fd, offset, os.SEEK_DATA)
+    except OSError as e:
+      # No data after the offset
+      if e.errno == errno.ENXIO:
+        break
+      return [(0, size)]
+    end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+    ranges.append((start, end))
+    offset = end
+  return ranges
+
+
+def covered(ranges: list[tuple[int, int]], start: int, end: int) -> tuple[bool, bool]:
+  """
+  Check how the bytes from start till end (Exclusive) lie in the parts of a file holding data
+  Args:
+    ranges: The parts of the file holding data, given by data_ranges
+    start: The starting byte address
+    end: The byte address after the end
+  Returns:
+    tuple[bool, bool]: Returns if all the bytes hold data, and if any of the bytes holds data
+  """
+  left = end - start
+  touched = False
+  for range_start, range_end in ranges:
+    if range_end <= start or range_start >= end:
+      continue
+    touched = True
+    left -= min(range_end, end) - max(range_start, start)
+  return left <= 0, touched
+
+
+@dataclass
+class Recovered:
+  """
+  The outcome of the recovery of a partial download
+  Args:
+    filename: The name of the file
+    adopted: The chunks found written but not recorded, by their SHA-1 hash, they're recorded now
+    lost: The chunks recorded but not found in the file, they're downloaded again
+    discarded: The chunks found written which didn't match their hash, they're overwritten with zeros
+  """
+
+  filename: str
+  adopted: dict[int, str] = field(default_factory=dict)
+  lost: list[int] = field(default_factory=list)
+  discarded: list[int] = field(default_factory=list)
+
+
+class Recovery:
+  """
+  Recovery reconciles the partial downloads with the progress recorded in the FileList when the node starts, as the node may have stopped between writing a chunk and recording it. The recorded chunks whose bytes are missing (The file is shorter, or the chunk is a hole) are downloaded again, and the chunks written but not recorded are hashed in parallel and recorded if they match their hash. Only the written parts of the files are read, so the recovery doesn't depend on the size of the catalog.
+  """
+
+  def __init__(self, downloads: str, workers: int = WORKERS, verify: bool = False):
+    """
+    Args:
+      downloads: The directory of the files
+      workers: The count of chunks hashed at the same time
+      verify: If True, the recorded chunks of the partial downloads are hashed too, otherwise only their presence is checked
+    """
+    self.downloads = downloads
+    self.workers = workers
+    self.verify = verify
+
+  def __check(self, filename: str, fileinfo: FileInfo, filelist: FileList) -> tuple[Recovered, list[tuple[int, int, int]]]:
+    """
+    Fits the length of a partial download, and finds its lost chunks and the chunks to be hashed
+    Returns:
+      tuple[Recovered, list[tuple[int, int, int]]]: The outcome with its lost chunks, and the chunks to be hashed with their starting byte address and length
+    """
+    recovered = Recovered(filename)
+    path = os.path.join(self.downloads, filename)
+    try:
+      # The file is changed in place, so it must not share its bytes with a file linked to it
+      unshare(path)
+      fd = os.open(path, os.O_RDWR)
+    except FileNotFoundError:
+      recovered.lost = [chunk for chunk in range(1, fileinfo.total_chunks + 1) if filelist.hasChunk(filename, chunk)]
+      return recovered, []
+
+    hashing: list[tuple[int, int, int]] = []
+    try:
+      length = os.fstat(fd).st_size
+      if length > fileinfo.size:
+        os.ftruncate(fd, fileinfo.size)
+        length = fileinfo.size
+      ranges = data_ranges(fd, length)
+
+      for chunk in range(1, fileinfo.total_chunks + 1):
+        start_byte, end_byte = fileinfo.chunk_range(chunk)
+        full, touched = covered(ranges, start_byte, end_byte + 1)
+        if filelist.hasChunk(filename, chunk):
+          if end_byte >= length or not full:
+            recovered.lost.append(chunk)
+          elif self.verify:
+            hashing.append((chunk, start_byte, end_byte - start_byte + 1))
+        elif end_byte < length and touched:
+          hashing.append((chunk, start_byte, end_byte - start_byte + 1))
+
+      # The file is preallocated to its full size again, as the downloader expects
+      if length < fileinfo.size:
+        os.ftruncate(fd, fileinfo.size)
+    finally:
+      os.close(fd)
+    return recovered, hashing
+
+  def __hash(self, path: str, start_byte: int, length: int) -> str:
+    """
+    Hashes the bytes of a chunk
+    """
+    with open(path, 'rb') as f:
+      return hashlib.sha1(os.pread(f.fileno(), length, start_byte)).hexdigest()
+
+  def __discard(self, path: str, start_byte: int, length: int):
+    """
+    Overwrites the bytes of a rejected chunk with zeros, so that no unverified data is left in the file
+    """
+    zeros = bytes(BUFFER_SIZE)
+    fd = os.open(path, os.O_WRONLY)
+    try:
+      for offset in range(0, length, BUFFER_SIZE):
+        os.pwrite(fd, zeros[:min(BUFFER_SIZE, length - offset)], start_byte + offset)
+    finally:
+      os.close(fd)
+
+  def run(self, filelist: FileList, manifests: ManifestStore, store: ChunkStore | None = None) -> list[Recovered]:
+    """
+    Reconciles every partial download with its recorded progress
+    Args:
+      filelist: The files
+      manifests: The manifests of the files, the hashes of the chunks are taken from them
+      store: The index of the held chunks, if the chunks are indexed
+    Returns:
+      list[Recovered]: The outcome of every partial download which needed any change
+    """
+    checks: list[tuple[Recovered, list[tuple[int, int, int]]]] = []
+    for filename in filelist.getFiles():
+      if filelist.isDownloaded(filename):
+        continue
+      checks.append(self.__check(filename, filelist.get(filename), filelist))
+
+    # The chunks of all the files are hashed together, so a single large file doesn't hold back the others
+    futures = {}
+    with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="recovery") as pool:
+      for recovered, hashing in checks:
+        manifest = manifests.get(recovered.filename)
+        path = os.path.join(self.downloads, recovered.filename)
+        for chunk, start_byte, length in hashing:
+          # A chunk without a known hash can't be verified, it's left to be downloaded
+          if manifest is None or (expected := manifest.get(chunk)) is None:
+            continue
+          futures[(recovered.filename, chunk)] = (expected, start_byte, length, pool.submit(self.__hash, path, start_byte, length))
+
+    results: list[Recovered] = []
+    for recovered, hashing in checks:
+      filename = recovered.filename
+      path = os.path.join(self.downloads, filename)
+      for chunk, _, _ in hashing:
+        if (filename, chunk) not in futures:
+          continue
+        expected, start_byte, length, future = futures[(filename, chunk)]
+        if future.result() == expected:
+          if not filelist.hasChunk(filename, chunk):
+            recovered.adopted[chunk] = expected
+          continue
+        if filelist.hasChunk(filename, chunk):
+          recovered.lost.append(chunk)
+        else:
+          recovered.discarded.append(chunk)
+        self.__discard(path, start_byte, length)
+
+      recovered.lost.sort()
+      if recovered.lost:
+        self.__unrecord(filelist, manifests, store, filename, set(recovered.lost))
+      for chunk, sha1 in recovered.adopted.items():
+        filelist.completed(filename, chunk)
+        if store is not None:
+          store.add(sha1, filename, chunk)
+      if recovered.adopted or recovered.lost or recovered.discarded:
+        results.append(recovered)
+    return results
+
+  def __unrecord(self, filelist: FileList, manifests: ManifestStore, store: ChunkStore | None, filename: str, lost: set[int]):
+    """
+    Marks the lost chunks of a file as not downloaded, only the lost chunks are recorded. The index of the held chunks has no way to forget a single chunk, so the file is forgotten and its other chunks are indexed again
+    """
+    for chunk in sorted(lost):
+      filelist.uncompleted(filename, chunk)
+
+    if store is not None:
+      store.forget(filename)
+      if (manifest := manifests.get(filename)) is not None:
+        for chunk, sha1 in enumerate(manifest.hashes(), start=1):
+          if sha1 is not None and filelist.hasChunk(filename, chunk):
+            store.add(sha1, filename, chunk)
+
+  def works(self, filelist: FileList, manifests: ManifestStore, results: list[Recovered], peers: list[tuple[str, int]]) -> list[Worker.FileWorker]:
+    """
+    Gives the downloads to be queued again for the recovered files, the lost chunks and the first missing chunk of every partial download, the rest of the chunks are pulled once the manifest of the file is verified. A chunk of a file without a Merkle tree is queued only if its hash is known, as the hash can't be checked otherwise. The downloads are spread over the nodes in turn, so no single node is asked for all of them
+    Args:
+      filelist: The files
+      manifests: The manifests of the files
+      results: The outcome of the recovery
+      peers: IP Addresses and port numbers of the nodes asked for the chunks
+    Returns:
+      list[FileWorker]: The downloads to be queued, none if no node is given
+    """
+    if not peers:
+      return []
+    lost = {result.filename: result.lost for result in results}
+    works: list[Worker.FileWorker] = []
+    for filename in filelist.getFiles():
+      if filelist.isDownloaded(filename):
+        continue
+      fileinfo = filelist.get(filename)
+      manifest = manifests.get(filename)
+      missing = filelist.getMissingChunks(filename)
+      for chunk in sorted(set(lost.get(filename, []) + missing[:1])):
+        sha1 = (manifest.get(chunk) if manifest is not None else None) or ""
+        if not sha1 and not fileinfo.merkle_root:
+          continue
+        start_byte, end_byte = fileinfo.chunk_range(chunk)
+        ip_address, port = peers[len(works) % len(peers)]
+        works.append(Worker.FileWorker(
+            filename, chunk, fileinfo.total_chunks, start_byte, end_byte, sha1, ip_address, port
+        ))
+    return works
@@ -1,26 +1,37 @@
-import base64
-import json
-
-import persistqueue
-from blockchain.chain import Variables
-from . import Worker
-import os
-import httpx
-from threading import Thread, Lock
+from . import Worker, Announcer, WorkQueue
+from .Window import AnnounceWindow, DEFAULT_WINDOW
+import logging
+from threading import Thread, Condition
+from concurrent.futures import Future
 from environments import Env
+from registry.File import List as FileList, Manifest
 import time
-import hashlib
 
 
 class Sender:
   """
-  Class which is used for telling the clients that the chunk is ready to deliver
+  Class which is used for telling the clients that the chunks are ready to deliver. Every downloader of a file gets a window of announced chunks, the window moves forward with the confirmations of the downloader (`/webhook`), and when the current node downloads new chunks of the file.
   """
 
-  def __init__(self):
-    self.__queue: persistqueue.FIFOSQLiteQueue = persistqueue.FIFOSQLiteQueue(
-        path=Env.get("FILE_SENDER_SAVE"), auto_commit=True, multithreading=True)
-    self.__job = Thread(target=self.__work)
+  def __init__(self, window: int = DEFAULT_WINDOW):
+    """
+    Args:
+      window: The count of chunks announced to a downloader which it hasn't confirmed yet
+    """
+    # A confirmation is queued once per downloader, and stays queued until the announcements following it are delivered
+    self.__queue = WorkQueue.WorkQueue(
+        Env.get("FILE_SENDER_SAVE"), key=lambda work: (work.filename, work.chunk, work.ip_address, work.port)
+    )
+    self.__job = Thread(target=self.__work, daemon=True)
+    self.__window = window
+
+    # Windows of the downloaders, guarded by the condition
+    self.__cond = Condition()
+    self.__windows: dict[tuple[str, str, int], AnnounceWindow] = {}
+    # Tells if the worker thread is started and not returning, guarded by the condition
+    self.__started = False
+    # Confirmations moved into the windows, whose next announcements are not delivered yet
+    self.__acks: dict[tuple[str, str, int], list[Worker.FileWorker]] = {}
 
   def add_work(self, job: Worker.FileWorker):
     """
@@ -28,76 +39,150 @@ class Sender:
     Args:
       job: The FileWorker object representing the job which needs to done
     """
-    self.__queue.put(job)
+    with self.__cond:
+      if self.__queue.put(job):
+        self.__cond.notify_all()
 
   def get_work(self) -> Worker.FileWorker | None:
     """
-    Getting the job from the worker list
+    Getting the job from the worker list, the job stays in the queue until it's acknowledged, so a confirmation isn't lost when the node stops before announcing the next chunks
     Returns:
       FileWorker: If the worker list is not empty
     """
-    if self.__queue.empty():
-      return None
+    works = self.__queue.take(1)
+    return works[0] if works else None
+
+  def __acknowledge(self, works: list[Worker.FileWorker]):
+    """
+    Removes the confirmations which are not needed anymore from the queue
+    """
+    for work in works:
+      self.__queue.remove(work)
 
-    return self.__queue.get()
+  def notify(self, filename: str):
+    """
+    Wakes the Sender when the current node gets new chunks of a file, so that they are announced to the downloaders waiting for them
+    Args:
+      filename: The name of the file
+    """
+    with self.__cond:
+      if any(key[0] == filename for key in self.__windows):
+        self.__cond.notify_all()
 
-  def __work(self):
+  def windows(self) -> int:
     """
-    Method refers to the job which will be done by the Sender
+    Get the count of downloaders being served
     """
-    downloads: str = Env.get("DOWNLOADS")
+    with self.__cond:
+      return len(self.__windows)
 
+  def __receive(self, now: float):
+    """
+    Moves the confirmations of the downloaders into their windows, must be called while holding the condition
+    """
+    filelist: FileList.FileList = Env.get("FILES")
     while (work := self.get_work()) is not None:
-      next_chunk = work.chunk + 1
-      if next_chunk > work.total_chunks:
+      if not filelist.exist(work.filename):
+        self.__acknowledge([work])
         continue
-
-      filepath = os.path.join(downloads, work.filename)
-      if not os.path.exists(filepath):
-        self.add_work(work)
+      total_chunks = filelist.get(work.filename).total_chunks
+      key = (work.filename, work.ip_address, work.port)
+      if (window := self.__windows.get(key)) is None:
+        window = self.__windows[key] = AnnounceWindow(
+            work.filename, work.ip_address, work.port, total_chunks, now, self.__window
+        )
+      try:
+        window.ack(work.chunk, now)
+      except IndexError:
+        self.__acknowledge([work])
         continue
+      self.__acks.setdefault(key, []).append(work)
 
-      # Calculating the start byte and the end byte
-      start_byte = work.end_byte + 1
-      with open(filepath, "rb") as f:
-        f.seek(start_byte)
-        sha1 = hashlib.sha1(f.read(4194304)).hexdigest()
-        if next_chunk == work.total_chunks:
-          end_byte = f.tell()
-        else:
-          end_byte = f.tell() - 1
-
-      # The file is not loaded completely (Or maybe in the saving state)
-      if start_byte >= end_byte:
-        self.add_work(work)
+  def __next_announcements(self, now: float) -> list[tuple[AnnounceWindow, int]]:
+    """
+    Picks the chunks which can be announced now, and forgets the finished and the dead downloaders. Must be called while holding the condition
+    Returns:
+      list[tuple[AnnounceWindow, int]]: The windows with the chunks to announce
+    """
+    filelist: FileList.FileList = Env.get("FILES")
+    announcements: list[tuple[AnnounceWindow, int]] = []
+    for key, window in list(self.__windows.items()):
+      if not filelist.exist(window.filename) or window.is_done() or window.is_dead(now):
+        del self.__windows[key]
+        self.__acknowledge(self.__acks.pop(key, []))
         continue
+      held = filelist.getBitmap(window.filename)
+      announcements.extend((window, chunk) for chunk in window.fill(held, now))
+    return announcements
 
-      # Telling the client that the chunk is available
-      machine_ip: str = Env.get("IPADDRESS")
-      port: int = Env.get("PORT")
-      try:
-        response = httpx.post(
-            url=f"http://{work.ip_address}:{work.port}/response",
-            data={
-                "filename": work.filename,
-                "chunk": next_chunk,
-                "total_chunks": work.total_chunks,
-                "start_byte": start_byte,
-                "end_byte": end_byte,
-                "sha1": sha1,
-                "ip_address": machine_ip,
-                "port": port,
-            },
-            timeout=10
-        )
-        if response.status_code != 200:
-          self.add_work(work)
+  def __work(self):
+    """
+    Method refers to the job which will be done by the Sender, it sleeps till a confirmation arrives, the current node gets new chunks, or a retry is due
+    """
+    while True:
+      with self.__cond:
+        now = time.monotonic()
+        self.__receive(now)
+        announcements = self.__next_announcements(now)
+        if not announcements:
+          self.__queue.flush()
+          if not self.__windows and self.__queue.empty():
+            self.__started = False
+            return
+          deadline = min((w.deadline() for w in self.__windows.values()), default=now + 1.0)
+          self.__cond.wait(max(deadline - now, 0.05))
           continue
-      except Exception:
-        self.add_work(work)
-        continue
 
-      time.sleep(2)
+      for window, chunk in announcements:
+        self.__announce(window, chunk)
+
+  def __announce(self, window: AnnounceWindow, chunk: int):
+    """
+    Tells the downloader that a chunk is available through the Announcer, so the announcements to the same downloader are sent together. The outcome is recorded into its window, and the confirmations which led to the announcement are acknowledged once it's delivered.
+    """
+    key = (window.filename, window.ip_address, window.port)
+    with self.__cond:
+      acks = self.__acks.pop(key, [])
+    try:
+      # The hash of the chunk is known without reading the chunk
+      filelist: FileList.FileList = Env.get("FILES")
+      manifests: Manifest.ManifestStore = Env.get("MANIFESTS")
+      fileinfo = filelist.get(window.filename)
+      sha1 = manifests.chunk_hash(window.filename, fileinfo, chunk)
+      announcer: Announcer.Announcer = Env.get("ANNOUNCER")
+      future = announcer.announce(
+          window.ip_address, window.port, Announcer.Announcement(window.filename, fileinfo.total_chunks, chunk, sha1)
+      )
+    except Exception as e:
+      logging.error(f"failed to announce chunk {chunk} of `{window.filename}` to {window.ip_address}: {e}")
+      with self.__cond:
+        window.failed(chunk, time.monotonic())
+        self.__keep(key, acks)
+        self.__cond.notify_all()
+      return
+
+    def record(future: Future):
+      with self.__cond:
+        if future.exception() is not None:
+          window.failed(chunk, time.monotonic())
+          self.__keep(key, acks)
+        else:
+          if not future.result():
+            # The downloader has the chunk already, so no confirmation will come
+            window.delivered(chunk)
+          self.__acknowledge(acks)
+        self.__cond.notify_all()
+
+    future.add_done_callback(record)
+
+  def __keep(self, key: tuple[str, str, int], acks: list[Worker.FileWorker]):
+    """
+    Gives back the confirmations of an announcement which wasn't delivered, they're acknowledged with the next announcement to the downloader. Must be called while holding the condition
+    """
+    if key in self.__windows:
+      self.__acks[key] = acks + self.__acks.get(key, [])
+    else:
+      self.__acknowledge(acks)
 
   def start(self):
     """
@@ -106,16 +191,26 @@ class Sender:
       ChildProcessError: If the Sender is already running
       IndexError: If the task queue is empty
     """
-    if self.__job.is_alive():
-      raise ChildProcessError("job is already started")
-    elif self.__queue.empty():
-      raise IndexError("task queue is empty")
+    with self.__cond:
+      if self.__started:
+        raise ChildProcessError("job is already started")
+      elif self.__queue.empty():
+        raise IndexError("task queue is empty")
 
-    try:
-      self.__job.start()
-    except RuntimeError:
-      self.__job = Thread(target=self.__work)
-      self.__job.start()
+      self.__started = True
+      try:
+        self.__job.start()
+      except RuntimeError:
+        self.__job = Thread(target=self.__work, daemon=True)
+        self.__job.start()
+
+  def resume(self):
+    """
+    Starts the Sender if it's not running and some jobs are queued, the check and the start are done together so that the concurrent requests start it only once
+    """
+    with self.__cond:
+      if not self.__started and not self.__queue.empty():
+        self.start()
 
   def join(self, timeout: float | None = None):
     """
@@ -127,4 +222,5 @@ class Sender:
     """
     Tells if the Sender is doing some jobs
     """
-    return self.__job.is_alive()
+    with self.__cond:
+      return self.__started
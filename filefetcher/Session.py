@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+from threading import Lock
+import statistics
+import time
+
+# Weight of the newest sample into the smoothed download rate
+SMOOTHING = 0.3
+
+# A node is slow when its rate is below the median rate of the file divided by this factor
+SLOW_FACTOR = 3.0
+
+# Bounds of the time given to a single chunk (In Seconds)
+MIN_CHUNK_TIMEOUT = 15.0
+MAX_CHUNK_TIMEOUT = 300.0
+
+# Download rate assumed for a chunk when no node has been measured yet (Bytes per Second)
+DEFAULT_RATE = 256 * 1024
+
+
+@dataclass
+class SourceRate:
+  """
+  Class keeps the download rate of a file from a single node
+  Args:
+    rate: The smoothed download rate (Bytes per Second)
+    chunks: The count of chunks downloaded from the node
+    failures: The count of chunks which failed or timed out from the node
+  """
+
+  rate: float = 0.0
+  chunks: int = 0
+  failures: int = 0
+
+
+class DownloadSession:
+  """
+  Class refers to the download of a single file from all the nodes holding its chunks. It measures the download rate of every node, so that the chunks go to the fastest nodes with a free slot and move away from the slow ones.
+  """
+
+  def __init__(self, filename: str, total_chunks: int):
+    """
+    Args:
+      filename: The name of the file
+      total_chunks: The total chunks of the file
+    """
+    self.filename = filename
+    self.total_chunks = total_chunks
+    self.started = time.time()
+    self.__lock = Lock()
+    self.__sources: dict[str, SourceRate] = {}
+
+  def record(self, ip_address: str, size: int, seconds: float):
+    """
+    Records a chunk downloaded from a node
+    Args:
+      ip_address: The IP Address of the node
+      size: The size of the chunk (In Bytes)
+      seconds: The time taken for downloading the chunk
+    """
+    rate = size / max(seconds, 0.001)
+    with self.__lock:
+      source = self.__sources.setdefault(ip_address, SourceRate())
+      source.rate = rate if source.chunks == 0 else (1 - SMOOTHING) * source.rate + SMOOTHING * rate
+      source.chunks += 1
+
+  def fail(self, ip_address: str):
+    """
+    Records a chunk which failed or timed out from a node, the rate of the node is halved so that the next chunks go to other nodes
+    Args:
+      ip_address: The IP Address of the node
+    """
+    with self.__lock:
+      source = self.__sources.setdefault(ip_address, SourceRate())
+      source.rate /= 2
+      source.failures += 1
+
+  def median_rate(self) -> float | None:
+    """
+    Get the median download rate of the measured nodes
+    Returns:
+      float | None: The rate (Bytes per Second), None if no node is measured yet
+    """
+    with self.__lock:
+      rates = [s.rate for s in self.__sources.values() if s.chunks > 0]
+    return statistics.median(rates) if rates else None
+
+  def expected_rate(self, ip_address: str) -> float:
+    """
+    Get the expected download rate of a node, the nodes which are not measured yet are expected at the median rate so that they get tried
+    Args:
+      ip_address: The IP Address of the node
+    Returns:
+      float: The rate (Bytes per Second)
+    """
+    with self.__lock:
+      source = self.__sources.get(ip_address)
+      if source is not None and (source.chunks > 0 or source.failures > 0):
+        return source.rate
+    return self.median_rate() or DEFAULT_RATE
+
+  def is_slow(self, ip_address: str) -> bool:
+    """
+    Check if a node is much slower than the other nodes of the file
+    Args:
+      ip_address: The IP Address of the node
+    Returns:
+      bool: Returns True if the node is slow, otherwise False
+    """
+    median = self.median_rate()
+    if median is None:
+      return False
+    return self.expected_rate(ip_address) < median / SLOW_FACTOR
+
+  def rank(self, sources: list[tuple[str, int]]) -> list[tuple[str, int]]:
+    """
+    Orders the nodes by their expected download rate, fastest first
+    Args:
+      sources: The IP Address and the port of the nodes
+    Returns:
+      list[tuple[str, int]]: The nodes, fastest first
+    """
+    return sorted(sources, key=lambda s: self.expected_rate(s[0]), reverse=True)
+
+  def chunk_timeout(self, size: int) -> float:
+    """
+    Get the time given for downloading a chunk, after which the chunk is moved to another node. It allows the chunk to be few times slower than the median rate of the file.
+    Args:
+      size: The size of the chunk (In Bytes)
+    Returns:
+      float: The timeout (In Seconds)
+    """
+    rate = self.median_rate() or DEFAULT_RATE
+    return min(max(SLOW_FACTOR * size / rate, MIN_CHUNK_TIMEOUT), MAX_CHUNK_TIMEOUT)
+
+  def sources(self) -> dict[str, SourceRate]:
+    """
+    Get the measured nodes of the file
+    Returns:
+      dict[str, SourceRate]: The download rates by the IP Address of the nodes
+    """
+    with self.__lock:
+      return {ip: SourceRate(s.rate, s.chunks, s.failures) for ip, s in self.__sources.items()}
+
+  def total_rate(self) -> float:
+    """
+    Get the sum of the download rates of the nodes, which is the expected download rate of the file
+    Returns:
+      float: The rate (Bytes per Second)
+    """
+    with self.__lock:
+      return sum(s.rate for s in self.__sources.values())
@@ -0,0 +1,134 @@
+from registry.File.Bitmap import ChunkBitmap
+
+# Count of chunks announced to a downloader which it hasn't confirmed yet
+DEFAULT_WINDOW = 8
+
+# An announced chunk not confirmed in this time is taken as downloaded from other node (In Seconds)
+ANNOUNCE_TIMEOUT = 120.0
+
+# Delay before announcing again to a downloader which failed to receive an announcement, doubled on every failure (In Seconds)
+RETRY_AFTER = 2.0
+MAX_RETRY_AFTER = 60.0
+
+# A downloader is forgotten after this many failures in a row, or when it's silent for this long (In Seconds)
+MAX_FAILURES = 5
+IDLE_TIMEOUT = 600.0
+
+
+class AnnounceWindow:
+  """
+  AnnounceWindow keeps the chunks of a file announced to a single downloader. Up to `size` announced chunks can be waiting for the confirmation of the downloader, and every confirmation frees a slot for the next chunk held by the current node.
+  """
+
+  def __init__(self, filename: str, ip_address: str, port: int, total_chunks: int, now: float, size: int = DEFAULT_WINDOW):
+    """
+    Args:
+      filename: The name of the file
+      ip_address: The IP Address of the downloader
+      port: The port number of the downloader
+      total_chunks: The total chunks of the file
+      now: The current time (Monotonic)
+      size: The count of chunks which can wait for the confirmation of the downloader
+    """
+    self.filename = filename
+    self.ip_address = ip_address
+    self.port = port
+    self.size = size
+    # Chunks announced to the downloader or confirmed by it
+    self.sent = ChunkBitmap(total_chunks)
+    # Announced chunks waiting for the confirmation, with the time of their announcement
+    self.outstanding: dict[int, float] = {}
+    self.failures = 0
+    self.retry_at = 0.0
+    self.last_seen = now
+
+  def ack(self, chunk: int, now: float):
+    """
+    Records the confirmation of the downloader that it has downloaded a chunk
+    Args:
+      chunk: The number of the chunk
+      now: The current time (Monotonic)
+    Raises:
+      IndexError: If the chunk is out of the range
+    """
+    self.sent.set(chunk)
+    self.outstanding.pop(chunk, None)
+    self.last_seen = now
+    self.failures = 0
+    self.retry_at = 0.0
+
+  def fill(self, held: ChunkBitmap, now: float) -> list[int]:
+    """
+    Picks the chunks to announce next, the lowest chunks held by the current node which were not announced yet, as many as the free slots of the window
+    Args:
+      held: The bitmap of the chunks held by the current node
+      now: The current time (Monotonic)
+    Returns:
+      list[int]: The chunks to announce, they are marked as announced
+    """
+    for chunk, announced_at in list(self.outstanding.items()):
+      if now - announced_at >= ANNOUNCE_TIMEOUT:
+        del self.outstanding[chunk]
+
+    if now < self.retry_at:
+      return []
+
+    free = self.size - len(self.outstanding)
+    chunks: list[int] = []
+    if free <= 0:
+      return chunks
+    for chunk in self.sent.missing():
+      if held.has(chunk):
+        chunks.append(chunk)
+        if len(chunks) == free:
+          break
+
+    for chunk in chunks:
+      self.sent.set(chunk)
+      self.outstanding[chunk] = now
+    return chunks
+
+  def delivered(self, chunk: int):
+    """
+    Frees the slot of an announced chunk which the downloader doesn't need, because it has the chunk already
+    Args:
+      chunk: The number of the chunk
+    """
+    self.outstanding.pop(chunk, None)
+
+  def failed(self, chunk: int, now: float):
+    """
+    Records that an announcement didn't reach the downloader, the chunk is announced again after a delay
+    Args:
+      chunk: The number of the chunk
+      now: The current time (Monotonic)
+    """
+    self.sent.clear(chunk)
+    self.outstanding.pop(chunk, None)
+    self.failures += 1
+    self.retry_at = now + min(RETRY_AFTER * 2 ** (self.failures - 1), MAX_RETRY_AFTER)
+
+  def is_done(self) -> bool:
+    """
+    Check if all the chunks are announced, and no announcement is waiting
+    """
+    return self.sent.is_complete() and not self.outstanding
+
+  def is_dead(self, now: float) -> bool:
+    """
+    Check if the downloader keeps failing, or is silent for too long
+    Args:
+      now: The current time (Monotonic)
+    """
+    return self.failures >= MAX_FAILURES or now - self.last_seen >= IDLE_TIMEOUT
+
+  def deadline(self) -> float:
+    """
+    Get the time when the window can change without any event, by a retry or an expired announcement (Monotonic)
+    """
+    times = [self.last_seen + IDLE_TIMEOUT]
+    if self.retry_at:
+      times.append(self.retry_at)
+    if self.outstanding:
+      times.append(min(self.outstanding.values()) + ANNOUNCE_TIMEOUT)
+    return min(times)
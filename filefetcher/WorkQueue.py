@@ -0,0 +1,259 @@
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Hashable
+from . import Worker
+import heapq
+import json
+import sqlite3
+import time
+
+# The changes are written to the disk together, after this many changes or this much time (In Seconds)
+COMMIT_BATCH = 256
+COMMIT_INTERVAL = 1.0
+
+# Delay before a failed job is taken again, doubled on every failure (In Seconds)
+RETRY_AFTER = 1.0
+MAX_RETRY_AFTER = 60.0
+
+
+def chunk_key(work: Worker.FileWorker) -> tuple[str, int]:
+  """
+  The default key of a job, a chunk is queued only once whichever node announced it
+  """
+  return (work.filename, work.chunk)
+
+
+@dataclass
+class _Entry:
+  """
+  A queued job
+  """
+
+  work: Worker.FileWorker
+  priority: int
+  not_before: float
+  attempts: int
+  version: int
+
+
+class WorkQueue:
+  """
+  WorkQueue is a persistent queue of the chunk jobs, it keeps a single job per key, so the same chunk announced by many nodes is queued once. The ready jobs are taken by their priority and then in the order of their arrival, and a failed job waits till its delay (Growing with every failure) is over. The jobs are kept in memory, and the changes are written to a SQLite database in batches.
+
+  A taken job stays in the queue until it's removed or retried, so the jobs being worked on are not lost when the node stops.
+  """
+
+  def __init__(
+      self,
+      path: str,
+      key: Callable[[Worker.FileWorker], Hashable] = chunk_key,
+      commit_batch: int = COMMIT_BATCH,
+      commit_interval: float = COMMIT_INTERVAL,
+  ):
+    """
+    Args:
+      path: The path of the database
+      key: The function giving the key of a job, the jobs with the same key are queued once
+      commit_batch: The count of changes written to the disk together
+      commit_interval: The most time for which the changes are kept in memory (In Seconds)
+    """
+    self.__key = key
+    self.commit_batch = commit_batch
+    self.commit_interval = commit_interval
+    self.__lock = Lock()
+    self.__entries: dict[Hashable, _Entry] = {}
+    self.__taken: set[Hashable] = set()
+    # Heaps of (-priority, version, key) for the ready jobs, and (not_before, version, key) for the delayed ones
+    self.__ready: list[tuple[int, int, Hashable]] = []
+    self.__delayed: list[tuple[float, int, Hashable]] = []
+    self.__version = 0
+    # Keys changed since the last commit
+    self.__dirty: set[Hashable] = set()
+    self.__committed_at = time.monotonic()
+
+    self.__db = sqlite3.connect(path, check_same_thread=False)
+    self.__db.execute("PRAGMA journal_mode=WAL")
+    self.__db.execute("PRAGMA synchronous=NORMAL")
+    self.__db.execute(
+        "CREATE TABLE IF NOT EXISTS jobs (key TEXT PRIMARY KEY, priority INTEGER, not_before REAL, attempts INTEGER, work TEXT)"
+    )
+    self.__db.commit()
+    for _, priority, not_before, attempts, work in self.__db.execute(
+        "SELECT key, priority, not_before, attempts, work FROM jobs ORDER BY rowid"
+    ):
+      work = Worker.FileWorker.from_dict(json.loads(work))
+      self.__push(self.__key(work), _Entry(work, priority, not_before, attempts, 0))
+
+  def __push(self, key: Hashable, entry: _Entry):
+    """
+    Puts a job into the heap it belongs to, the older heap items of the job become stale. Must be called while holding the lock
+    """
+    self.__version += 1
+    entry.version = self.__version
+    self.__entries[key] = entry
+    if entry.not_before > 0:
+      heapq.heappush(self.__delayed, (entry.not_before, entry.version, key))
+    else:
+      heapq.heappush(self.__ready, (-entry.priority, entry.version, key))
+
+  def __is_current(self, key: Hashable, version: int) -> bool:
+    entry = self.__entries.get(key)
+    return entry is not None and entry.version == version and key not in self.__taken
+
+  def __promote(self, now: float):
+    """
+    Moves the delayed jobs which are due into the ready heap, must be called while holding the lock
+    """
+    while self.__delayed and self.__delayed[0][0] <= now:
+      _, version, key = heapq.heappop(self.__delayed)
+      if self.__is_current(key, version):
+        entry = self.__entries[key]
+        heapq.heappush(self.__ready, (-entry.priority, version, key))
+
+  def __changed(self, key: Hashable):
+    """
+    Marks a job to be written to the disk, and writes the changes when enough of them are gathered. Must be called while holding the lock
+    """
+    self.__dirty.add(key)
+    if len(self.__dirty) >= self.commit_batch or time.monotonic() - self.__committed_at >= self.commit_interval:
+      self.__commit()
+
+  def __commit(self):
+    """
+    Writes the changed jobs to the disk in a single transaction, must be called while holding the lock
+    """
+    if self.__dirty:
+      upserts = []
+      deletes = []
+      for key in self.__dirty:
+        encoded = json.dumps(key)
+        if (entry := self.__entries.get(key)) is None:
+          deletes.append((encoded,))
+        else:
+          upserts.append((encoded, entry.priority, entry.not_before, entry.attempts, json.dumps(entry.work.to_dict())))
+      with self.__db:
+        self.__db.executemany("DELETE FROM jobs WHERE key = ?", deletes)
+        self.__db.executemany("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)", upserts)
+      self.__dirty.clear()
+    self.__committed_at = time.monotonic()
+
+  def put(self, work: Worker.FileWorker, priority: int = 0) -> bool:
+    """
+    Adds a job, if a job with the same key is queued already then only its priority is raised
+    Args:
+      work: The job
+      priority: The jobs with a higher priority are taken first
+    Returns:
+      bool: Returns True if the job is added, False if it was queued already
+    """
+    key = self.__key(work)
+    with self.__lock:
+      if (entry := self.__entries.get(key)) is not None:
+        if priority > entry.priority:
+          entry.priority = priority
+          if key not in self.__taken:
+            self.__push(key, entry)
+          self.__changed(key)
+        return False
+      self.__push(key, _Entry(work, priority, 0.0, 0, 0))
+      self.__changed(key)
+      return True
+
+  def take(self, limit: int = 1, now: float | None = None) -> list[Worker.FileWorker]:
+    """
+    Takes the ready jobs, they are not taken again until they are retried
+    Args:
+      limit: The most count of jobs taken
+      now: The current time (Unix Time)
+    Returns:
+      list[FileWorker]: The jobs, the highest priority first
+    """
+    now = time.time() if now is None else now
+    works: list[Worker.FileWorker] = []
+    with self.__lock:
+      self.__promote(now)
+      while self.__ready and len(works) < limit:
+        _, version, key = heapq.heappop(self.__ready)
+        if self.__is_current(key, version):
+          self.__taken.add(key)
+          works.append(self.__entries[key].work)
+    return works
+
+  def retry(self, work: Worker.FileWorker, now: float | None = None):
+    """
+    Gives back a taken job which failed, it's taken again after a delay
+    Args:
+      work: The job
+      now: The current time (Unix Time)
+    """
+    now = time.time() if now is None else now
+    key = self.__key(work)
+    with self.__lock:
+      if (entry := self.__entries.get(key)) is None:
+        return
+      self.__taken.discard(key)
+      entry.work = work
+      entry.attempts += 1
+      entry.not_before = now + min(RETRY_AFTER * 2 ** (entry.attempts - 1), MAX_RETRY_AFTER)
+      self.__push(key, entry)
+      self.__changed(key)
+
+  def remove(self, work: Worker.FileWorker):
+    """
+    Removes a job, used when the job is done or not needed anymore
+    Args:
+      work: The job
+    """
+    key = self.__key(work)
+    with self.__lock:
+      self.__taken.discard(key)
+      if self.__entries.pop(key, None) is not None:
+        self.__changed(key)
+
+  def __contains__(self, work: Worker.FileWorker) -> bool:
+    with self.__lock:
+      return self.__key(work) in self.__entries
+
+  def __len__(self) -> int:
+    with self.__lock:
+      return len(self.__entries)
+
+  def empty(self) -> bool:
+    """
+    Check if no job is queued, the taken jobs count as queued
+    """
+    return len(self) == 0
+
+  def next_due(self, now: float | None = None) -> float | None:
+    """
+    Get the time when the next job can be taken
+    Args:
+      now: The current time (Unix Time)
+    Returns:
+      float | None: The time (Unix Time), None if all the jobs are taken
+    """
+    now = time.time() if now is None else now
+    with self.__lock:
+      self.__promote(now)
+      while self.__ready and not self.__is_current(self.__ready[0][2], self.__ready[0][1]):
+        heapq.heappop(self.__ready)
+      if self.__ready:
+        return now
+      while self.__delayed and not self.__is_current(self.__delayed[0][2], self.__delayed[0][1]):
+        heapq.heappop(self.__delayed)
+      return self.__delayed[0][0] if self.__delayed else None
+
+  def flush(self):
+    """
+    Writes the gathered changes to the disk now
+    """
+    with self.__lock:
+      self.__commit()
+
+  def close(self):
+    """
+    Writes the gathered changes and closes the database
+    """
+    with self.__lock:
+      self.__commit()
+      self.__db.close()
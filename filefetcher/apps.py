@@ -3,6 +3,10 @@ from environments import Env
 import os
 from .Fetcher import Fetcher
 from .Sender import Sender
+from .Availability import Availability
+from .Announcer import Announcer
+from .Recovery import Recovery, PEERS
+from registry.Node.Gossip import Gossip
 
 
 class FilefetcherConfig(AppConfig):
@@ -15,19 +19,55 @@ class FilefetcherConfig(AppConfig):
     """
     Env.set("LOGFILE", os.path.join("error.log"))
     Env.set("FILE_DOWNLOADER_SAVE", os.path.join(
-        Env.get("DOWNLOADS"), "chaindata", "fetcher.queue"))
+        Env.get("DOWNLOADS"), "chaindata", "fetcher.db"))
     Env.set("FILE_SENDER_SAVE", os.path.join(
-        Env.get("DOWNLOADS"), "chaindata", "sender.queue"))
+        Env.get("DOWNLOADS"), "chaindata", "sender.db"))
 
-    file_downloader = Fetcher()
+    # Limits of the parallel downloads (In total, and from a single node)
+    workers = os.getenv("FETCHER_WORKERS", "8")
+    per_peer = os.getenv("FETCHER_PER_PEER", "2")
+    window = os.getenv("SENDER_WINDOW", "8")
+    pull = os.getenv("FETCHER_PULL", "1")
+    verify = os.getenv("RECOVERY_VERIFY", "0")
+    if not workers.isnumeric() or int(workers) <= 0:
+      raise ValueError("FETCHER_WORKERS Environment variable can only be positive integers")
+    if not per_peer.isnumeric() or int(per_peer) <= 0:
+      raise ValueError("FETCHER_PER_PEER Environment variable can only be positive integers")
+    if not window.isnumeric() or int(window) <= 0:
+      raise ValueError("SENDER_WINDOW Environment variable can only be positive integers")
+    if pull not in ("0", "1"):
+      raise ValueError("FETCHER_PULL Environment variable can only be 0 or 1")
+    if verify not in ("0", "1"):
+      raise ValueError("RECOVERY_VERIFY Environment variable can only be 0 or 1")
+
+    # Chunks held by the other nodes
+    Env.set("AVAILABILITY", Availability())
+
+    # Chunk announcements are gathered and sent in batches
+    announcer = Announcer()
+    Env.set("ANNOUNCER", announcer)
+    announcer.start()
+
+    file_downloader = Fetcher(int(workers), int(per_peer), pull == "1")
     Env.set("FILE_DOWNLOADER", file_downloader)
 
-    file_sender = Sender()
+    # The partial downloads are reconciled with their recorded progress, the node may have stopped in the middle of a chunk
+    filelist = Env.get("FILES")
+    recovery = Recovery(Env.get("DOWNLOADS"), verify=verify == "1")
+    recovered = recovery.run(filelist, Env.get("MANIFESTS"), Env.get("CHUNK_STORE"))
+    machine_ip: str = Env.get("IPADDRESS")
+    peers = [peer for peer in Env.get("NODES").weighted_picks(PEERS + 1) if peer[0] != machine_ip][:PEERS]
+    for work in recovery.works(filelist, Env.get("MANIFESTS"), recovered, peers):
+      file_downloader.add_work(work)
+
+    file_sender = Sender(int(window))
     Env.set("FILE_SENDER", file_sender)
 
-    # Start the threads
-    try:
-      file_downloader.start()
-      file_sender.start()
-    except IndexError:
-      pass
+    # Receiving the chunk announcements spread by gossip
+    from .views import gossip_chunks_handler
+    gossip: Gossip = Env.get("GOSSIP")
+    gossip.register("chunks", gossip_chunks_handler)
+
+    # Start the threads, each only when it has jobs left from the last run
+    file_downloader.resume()
+    file_sender.resume()
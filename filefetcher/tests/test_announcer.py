@@ -0,0 +1,60 @@
+from unittest.mock import patch, MagicMock
+from django.test import TestCase
+
+from ..Announcer import Announcer, Announcement, encode, decode
+
+
+class AnnouncementCodingTest(TestCase):
+  """Tests for encoding and decoding the announcements."""
+
+  def test_round_trip(self):
+    """Test that the decoded announcements match the encoded ones."""
+    payload = encode("10.0.0.1", 8000, [
+        Announcement("movie.mp4", 10, 1, "a" * 40),
+        Announcement("movie.mp4", 10, 2, "b" * 40),
+        Announcement("song.mp3", 2, 1, "c" * 40),
+    ])
+    works = decode(payload)
+    self.assertEqual([(w.filename, w.chunk, w.total_chunks, w.sha1) for w in works], [
+        ("movie.mp4", 1, 10, "a" * 40),
+        ("movie.mp4", 2, 10, "b" * 40),
+        ("song.mp3", 1, 2, "c" * 40),
+    ])
+    self.assertTrue(all(w.ip_address == "10.0.0.1" and w.port == 8000 for w in works))
+
+  def test_invalid_payload(self):
+    """Test that an invalid payload raises ValueError."""
+    for payload in (b"not json", b'{"ip_address": "10.0.0.1"}', b'{"ip_address": "a", "port": 1, "files": []}'):
+      with self.assertRaises(ValueError):
+        decode(payload)
+
+
+class AnnouncerTest(TestCase):
+  """Tests for the Announcer class."""
+
+  def setUp(self):
+    self.announcer = Announcer(interval=0)
+
+  @patch("filefetcher.Announcer.httpx.post")
+  def test_flush_batches_per_node(self, post: MagicMock):
+    """Test that the announcements to a node are sent in a single request."""
+    post.return_value.json.return_value = {"status": True, "queued": {"movie.mp4": [1]}}
+    first = self.announcer.announce("10.0.0.1", 8000, Announcement("movie.mp4", 10, 1, "a" * 40))
+    second = self.announcer.announce("10.0.0.1", 8000, Announcement("movie.mp4", 10, 2, "b" * 40))
+    self.assertEqual(self.announcer.pending(), 2)
+
+    self.announcer.flush()
+    self.assertTrue(first.result(timeout=5))
+    self.assertFalse(second.result(timeout=5))
+    self.assertEqual(post.call_count, 1)
+    self.assertEqual(len(decode(post.call_args.kwargs["content"])), 2)
+    self.assertEqual(self.announcer.pending(), 0)
+
+  @patch("filefetcher.Announcer.httpx.post")
+  def test_unreachable_node(self, post: MagicMock):
+    """Test that the announcements fail when the node can't be reached."""
+    post.side_effect = ConnectionError("unreachable")
+    future = self.announcer.announce("10.0.0.1", 8000, Announcement("movie.mp4", 10, 1, "a" * 40))
+    self.announcer.flush()
+    with self.assertRaises(ConnectionError):
+      future.result(timeout=5)
@@ -0,0 +1,76 @@
+from django.test import TestCase
+import numpy as np
+
+from ..Availability import Availability
+from ..Picker import rarest_first
+from ..Worker import FileWorker
+from registry.File.Bitmap import ChunkBitmap
+
+
+def make_work(chunk: int, ip_address: str = "10.0.0.1", filename: str = "movie.mp4") -> FileWorker:
+  """Creates the work of a chunk of a 10 chunks file."""
+  return FileWorker(filename, chunk, 10, 0, 0, "sha1", ip_address, 8000)
+
+
+class AvailabilityTest(TestCase):
+  """Tests for the Availability class."""
+
+  def test_counts_follow_updates(self):
+    """Test that the counts follow the bitmaps and the announcements."""
+    availability = Availability()
+    first = ChunkBitmap(10)
+    for chunk in (1, 2, 3):
+      first.set(chunk)
+    availability.update("movie.mp4", "10.0.0.1", 8000, first)
+    availability.have("movie.mp4", "10.0.0.2", 8000, 3, 10)
+    availability.have("movie.mp4", "10.0.0.2", 8000, 3, 10)
+
+    counts = availability.counts("movie.mp4")
+    self.assertEqual(counts[:4].tolist(), [1, 1, 2, 0])
+    self.assertEqual(sorted(availability.holders("movie.mp4", 3)), [("10.0.0.1", 8000), ("10.0.0.2", 8000)])
+
+    # Replacing the bitmap of a node removes its old chunks
+    availability.update("movie.mp4", "10.0.0.1", 8000, ChunkBitmap(10))
+    self.assertEqual(availability.counts("movie.mp4")[:4].tolist(), [0, 0, 1, 0])
+
+    availability.forget("10.0.0.2")
+    self.assertEqual(int(availability.counts("movie.mp4").sum()), 0)
+
+  def test_mismatched_total(self):
+    """Test that a bitmap of a different size is rejected."""
+    availability = Availability()
+    availability.have("movie.mp4", "10.0.0.1", 8000, 1, 10)
+    with self.assertRaises(ValueError):
+      availability.update("movie.mp4", "10.0.0.2", 8000, ChunkBitmap(12))
+
+
+class RarestFirstTest(TestCase):
+  """Tests for the rarest first picker."""
+
+  def test_rarest_chunk_first(self):
+    """Test that the chunks held by fewer nodes come first."""
+    availability = Availability()
+    for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+      availability.have("movie.mp4", ip, 8000, 1, 10)
+    availability.have("movie.mp4", "10.0.0.1", 8000, 2, 10)
+    availability.have("movie.mp4", "10.0.0.2", 8000, 2, 10)
+    availability.have("movie.mp4", "10.0.0.3", 8000, 5, 10)
+
+    works = [make_work(1), make_work(2), make_work(5)]
+    order = rarest_first(works, availability, np.random.default_rng(1))
+    self.assertEqual([works[i].chunk for i in order], [5, 2, 1])
+
+  def test_ties_are_shuffled(self):
+    """Test that equally rare chunks are not always picked in the same order."""
+    availability = Availability()
+    works = [make_work(chunk) for chunk in range(1, 11)]
+    for work in works:
+      availability.have(work.filename, work.ip_address, work.port, work.chunk, 10)
+
+    rng = np.random.default_rng(7)
+    firsts = {rarest_first(works, availability, rng)[0] for _ in range(20)}
+    self.assertGreater(len(firsts), 1)
+
+  def test_unknown_file(self):
+    """Test that chunks of an unknown file are still ordered."""
+    self.assertEqual(sorted(rarest_first([make_work(1), make_work(2)], Availability())), [0, 1])
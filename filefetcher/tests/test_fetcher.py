@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Callable
+from urllib.parse import parse_qs, urlparse
+from django.test import TestCase
+
+from environments import Env
+from .. import WorkQueue
+from ..Availability import Availability
+from ..Fetcher import Fetcher
+from ..Worker import FileWorker
+from registry.File.Bitmap import ChunkBitmap
+from registry.File.Cache import ChunkCache
+from registry.File.FileInfo import FileInfo
+from registry.File.List import FileList
+from registry.File.Manifest import Manifest, ManifestStore
+from registry.File.Merkle import merkle_root
+from registry.Node.List import NodeList
+
+CHUNK = 1000
+
+
+class Peer:
+  """A node serving the chunks of a file over HTTP, which can be told to misbehave."""
+
+  def __init__(self, ip_address: str, data: bytes, manifest: Manifest):
+    self.data = data
+    self.manifest = manifest
+    self.status = 200
+    # Seconds waited before answering a range, by its starting byte address
+    self.delays: dict[int, float] = {}
+    # Changes the body of the next responses, one per response
+    self.faults: list[Callable[[bytes], bytes]] = []
+    self.requests: list[tuple[int, int]] = []
+    self.lock = Lock()
+
+    peer = self
+
+    class Handler(BaseHTTPRequestHandler):
+
+      def log_message(self, *args):
+        pass
+
+      def reply(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+      def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/manifest":
+          return self.reply(200, json.dumps(peer.manifest.to_dict()).encode())
+        if url.path != "/download" or parse_qs(url.query).get("file") != ["movie.mp4"]:
+          return self.reply(404, b"")
+
+        start, end = (int(n) for n in self.headers["Range"].removeprefix("bytes=").split("-"))
+        with peer.lock:
+          peer.requests.append((start, end))
+          fault = peer.faults.pop(0) if peer.faults else None
+        time.sleep(peer.delays.get(start, 0))
+        if peer.status != 200:
+          return self.reply(peer.status, b"")
+        body = peer.data[start:end + 1]
+        self.reply(206, fault(body) if fault is not None else body)
+
+      def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if urlparse(self.path).path == "/have":
+          total = peer.manifest.total
+          bitmap = ChunkBitmap(total)
+          for chunk in range(1, total + 1):
+            bitmap.set(chunk)
+          return self.reply(200, json.dumps({"status": True, "total_chunks": total, "bitmap": bitmap.to_base64()}).encode())
+        self.reply(200, b'{"status": true}')
+
+    self.server = ThreadingHTTPServer((ip_address, 0), Handler)
+    self.ip_address, self.port = self.server.server_address
+    Thread(target=self.server.serve_forever, daemon=True).start()
+
+  def close(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+
+class Recorder:
+  """Stands for the Sender and the Announcer, records the completed chunks in their order."""
+
+  def __init__(self):
+    self.chunks: list[int] = []
+
+  def notify(self, filename: str):
+    pass
+
+  def publish(self, announcement):
+    self.chunks.append(announcement.chunk)
+
+
+class FetcherTest(TestCase):
+  """Tests for the downloads of the Fetcher from stub nodes."""
+
+  def setUp(self):
+    tmpdir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmpdir.cleanup)
+    self.downloads = tmpdir.name
+    os.makedirs(os.path.join(self.downloads, "manifests"))
+    os.makedirs(os.path.join(self.downloads, "bases"))
+    self.addCleanup(setattr, WorkQueue, "RETRY_AFTER", WorkQueue.RETRY_AFTER)
+    WorkQueue.RETRY_AFTER = 0.05
+
+    self.data = random.Random(4).randbytes(CHUNK * 5)
+    self.hashes = [hashlib.sha1(self.data[i:i + CHUNK]).hexdigest() for i in range(0, len(self.data), CHUNK)]
+    self.manifest = Manifest(len(self.hashes), self.hashes)
+    self.filelist = FileList()
+    self.nodelist = NodeList()
+    self.availability = Availability()
+    self.recorder = Recorder()
+    for name, value in (
+        ("DOWNLOADS", self.downloads),
+        ("BASES", os.path.join(self.downloads, "bases")),
+        ("LOGFILE", os.path.join(self.downloads, "error.log")),
+        ("FILE_DOWNLOADER_SAVE", os.path.join(self.downloads, "fetcher.db")),
+        ("FILES", self.filelist),
+        ("NODES", self.nodelist),
+        ("AVAILABILITY", self.availability),
+        ("MANIFESTS", ManifestStore(os.path.join(self.downloads, "manifests"), self.downloads)),
+        ("CHUNK_STORE", None),
+        ("CHUNK_CACHE", ChunkCache(1024 * 1024)),
+        ("COMPRESSOR", None),
+        ("FILE_SENDER", self.recorder),
+        ("ANNOUNCER", self.recorder),
+    ):
+      self.addCleanup(Env.update, name, Env.get(name))
+      Env.update(name, value)
+
+  def peer(self, ip_address: str) -> Peer:
+    """Starts a stub node holding the whole file."""
+    peer = Peer(ip_address, self.data, self.manifest)
+    self.addCleanup(peer.close)
+    self.nodelist.add(peer.ip_address, peer.port)
+    return peer
+
+  def add_file(self, merkle: bool):
+    """Adds the file to be downloaded, with or without a Merkle root."""
+    self.filelist.add("movie.mp4", FileInfo(
+        hashlib.sha512(self.data).hexdigest(), len(self.data), 0, len(self.hashes),
+        merkle_root(self.hashes) if merkle else "", CHUNK,
+    ))
+
+  def work(self, chunk: int, peer: Peer, sha1: bool = True) -> FileWorker:
+    """The announcement of a chunk by the peer."""
+    return FileWorker(
+        "movie.mp4", chunk, len(self.hashes), (chunk - 1) * CHUNK, chunk * CHUNK - 1,
+        self.hashes[chunk - 1] if sha1 else "", peer.ip_address, peer.port,
+    )
+
+  def holds(self, peer: Peer):
+    """Tells the Availability that the peer holds the whole file."""
+    bitmap = ChunkBitmap(len(self.hashes))
+    for chunk in range(1, len(self.hashes) + 1):
+      bitmap.set(chunk)
+    self.availability.update("movie.mp4", peer.ip_address, peer.port, bitmap)
+
+  def download(self, fetcher: Fetcher, works: list[FileWorker]):
+    """Queues the works, and waits till the Fetcher is done."""
+    for work in works:
+      fetcher.add_work(work)
+    fetcher.start()
+    fetcher.join(15)
+    self.assertFalse(fetcher.is_running())
+
+  def assertDownloaded(self):
+    """Asserts that the file is downloaded with the right bytes."""
+    self.assertTrue(self.filelist.isDownloaded("movie.mp4"))
+    with open(os.path.join(self.downloads, "movie.mp4"), "rb") as f:
+      self.assertEqual(f.read(), self.data)
+
+  def test_out_of_order_completion(self):
+    """Test that the chunks downloaded in parallel are completed in any order, and land at their offsets."""
+    peer = self.peer("127.0.0.2")
+    peer.delays[0] = 0.5
+    self.add_file(merkle=False)
+    self.download(Fetcher(workers=5, per_peer=5, pull=False), [self.work(chunk, peer) for chunk in range(1, 6)])
+
+    self.assertDownloaded()
+    self.assertEqual(sorted(self.recorder.chunks), [1, 2, 3, 4, 5])
+    self.assertEqual(self.recorder.chunks[-1], 1)
+
+  def test_corrupt_chunk_in_coalesced_range(self):
+    """Test that a corrupt chunk in the middle of a joined range is the only chunk requested again."""
+    peer = self.peer("127.0.0.2")
+    self.add_file(merkle=True)
+    self.holds(peer)
+    # The chunks after the second are held by one more node, so the second is the rarest and starts the range
+    self.availability.update("movie.mp4", "10.0.0.9", 8000, ChunkBitmap.from_bytes(len(self.hashes), bytes([0b11100])))
+
+    def corrupt(body: bytes) -> bytes:
+      return body[:CHUNK] + bytes(CHUNK) + body[2 * CHUNK:]
+
+    # The first chunk is downloaded alone, as the manifest isn't verified yet
+    peer.faults = [lambda body: body, corrupt]
+    self.download(Fetcher(workers=1, per_peer=1, pull=True), [self.work(1, peer, sha1=False)])
+
+    self.assertDownloaded()
+    self.assertEqual(peer.requests, [(0, CHUNK - 1), (CHUNK, 5 * CHUNK - 1), (2 * CHUNK, 3 * CHUNK - 1)])
+
+  def test_short_body(self):
+    """Test that a chunk cut short is wiped and downloaded again."""
+    peer = self.peer("127.0.0.2")
+    peer.faults = [lambda body: body[:CHUNK // 2]]
+    self.add_file(merkle=False)
+    self.download(Fetcher(workers=1, per_peer=1, pull=False), [self.work(chunk, peer) for chunk in range(1, 6)])
+
+    self.assertDownloaded()
+    self.assertEqual(len(peer.requests), 6)
+
+  def test_oversized_body(self):
+    """Test that the bytes sent after the requested chunks are never written."""
+    peer = self.peer("127.0.0.2")
+    peer.faults = [lambda body: body + b"extra bytes"]
+    self.add_file(merkle=False)
+    self.download(Fetcher(workers=1, per_peer=1, pull=False), [self.work(chunk, peer) for chunk in range(1, 6)])
+
+    self.assertDownloaded()
+    self.assertEqual(os.path.getsize(os.path.join(self.downloads, "movie.mp4")), len(self.data))
+
+  def test_peer_failover(self):
+    """Test that the chunks of a failing node are downloaded from the other node holding them."""
+    failing = self.peer("127.0.0.2")
+    failing.status = 500
+    healthy = self.peer("127.0.0.3")
+    self.add_file(merkle=True)
+    self.holds(failing)
+    self.holds(healthy)
+    self.download(Fetcher(workers=2, per_peer=2, pull=True), [self.work(chunk, failing, sha1=False) for chunk in range(1, 6)])
+
+    self.assertDownloaded()
+    self.assertGreater(len(failing.requests), 0)
+    self.assertFalse(self.nodelist.is_available(failing.ip_address))
+
+  def test_picking_failure(self):
+    """Test that a failure while picking the chunks doesn't stop the worker with chunks left in the queue."""
+    peer = self.peer("127.0.0.2")
+    self.add_file(merkle=False)
+    calls: list[str] = []
+
+    def request(filename: str, ip_address: str, port: int):
+      calls.append(ip_address)
+      if len(calls) == 1:
+        raise KeyError("IPADDRESS")
+
+    self.availability.request = request
+    self.download(Fetcher(workers=1, per_peer=1, pull=False), [self.work(chunk, peer) for chunk in range(1, 6)])
+    self.assertDownloaded()
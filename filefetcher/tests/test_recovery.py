@@ -0,0 +1,129 @@
+import hashlib
+import os
+import random
+import tempfile
+from django.test import TestCase
+
+from ..Recovery import Recovery, covered, data_ranges
+from registry.File.ChunkStore import ChunkStore
+from registry.File.FileInfo import FileInfo
+from registry.File.List import FileList
+from registry.File.Manifest import Manifest, ManifestStore
+
+# Chunks are as large as a block of the filesystem, so an unwritten chunk is a hole
+CHUNK = 4096
+
+
+class RecoveryTest(TestCase):
+  """Tests for the recovery of the partial downloads."""
+
+  def setUp(self):
+    tmpdir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmpdir.cleanup)
+    self.downloads = tmpdir.name
+    self.data = random.Random(3).randbytes(CHUNK * 4)
+    self.hashes = [hashlib.sha1(self.data[i:i + CHUNK]).hexdigest() for i in range(0, len(self.data), CHUNK)]
+    self.info = FileInfo("hash", len(self.data), 0, 4, "root", CHUNK)
+
+    self.filelist = FileList()
+    self.filelist.add("movie.mp4", self.info)
+    os.makedirs(os.path.join(self.downloads, "manifests"))
+    self.manifests = ManifestStore(os.path.join(self.downloads, "manifests"), self.downloads)
+    self.manifests.save("movie.mp4", Manifest(4, self.hashes))
+    self.store = ChunkStore(self.downloads)
+    self.path = os.path.join(self.downloads, "movie.mp4")
+
+  def write(self, chunks: dict[int, bytes], size: int | None = None):
+    """Writes the chunks into a sparse file, like the downloader does."""
+    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+      os.ftruncate(fd, self.info.size if size is None else size)
+      for chunk, data in chunks.items():
+        os.pwrite(fd, data, (chunk - 1) * CHUNK)
+    finally:
+      os.close(fd)
+
+  def chunk(self, chunk: int) -> bytes:
+    """Gives the bytes of a chunk of the file."""
+    return self.data[(chunk - 1) * CHUNK:chunk * CHUNK]
+
+  def test_data_ranges(self):
+    """Test that only the written parts of a sparse file hold data."""
+    self.write({2: self.chunk(2)})
+    fd = os.open(self.path, os.O_RDONLY)
+    try:
+      ranges = data_ranges(fd, self.info.size)
+    finally:
+      os.close(fd)
+    if ranges == [(0, self.info.size)]:
+      self.skipTest("The filesystem doesn't keep holes")
+    self.assertEqual(ranges, [(CHUNK, CHUNK * 2)])
+    self.assertEqual(covered(ranges, CHUNK, CHUNK * 2), (True, True))
+    self.assertEqual(covered(ranges, 0, CHUNK), (False, False))
+
+  def test_unrecorded_chunk_adopted(self):
+    """Test that a chunk written but not recorded is recorded when it matches its hash."""
+    self.filelist.completed("movie.mp4", 1)
+    self.write({1: self.chunk(1), 3: self.chunk(3)})
+    results = Recovery(self.downloads).run(self.filelist, self.manifests, self.store)
+    self.assertEqual(results[0].adopted, {3: self.hashes[2]})
+    self.assertEqual(self.filelist.getMissingChunks("movie.mp4"), [2, 4])
+    self.assertTrue(self.store.has(self.hashes[2]))
+
+  def test_torn_chunk_discarded(self):
+    """Test that a chunk written only partly is overwritten with zeros and not recorded."""
+    self.write({3: self.chunk(3)[:100]})
+    results = Recovery(self.downloads).run(self.filelist, self.manifests, self.store)
+    self.assertEqual(results[0].discarded, [3])
+    self.assertEqual(self.filelist.getMissingChunks("movie.mp4"), [1, 2, 3, 4])
+    with open(self.path, 'rb') as f:
+      self.assertEqual(f.read()[CHUNK * 2:CHUNK * 3], bytes(CHUNK))
+
+  def test_short_file(self):
+    """Test that the recorded chunks past the end of a short file are downloaded again, and the file gets its full size."""
+    for chunk in (1, 2, 3):
+      self.filelist.completed("movie.mp4", chunk)
+    self.write({1: self.chunk(1), 2: self.chunk(2)}, size=CHUNK * 2)
+    results = Recovery(self.downloads).run(self.filelist, self.manifests, self.store)
+    self.assertEqual(results[0].lost, [3])
+    self.assertEqual(self.filelist.getMissingChunks("movie.mp4"), [3, 4])
+    self.assertEqual(os.path.getsize(self.path), self.info.size)
+
+  def test_missing_file(self):
+    """Test that all the recorded chunks of a missing file are downloaded again."""
+    self.filelist.completed("movie.mp4", 1)
+    recovery = Recovery(self.downloads)
+    results = recovery.run(self.filelist, self.manifests, self.store)
+    self.assertEqual(results[0].lost, [1])
+    self.assertEqual(self.filelist.getCompletedCount("movie.mp4"), 0)
+
+    works = recovery.works(self.filelist, self.manifests, results, [("10.0.0.1", 8000)])
+    self.assertEqual([(w.chunk, w.sha1) for w in works], [(1, self.hashes[0])])
+
+  def test_works_spread(self):
+    """Test that the recovered downloads are spread over the nodes in turn."""
+    for chunk in (1, 2, 3):
+      self.filelist.completed("movie.mp4", chunk)
+    results = Recovery(self.downloads).run(self.filelist, self.manifests, self.store)
+    self.assertEqual(results[0].lost, [1, 2, 3])
+
+    peers = [("10.0.0.1", 8000), ("10.0.0.2", 8000)]
+    works = Recovery(self.downloads).works(self.filelist, self.manifests, results, peers)
+    self.assertEqual([(w.chunk, w.ip_address) for w in works], [(1, "10.0.0.1"), (2, "10.0.0.2"), (3, "10.0.0.1")])
+    self.assertEqual(Recovery(self.downloads).works(self.filelist, self.manifests, results, []), [])
+
+  def test_verify_recorded(self):
+    """Test that the recorded chunks are hashed too when asked, and the wrong ones are downloaded again."""
+    self.filelist.completed("movie.mp4", 1)
+    self.filelist.completed("movie.mp4", 2)
+    self.write({1: self.chunk(1), 2: self.chunk(1)})
+    self.assertEqual(Recovery(self.downloads).run(self.filelist, self.manifests, self.store), [])
+    results = Recovery(self.downloads, verify=True).run(self.filelist, self.manifests, self.store)
+    self.assertEqual(results[0].lost, [2])
+    self.assertEqual(self.filelist.getMissingChunks("movie.mp4"), [2, 3, 4])
+
+  def test_downloaded_file_skipped(self):
+    """Test that the downloaded files are not read."""
+    for chunk in range(1, 5):
+      self.filelist.completed("movie.mp4", chunk)
+    self.assertEqual(Recovery(self.downloads).run(self.filelist, self.manifests, self.store), [])
@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import Future
+from threading import Thread
+from django.test import TestCase
+
+from environments import Env
+from ..Sender import Sender
+from ..Worker import FileWorker
+from registry.File.FileInfo import FileInfo
+from registry.File.List import FileList
+from registry.File.Manifest import Manifest, ManifestStore
+
+
+class Announcer:
+  """Stands for the Announcer, the announcements are delivered when the test says so."""
+
+  def __init__(self):
+    self.futures: list[Future] = []
+
+  def announce(self, ip_address: str, port: int, announcement) -> Future:
+    future = Future()
+    self.futures.append(future)
+    return future
+
+
+class SenderTest(TestCase):
+  """Tests for the confirmations kept by the Sender."""
+
+  def setUp(self):
+    tmpdir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmpdir.cleanup)
+    self.save = os.path.join(tmpdir.name, "sender.db")
+    os.makedirs(os.path.join(tmpdir.name, "manifests"))
+    manifests = ManifestStore(os.path.join(tmpdir.name, "manifests"), tmpdir.name)
+    manifests.save("movie.mp4", Manifest(4, ["a" * 40] * 4))
+
+    filelist = FileList()
+    filelist.add("movie.mp4", FileInfo("hash", 4000, 0, 4, "", 1000))
+    for chunk in range(1, 5):
+      filelist.completed("movie.mp4", chunk)
+    self.announcer = Announcer()
+    for name, value in (("FILE_SENDER_SAVE", self.save), ("FILES", filelist), ("MANIFESTS", manifests), ("ANNOUNCER", self.announcer)):
+      self.addCleanup(Env.update, name, Env.get(name))
+      Env.update(name, value)
+
+  def saved(self) -> int:
+    """Gives the count of the confirmations written to the disk."""
+    with sqlite3.connect(self.save) as db:
+      return db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+  def wait_for(self, condition, timeout: float = 5.0):
+    """Waits till the condition is met."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+      self.assertLess(time.monotonic(), deadline)
+      time.sleep(0.02)
+
+  def test_acknowledged_after_delivery(self):
+    """Test that a confirmation stays queued until the announcements following it are delivered."""
+    sender = Sender(window=2)
+    sender.add_work(FileWorker("movie.mp4", 1, 4, 0, 999, "a" * 40, "10.0.0.2", 8000))
+    sender.start()
+    self.wait_for(lambda: len(self.announcer.futures) == 2)
+
+    # The confirmation goes with the first announcement, which isn't delivered, so it's kept for the retry
+    self.announcer.futures[0].set_exception(ConnectionError("unreachable"))
+    self.announcer.futures[1].set_result(True)
+    time.sleep(0.2)
+    self.assertEqual(self.saved(), 1)
+
+    self.wait_for(lambda: len(self.announcer.futures) == 3)
+    self.announcer.futures[2].set_result(True)
+    self.wait_for(lambda: self.saved() == 0)
+
+  def test_resume_once(self):
+    """Test that the concurrent requests start the Sender only once, and a finished Sender is started again."""
+    sender = Sender(window=2)
+    sender.resume()
+    self.assertFalse(sender.is_running())
+
+    sender.add_work(FileWorker("movie.mp4", 1, 4, 0, 999, "a" * 40, "10.0.0.2", 8000))
+    threads = [Thread(target=sender.resume) for _ in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertTrue(sender.is_running())
+    self.wait_for(lambda: len(self.announcer.futures) == 2)
+
+    # The downloader has every chunk, so the Sender finishes and the next confirmation starts it again
+    def deliver() -> bool:
+      for future in list(self.announcer.futures):
+        if not future.done():
+          future.set_result(False)
+      return not sender.is_running()
+
+    self.wait_for(deliver)
+    sender.add_work(FileWorker("movie.mp4", 3, 4, 2000, 2999, "a" * 40, "10.0.0.2", 8000))
+    sender.resume()
+    self.assertTrue(sender.is_running())
+    sender.join(5.0)
@@ -0,0 +1,61 @@
+from django.test import TestCase
+
+from ..Session import DownloadSession, MIN_CHUNK_TIMEOUT, MAX_CHUNK_TIMEOUT
+
+CHUNK = 4 * 1024 * 1024
+
+
+class DownloadSessionTest(TestCase):
+  """Tests for the DownloadSession class."""
+
+  def test_rank_fastest_first(self):
+    """Test that the nodes are ranked by their download rate."""
+    session = DownloadSession("movie.mp4", 10)
+    session.record("10.0.0.1", CHUNK, 4.0)
+    session.record("10.0.0.2", CHUNK, 1.0)
+    sources = [("10.0.0.1", 8000), ("10.0.0.2", 8000)]
+    self.assertEqual(session.rank(sources)[0], ("10.0.0.2", 8000))
+
+  def test_unknown_node_is_tried(self):
+    """Test that an unmeasured node is expected at the median rate."""
+    session = DownloadSession("movie.mp4", 10)
+    session.record("10.0.0.1", CHUNK, 1.0)
+    session.record("10.0.0.2", CHUNK, 10.0)
+    ranked = session.rank([("10.0.0.2", 8000), ("10.0.0.3", 8000)])
+    self.assertEqual(ranked[0], ("10.0.0.3", 8000))
+    self.assertFalse(session.is_slow("10.0.0.3"))
+
+  def test_slow_node(self):
+    """Test that a node much slower than the others is marked slow."""
+    session = DownloadSession("movie.mp4", 10)
+    for ip in ("10.0.0.1", "10.0.0.2"):
+      session.record(ip, CHUNK, 1.0)
+    session.record("10.0.0.3", CHUNK, 20.0)
+    self.assertTrue(session.is_slow("10.0.0.3"))
+    self.assertFalse(session.is_slow("10.0.0.1"))
+
+  def test_failure_moves_work_away(self):
+    """Test that failures lower the expected rate of a node."""
+    session = DownloadSession("movie.mp4", 10)
+    for ip in ("10.0.0.1", "10.0.0.2"):
+      session.record(ip, CHUNK, 1.0)
+    session.fail("10.0.0.1")
+    session.fail("10.0.0.1")
+    ranked = session.rank([("10.0.0.1", 8000), ("10.0.0.2", 8000)])
+    self.assertEqual(ranked[0], ("10.0.0.2", 8000))
+
+  def test_chunk_timeout_bounds(self):
+    """Test that the chunk timeout stays within its bounds."""
+    session = DownloadSession("movie.mp4", 10)
+    session.record("10.0.0.1", CHUNK, 0.01)
+    self.assertEqual(session.chunk_timeout(CHUNK), MIN_CHUNK_TIMEOUT)
+    session = DownloadSession("movie.mp4", 10)
+    session.record("10.0.0.1", 1, 10.0)
+    self.assertEqual(session.chunk_timeout(CHUNK), MAX_CHUNK_TIMEOUT)
+
+  def test_total_rate(self):
+    """Test that the rate of the file is the sum of the rates of its nodes."""
+    session = DownloadSession("movie.mp4", 10)
+    session.record("10.0.0.1", 1000, 1.0)
+    session.record("10.0.0.2", 3000, 1.0)
+    self.assertEqual(session.total_rate(), 4000)
@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from environments import Env
+from .. import views
+from ..Availability import Availability
+from ..Worker import FileWorker
+from registry.File.FileInfo import FileInfo
+from registry.File.List import FileList
+from registry.Node.List import NodeList
+
+
+class Downloads:
+  """Stands for the Fetcher, records the queued chunks."""
+
+  def __init__(self):
+    self.works: list[FileWorker] = []
+
+  def add_work(self, work: FileWorker):
+    self.works.append(work)
+
+  def resume(self):
+    pass
+
+
+class QueueAnnouncementsTest(TestCase):
+  """Tests for the queueing of the announced chunks."""
+
+  def setUp(self):
+    self.filelist = FileList()
+    self.filelist.add("movie.mp4", FileInfo("hash", 4000, 0, 4, "", 1000))
+    self.availability = Availability()
+    self.downloads = Downloads()
+    for name, value in (("FILES", self.filelist), ("AVAILABILITY", self.availability), ("FILE_DOWNLOADER", self.downloads), ("NODES", NodeList())):
+      self.addCleanup(Env.update, name, Env.get(name))
+      Env.update(name, value)
+
+  def test_stale_availability(self):
+    """Test that the availability of a replaced version of the file is dropped, instead of failing the announcements."""
+    # Learnt before the file was replaced by a version with 4 chunks
+    self.availability.have("movie.mp4", "10.0.0.2", 8000, 1, 9)
+
+    works = [FileWorker("movie.mp4", chunk, 9, 0, 0, "sha1", "10.0.0.1", 8000) for chunk in (1, 2)]
+    self.assertEqual(views.queue_announcements(works), {"movie.mp4": [1, 2]})
+    self.assertEqual(self.availability.holders("movie.mp4", 1), [("10.0.0.1", 8000)])
+    self.assertEqual([work.total_chunks for work in self.downloads.works], [4, 4])
@@ -0,0 +1,62 @@
+from django.test import TestCase
+
+from registry.File.Bitmap import ChunkBitmap
+from ..Window import AnnounceWindow, ANNOUNCE_TIMEOUT, IDLE_TIMEOUT, MAX_FAILURES, RETRY_AFTER
+
+
+class AnnounceWindowTest(TestCase):
+  """Tests for the AnnounceWindow class."""
+
+  def setUp(self):
+    self.held = ChunkBitmap(10, completed=True)
+    self.window = AnnounceWindow("movie.mp4", "10.0.0.1", 8000, 10, now=0.0, size=3)
+
+  def test_fill_up_to_window(self):
+    """Test that only as many chunks as the window are announced ahead."""
+    self.window.ack(1, 0.0)
+    self.assertEqual(self.window.fill(self.held, 0.0), [2, 3, 4])
+    self.assertEqual(self.window.fill(self.held, 0.0), [])
+
+  def test_ack_moves_window(self):
+    """Test that a confirmation frees a slot for the next chunk."""
+    self.window.ack(1, 0.0)
+    self.window.fill(self.held, 0.0)
+    self.window.ack(3, 1.0)
+    self.assertEqual(self.window.fill(self.held, 1.0), [5])
+
+  def test_only_held_chunks(self):
+    """Test that the chunks the current node doesn't hold wait till it gets them."""
+    held = ChunkBitmap(10)
+    held.set(1)
+    held.set(4)
+    self.window.ack(1, 0.0)
+    self.assertEqual(self.window.fill(held, 0.0), [4])
+    held.set(2)
+    self.assertEqual(self.window.fill(held, 0.0), [2])
+
+  def test_failure_retries_later(self):
+    """Test that a failed announcement is retried after a delay."""
+    self.window.ack(1, 0.0)
+    self.window.fill(self.held, 0.0)
+    self.window.failed(2, 1.0)
+    self.assertEqual(self.window.fill(self.held, 1.0), [])
+    self.assertEqual(self.window.fill(self.held, 1.0 + RETRY_AFTER), [2])
+
+  def test_unconfirmed_announcement_expires(self):
+    """Test that an announcement never confirmed frees its slot."""
+    self.window.ack(1, 0.0)
+    self.window.fill(self.held, 0.0)
+    self.window.delivered(2)
+    self.assertEqual(self.window.fill(self.held, 0.0), [5])
+    self.assertEqual(self.window.fill(self.held, ANNOUNCE_TIMEOUT), [6, 7, 8])
+
+  def test_done_and_dead(self):
+    for chunk in range(1, 11):
+      self.window.ack(chunk, 0.0)
+    self.assertTrue(self.window.is_done())
+
+    window = AnnounceWindow("movie.mp4", "10.0.0.1", 8000, 10, now=0.0)
+    self.assertTrue(window.is_dead(IDLE_TIMEOUT))
+    for _ in range(MAX_FAILURES):
+      window.failed(1, 0.0)
+    self.assertTrue(window.is_dead(0.0))
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import tempfile
+from django.test import TestCase
+
+from ..Worker import FileWorker
+from ..WorkQueue import WorkQueue, RETRY_AFTER
+
+
+def make_work(chunk: int, ip_address: str = "10.0.0.1") -> FileWorker:
+  """Creates the work of a chunk of a 10 chunks file."""
+  return FileWorker("movie.mp4", chunk, 10, 0, 0, "sha1", ip_address, 8000)
+
+
+class WorkQueueTest(TestCase):
+  """Tests for the WorkQueue class."""
+
+  def setUp(self):
+    self.path = os.path.join(tempfile.mkdtemp(), "work.db")
+    self.queue = WorkQueue(self.path)
+    self.addCleanup(self.queue.close)
+
+  def test_duplicates_queued_once(self):
+    """Test that the same chunk announced by two nodes is queued once."""
+    self.assertTrue(self.queue.put(make_work(1, "10.0.0.1")))
+    self.assertFalse(self.queue.put(make_work(1, "10.0.0.2")))
+    self.assertEqual(len(self.queue), 1)
+    self.assertEqual(self.queue.take(10), [make_work(1, "10.0.0.1")])
+
+  def test_priority_then_arrival(self):
+    """Test that the jobs are taken by their priority, and then in their order."""
+    self.queue.put(make_work(1))
+    self.queue.put(make_work(2))
+    self.queue.put(make_work(3), priority=1)
+    self.queue.put(make_work(2), priority=2)
+    self.assertEqual([w.chunk for w in self.queue.take(10)], [2, 3, 1])
+
+  def test_taken_jobs_stay_queued(self):
+    """Test that a taken job isn't taken again, but stays queued till it's removed."""
+    self.queue.put(make_work(1))
+    self.queue.take()
+    self.assertEqual(self.queue.take(), [])
+    self.assertFalse(self.queue.empty())
+    self.assertIsNone(self.queue.next_due())
+    self.queue.remove(make_work(1))
+    self.assertTrue(self.queue.empty())
+
+  def test_retry_backs_off(self):
+    """Test that a failed job waits longer after every failure."""
+    self.queue.put(make_work(1))
+    self.queue.take(now=100.0)
+    self.queue.retry(make_work(1), now=100.0)
+    self.assertEqual(self.queue.next_due(now=100.0), 100.0 + RETRY_AFTER)
+    self.assertEqual(self.queue.take(now=100.0), [])
+
+    self.assertEqual(self.queue.take(now=100.0 + RETRY_AFTER), [make_work(1)])
+    self.queue.retry(make_work(1), now=200.0)
+    self.assertEqual(self.queue.next_due(now=200.0), 200.0 + 2 * RETRY_AFTER)
+
+  def test_persisted(self):
+    """Test that the queued jobs are loaded again, including the taken ones."""
+    self.queue.put(make_work(1))
+    self.queue.put(make_work(2), priority=1)
+    self.queue.put(make_work(3))
+    self.queue.take()
+    self.queue.remove(make_work(3))
+    self.queue.close()
+
+    reopened = WorkQueue(self.path)
+    self.addCleanup(reopened.close)
+    self.assertEqual([w.chunk for w in reopened.take(10)], [2, 1])
+
+  def test_commits_in_batches(self):
+    """Test that the changes are written to the disk together."""
+    path = os.path.join(tempfile.mkdtemp(), "work.db")
+    queue = WorkQueue(path, commit_batch=3, commit_interval=3600)
+    self.addCleanup(queue.close)
+
+    def saved() -> int:
+      with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    queue.put(make_work(1))
+    queue.put(make_work(2))
+    self.assertEqual(saved(), 0)
+    queue.put(make_work(3))
+    self.assertEqual(saved(), 3)
@@ -4,4 +4,6 @@ from . import views
 urlpatterns = [
     path("response", views.file_response_handler),
     path("webhook", views.file_download_handler),
+    path("have", views.have),
+    path("announce", views.announce),
 ]
@@ -1,8 +1,10 @@
 from django.http import HttpRequest, HttpResponseNotAllowed, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from . import Fetcher, Worker, Sender
+from . import Fetcher, Worker, Sender, Availability, Announcer
 from environments import Env
-import os
+from registry.File import List as FileList
+from registry.File.Bitmap import ChunkBitmap
+from dataclasses import replace
 
 
 def to_worker(response: HttpRequest) -> Worker.FileWorker | JsonResponse:
@@ -89,6 +91,114 @@ def to_worker(response: HttpRequest) -> Worker.FileWorker | JsonResponse:
   return work
 
 
+def enqueue(work: Worker.FileWorker) -> tuple[dict, int]:
+  """
+  Function adds the download job of the chunk into the queue of the Fetcher, if the chunk is still needed by the current node
+  Args:
+    work: The chunk which is available at the remote node
+  Returns:
+    tuple[dict, int]: The result of adding the job (status True if the job is queued), and its HTTP status code
+  """
+  filelist: FileList.FileList = Env.get("FILES")
+  if not filelist.exist(work.filename):
+    return {"status": False, "reason": f"file `{work.filename}` is unknown"}, 404
+
+  # The byte range of the chunk is derived from the chunk size in the add_file block, not taken from the announcement
+  fileinfo = filelist.get(work.filename)
+  try:
+    start_byte, end_byte = fileinfo.chunk_range(work.chunk)
+  except IndexError:
+    return {"status": False, "reason": f"chunk {work.chunk} doesn't belong to file `{work.filename}`"}, 400
+  work = replace(work, total_chunks=fileinfo.total_chunks, start_byte=start_byte, end_byte=end_byte)
+
+  # Every announcement tells that the node holds the chunk, and the whole bitmap of the node is fetched once in a while
+  # What is known about the chunks of a replaced version of the file is dropped
+  availability: Availability.Availability = Env.get("AVAILABILITY")
+  try:
+    availability.have(work.filename, work.ip_address, work.port, work.chunk, work.total_chunks)
+  except ValueError:
+    availability.remove(work.filename)
+    availability.have(work.filename, work.ip_address, work.port, work.chunk, work.total_chunks)
+  if not filelist.isDownloaded(work.filename):
+    availability.request(work.filename, work.ip_address, work.port)
+
+  # Check if the chunk is already downloaded by the node
+  if filelist.hasChunk(work.filename, work.chunk):
+    return {"status": False, "reason": f"chunk {work.chunk} is already downloaded"}, 200
+
+  # Add the download job into queue
+  fetcher: Fetcher.Fetcher = Env.get("FILE_DOWNLOADER")
+  fetcher.add_work(work)
+  fetcher.resume()
+
+  return {"status": True}, 200
+
+
+def queue_download(work: Worker.FileWorker) -> JsonResponse:
+  """
+  Function adds the download job of the chunk into the queue of the Fetcher, if the chunk is still needed by the current node
+  Args:
+    work: The chunk which is available at the remote node
+  Returns:
+    JsonResponse: The result of adding the job, status True if the job is queued
+  """
+  body, status = enqueue(work)
+  return JsonResponse(body, status=status)
+
+
+def queue_announcements(works: list[Worker.FileWorker]) -> dict[str, list[int]]:
+  """
+  Function adds the download jobs of the announced chunks which are still needed by the current node
+  Args:
+    works: The announced chunks
+  Returns:
+    dict[str, list[int]]: The queued chunks by the name of their file
+  """
+  queued: dict[str, list[int]] = {}
+  for work in works:
+    if enqueue(work)[0]["status"]:
+      queued.setdefault(work.filename, []).append(work.chunk)
+  return queued
+
+
+def gossip_chunks_handler(payload: bytes) -> bool:
+  """
+  Gossip handler of the 'chunks' messages, which carry many announcements of a node encoded by `Announcer.encode()`
+  Args:
+    payload: The encoded announcements
+  Returns:
+    bool: Returns True if the announcements are valid, so that they're spread further
+  """
+  try:
+    works = Announcer.decode(payload)
+  except ValueError:
+    return False
+  if works and works[0].ip_address != Env.get("IPADDRESS"):
+    queue_announcements(works)
+  return True
+
+
+@csrf_exempt
+def announce(response: HttpRequest):
+  """
+  Receives many chunk announcements of a node in a single request, the body is encoded by `Announcer.encode()`. The byte ranges of the chunks are derived from the chunk size of their file.
+  The json response would look like this:
+  {
+    "status": true,
+    "queued": {"example.iso": [<chunks_which_the_current_node_will_download>]}
+  }
+  """
+  if response.method != "POST":
+    return HttpResponseNotAllowed(["POST"])
+
+  try:
+    works = Announcer.decode(response.body)
+  except ValueError:
+    return JsonResponse({"status": False, "reason": "invalid announcements"}, status=400)
+
+  return JsonResponse({"status": True, "queued": queue_announcements(works)})
+
+
 # Create your views here.
 @csrf_exempt
 def file_response_handler(response: HttpRequest):
@@ -113,28 +223,13 @@ def file_response_handler(response: HttpRequest):
   if isinstance(work, JsonResponse):
     return work
 
-  # Check if the chunk is already downloaded by the node
-  if os.path.exists(
-      os.path.join(Env.get("DOWNLOADS"),
-                   f"{work.filename}.{work.chunk}.part")
-  ):
-    return JsonResponse(
-        {"status": False, "reason": f"chunk {work.chunk} is already downloaded"}
-    )
-
-  # Add the download job into queue
-  fetcher: Fetcher.Fetcher = Env.get("FILE_DOWNLOADER")
-  fetcher.add_work(work)
-  if not fetcher.is_running():
-    fetcher.start()
-
-  return JsonResponse({"status": True}, status=200)
+  return queue_download(work)
 
 
 @csrf_exempt
 def file_download_handler(response: HttpRequest):
   """
-  This function watches if any other node have downloaded specific chunk of a certain file, and then send response of the next chunk to the same node (When available).
+  This function watches if any other node have downloaded specific chunk of a certain file, and then the Sender announces the next chunks to the same node (When available), keeping a window of chunks announced ahead.
   The json response would look like this:
   {
     "filename": "example.iso",
@@ -154,16 +249,57 @@ def file_download_handler(response: HttpRequest):
   if isinstance(work, JsonResponse):
     return work
 
-  # Check if the next chunk is available or not
-  if (work.chunk + 1) > work.total_chunks:
-    return JsonResponse(
-        {"status": False, "reason": "no more chunks left to download"}, status=204
-    )
-
-  # Add the webhook job into queue
+  # Add the webhook job into queue, the chunks are not announced in order, so even the last chunk frees a slot of the window
   sender: Sender.Sender = Env.get("FILE_SENDER")
   sender.add_work(work)
-  if not sender.is_running():
-    sender.start()
+  sender.resume()
 
   return JsonResponse({"status": True}, status=200)
+
+
+@csrf_exempt
+def have(response: HttpRequest):
+  """
+  This function exchanges the chunks of a file held by the nodes. The requesting node sends its bitmap of the file, and gets back the bitmap of the current node.
+  The form fields would look like this:
+  {
+    "filename": "example.iso",
+    "bitmap": <base64_encoded_bitmap_of_the_requesting_node>,
+    "ip_address: <ip_address_of_the_requesting_node>,
+    "port": <port_number>
+  }
+  The bitmap has one bit per chunk, the first chunk is the lowest bit of the first byte.
+  """
+  if response.method != "POST":
+    return HttpResponseNotAllowed(["POST"])
+
+  if (filename := response.POST.get("filename")) is None:
+    return JsonResponse(
+        {"status": False, "reason": "provide `filename` field"}, status=400
+    )
+
+  filelist: FileList.FileList = Env.get("FILES")
+  if not filelist.exist(filename):
+    return JsonResponse(
+        {"status": False, "reason": f"file `{filename}` is unknown"}, status=404
+    )
+  total_chunks = filelist.get(filename).total_chunks
+
+  # Learning the chunks of the requesting node, the bitmap is optional
+  bitmap = response.POST.get("bitmap")
+  ip_address = response.POST.get("ip_address")
+  port = response.POST.get("port", "")
+  if bitmap is not None and ip_address is not None and port.isdigit():
+    availability: Availability.Availability = Env.get("AVAILABILITY")
+    try:
+      availability.update(filename, ip_address, int(port), ChunkBitmap.from_base64(total_chunks, bitmap))
+    except ValueError:
+      return JsonResponse(
+          {"status": False, "reason": "invalid `bitmap` field"}, status=400
+      )
+
+  return JsonResponse({
+      "status": True,
+      "total_chunks": total_chunks,
+      "bitmap": filelist.getBitmap(filename).to_base64(),
+  })
@@ -0,0 +1,184 @@
+import base64
+
+
+class ChunkBitmap:
+  """
+  ChunkBitmap keeps which chunks of a file are downloaded, one bit per chunk. The chunks are numbered from 1 like in the transfer protocol.
+  """
+
+  def __init__(self, total_chunks: int, completed: bool = False):
+    """
+    Args:
+      total_chunks: The total chunks of the file
+      completed: Set it True to mark all the chunks as downloaded (Default False)
+    """
+    self.total = total_chunks
+    self.__bits = bytearray(b"\xff" if completed else b"\x00") * ((total_chunks + 7) // 8)
+    self.__count = 0
+    if completed:
+      self.__trim()
+      self.__count = total_chunks
+
+  def __trim(self):
+    """
+    Clears the unused bits after the last chunk
+    """
+    if (extra := self.total % 8) != 0:
+      self.__bits[-1] &= (1 << extra) - 1
+
+  def __check(self, chunk: int):
+    """
+    Raises:
+      IndexError: If the chunk number is out of the range
+    """
+    if not 1 <= chunk <= self.total:
+      raise IndexError(f"chunk {chunk} is out of range 1-{self.total}")
+
+  def set(self, chunk: int) -> bool:
+    """
+    Mark the chunk as downloaded
+    Args:
+      chunk: The number of the chunk
+    Returns:
+      bool: Returns True if the chunk was not marked before, otherwise False
+    Raises:
+      IndexError: If the chunk number is out of the range
+    """
+    self.__check(chunk)
+    index, bit = divmod(chunk - 1, 8)
+    if self.__bits[index] & (1 << bit):
+      return False
+    self.__bits[index] |= 1 << bit
+    self.__count += 1
+    return True
+
+  def clear(self, chunk: int) -> bool:
+    """
+    Mark the chunk as not downloaded
+    Args:
+      chunk: The number of the chunk
+    Returns:
+      bool: Returns True if the chunk was marked before, otherwise False
+    Raises:
+      IndexError: If the chunk number is out of the range
+    """
+    self.__check(chunk)
+    index, bit = divmod(chunk - 1, 8)
+    if not self.__bits[index] & (1 << bit):
+      return False
+    self.__bits[index] &= ~(1 << bit) & 0xff
+    self.__count -= 1
+    return True
+
+  def has(self, chunk: int) -> bool:
+    """
+    Check if the chunk is downloaded
+    Args:
+      chunk: The number of the chunk
+    Returns:
+      bool: Returns True if downloaded, False if not downloaded or out of the range
+    """
+    if not 1 <= chunk <= self.total:
+      return False
+    index, bit = divmod(chunk - 1, 8)
+    return bool(self.__bits[index] & (1 << bit))
+
+  def count(self) -> int:
+    """
+    Get the count of downloaded chunks
+    Returns:
+      int: The count of downloaded chunks
+    """
+    return self.__count
+
+  def is_complete(self) -> bool:
+    """
+    Check if all the chunks are downloaded
+    Returns:
+      bool: Returns True if all the chunks are downloaded, otherwise False
+    """
+    return self.__count == self.total
+
+  def missing(self) -> list[int]:
+    """
+    Get the chunks which are not downloaded, fully downloaded bytes of the bitmap are skipped at once
+    Returns:
+      list[int]: The numbers of the missing chunks in increasing order
+    """
+    result: list[int] = []
+    for index, byte in enumerate(self.__bits):
+      if byte == 0xff:
+        continue
+      for bit in range(8):
+        chunk = index * 8 + bit + 1
+        if chunk > self.total:
+          break
+        if not byte & (1 << bit):
+          result.append(chunk)
+    return result
+
+  def prefix(self) -> int:
+    """
+    Get the count of chunks which are downloaded serially from the first chunk
+    Returns:
+      int: The last chunk of the serially downloaded chunks, 0 if the first chunk is missing
+    """
+    for index, byte in enumerate(self.__bits):
+      if byte != 0xff:
+        bit = 0
+        while byte & (1 << bit):
+          bit += 1
+        return min(index * 8 + bit, self.total)
+    return self.total
+
+  def to_bytes(self) -> bytes:
+    """
+    Serializes the bitmap
+    Returns:
+      bytes: One bit per chunk, the first chunk is the lowest bit of the first byte
+    """
+    return bytes(self.__bits)
+
+  def to_base64(self) -> str:
+    """
+    Serializes the bitmap into a base64 string
+    """
+    return base64.b64encode(self.__bits).decode()
+
+  @classmethod
+  def from_bytes(cls, total_chunks: int, data: bytes) -> "ChunkBitmap":
+    """
+    Deserializes the bitmap
+    Args:
+      total_chunks: The total chunks of the file
+      data: The serialized bitmap
+    Raises:
+      ValueError: If the length of the data doesn't match the total chunks
+    """
+    bitmap = cls(total_chunks)
+    if len(data) != len(bitmap.__bits):
+      raise ValueError("bitmap length doesn't match the total chunks")
+    bitmap.__bits[:] = data
+    bitmap.__trim()
+    bitmap.__count = int.from_bytes(bitmap.__bits, "little").bit_count()
+    return bitmap
+
+  @classmethod
+  def from_base64(cls, total_chunks: int, data: str) -> "ChunkBitmap":
+    """
+    Deserializes the bitmap from a base64 string
+    """
+    return cls.from_bytes(total_chunks, base64.b64decode(data))
+
+  @classmethod
+  def from_prefix(cls, total_chunks: int, last_chunk: int) -> "ChunkBitmap":
+    """
+    Creates a bitmap where the chunks till the last chunk are downloaded
+    Args:
+      total_chunks: The total chunks of the file
+      last_chunk: The last downloaded chunk
+    """
+    bitmap = cls(total_chunks)
+    for chunk in range(1, min(last_chunk, total_chunks) + 1):
+      bitmap.set(chunk)
+    return bitmap
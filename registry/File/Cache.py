@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from threading import Lock, Event
+from typing import Callable
+
+
+class _Load:
+  """
+  A read of the disk which other requests of the same chunk wait for
+  """
+
+  def __init__(self):
+    self.done = Event()
+    self.data: bytes | None = None
+    self.error: BaseException | None = None
+
+
+class ChunkCache:
+  """
+  ChunkCache keeps the recently served chunks in memory, bounded by their total size and evicting the least recently used chunk first. Concurrent requests of the same chunk share a single read of the disk. The encoded variants of a chunk (Like its compressed bytes) are cached beside the raw bytes.
+  """
+
+  def __init__(self, max_bytes: int):
+    """
+    Args:
+      max_bytes: The maximum total size of the cached chunks (In Bytes), 0 disables the cache
+    """
+    self.max_bytes = max_bytes
+    self.__lock = Lock()
+    self.__entries: OrderedDict[tuple[str, int, int, str], bytes] = OrderedDict()
+    self.__loading: dict[tuple[str, int, int, str], _Load] = {}
+    self.__bytes = 0
+    self.__hits = 0
+    self.__misses = 0
+    self.__coalesced = 0
+    self.__evictions = 0
+
+  def get(self, filename: str, start_byte: int, end_byte: int, loader: Callable[[], bytes], encoding: str = "") -> bytes:
+    """
+    Get the bytes of a chunk, reading them with the loader if they are not cached. If the chunk is being read already, then waits for that read instead.
+    Args:
+      filename: The name of the file
+      start_byte: The starting byte of the chunk
+      end_byte: The ending byte of the chunk
+      loader: The function reading the chunk from the disk
+      encoding: The variant of the chunk, empty for the raw bytes
+    Returns:
+      bytes: The bytes of the chunk
+    Raises:
+      Exception: Whatever the loader raised
+    """
+    key = (filename, start_byte, end_byte, encoding)
+    with self.__lock:
+      if (data := self.__entries.get(key)) is not None:
+        self.__entries.move_to_end(key)
+        self.__hits += 1
+        return data
+
+      if (load := self.__loading.get(key)) is not None:
+        self.__coalesced += 1
+        owner = False
+      else:
+        load = self.__loading[key] = _Load()
+        self.__misses += 1
+        owner = True
+
+    if not owner:
+      load.done.wait()
+      if load.error is not None:
+        raise load.error
+      return load.data
+
+    try:
+      load.data = loader()
+    except BaseException as e:
+      load.error = e
+      raise
+    finally:
+      with self.__lock:
+        del self.__loading[key]
+        if load.data is not None:
+          self.__put(key, load.data)
+      load.done.set()
+    return load.data
+
+  def __put(self, key: tuple[str, int, int, str], data: bytes):
+    """
+    Adds a chunk and evicts the least recently used chunks till the cache fits, must be called while holding the lock
+    """
+    if len(data) > self.max_bytes:
+      return
+    if key in self.__entries:
+      self.__bytes -= len(self.__entries.pop(key))
+    self.__entries[key] = data
+    self.__bytes += len(data)
+    while self.__bytes > self.max_bytes:
+      _, evicted = self.__entries.popitem(last=False)
+      self.__bytes -= len(evicted)
+      self.__evictions += 1
+
+  def peek(self, filename: str, start_byte: int, end_byte: int, encoding: str = "") -> bytes | None:
+    """
+    Get the bytes of a chunk only if they are cached, the chunk is never read and the counters don't change
+    Args:
+      filename: The name of the file
+      start_byte: The starting byte of the chunk
+      end_byte: The ending byte of the chunk
+      encoding: The variant of the chunk, empty for the raw bytes
+    Returns:
+      bytes | None: The bytes of the chunk, None if they are not cached
+    """
+    with self.__lock:
+      return self.__entries.get((filename, start_byte, end_byte, encoding))
+
+  def invalidate(self, filename: str):
+    """
+    Removes the cached chunks of a file, used when the file changes on the disk
+    Args:
+      filename: The name of the file
+    """
+    with self.__lock:
+      for key in [k for k in self.__entries if k[0] == filename]:
+        self.__bytes -= len(self.__entries.pop(key))
+
+  def stats(self) -> dict:
+    """
+    Get the counters of the cache
+    Returns:
+      dict: The hits, misses, coalesced requests, evictions, the hit rate (Coalesced requests count as hits), and the size of the cache
+    """
+    with self.__lock:
+      requests = self.__hits + self.__misses + self.__coalesced
+      return {
+          "hits": self.__hits,
+          "misses": self.__misses,
+          "coalesced": self.__coalesced,
+          "evictions": self.__evictions,
+          "hit_rate": (self.__hits + self.__coalesced) / requests if requests else 0.0,
+          "entries": len(self.__entries),
+          "bytes": self.__bytes,
+          "max_bytes": self.max_bytes,
+      }
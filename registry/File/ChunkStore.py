@@ -0,0 +1,188 @@
+from .FileInfo import FileInfo
+from .List import FileList
+from .Manifest import Manifest, ManifestStore
+from threading import Lock
+from typing import Callable
+import hashlib
+import os
+import secrets
+import shutil
+
+
+def unshare(path: str):
+  """
+  Gives a hard linked file its own copy of the bytes, so writing into it doesn't change the identical files linked to it. Must be called before a file is changed in place
+  Args:
+    path: The path of the file
+  Raises:
+    OSError: If the file couldn't be copied
+  """
+  try:
+    if os.stat(path).st_nlink <= 1:
+      return
+  except FileNotFoundError:
+    return
+  tmp_path = f"{path}.{secrets.token_hex(4)}.copy"
+  try:
+    shutil.copyfile(path, tmp_path)
+    os.replace(tmp_path, path)
+  except OSError:
+    if os.path.exists(tmp_path):
+      os.remove(tmp_path)
+    raise
+
+
+class ChunkStore:
+  """
+  ChunkStore finds the verified chunks held by the current node by their SHA-1 hash, whichever file they belong to. The bytes stay in the files under the downloads directory, so a chunk shared by many files is looked up instead of being downloaded again, and a file identical to a file held already is linked to it instead of being stored twice.
+  """
+
+  def __init__(self, downloads: str):
+    """
+    Args:
+      downloads: The directory of the files
+    """
+    self.downloads = downloads
+    self.__lock = Lock()
+    # Places of every chunk by its hash, and the hashes of every file
+    self.__places: dict[str, list[tuple[str, int]]] = {}
+    self.__files: dict[str, set[str]] = {}
+    self.__reused = 0
+    self.__linked = 0
+
+  def load(self, filelist: FileList, manifests: ManifestStore):
+    """
+    Records the verified chunks of the files held by the current node, from their manifests
+    Args:
+      filelist: The files
+      manifests: The manifests of the files
+    """
+    for filename in filelist.getFiles():
+      if (manifest := manifests.get(filename)) is None:
+        continue
+      for chunk, sha1 in enumerate(manifest.hashes(), start=1):
+        if sha1 is not None and filelist.hasChunk(filename, chunk):
+          self.add(sha1, filename, chunk)
+
+  def add(self, sha1: str, filename: str, chunk: int):
+    """
+    Records a verified chunk held by the current node
+    Args:
+      sha1: The SHA-1 hash of the chunk
+      filename: The name of the file
+      chunk: The number of the chunk
+    """
+    with self.__lock:
+      places = self.__places.setdefault(sha1, [])
+      if (filename, chunk) not in places:
+        places.append((filename, chunk))
+        self.__files.setdefault(filename, set()).add(sha1)
+
+  def forget(self, filename: str):
+    """
+    Forgets the chunks of a file, used when the file is removed or downloaded again
+    Args:
+      filename: The name of the file
+    """
+    with self.__lock:
+      for sha1 in self.__files.pop(filename, set()):
+        places = [place for place in self.__places.get(sha1, []) if place[0] != filename]
+        if places:
+          self.__places[sha1] = places
+        else:
+          self.__places.pop(sha1, None)
+
+  def has(self, sha1: str) -> bool:
+    """
+    Check if a chunk with the hash is held by the current node
+    Args:
+      sha1: The SHA-1 hash of the chunk
+    """
+    with self.__lock:
+      return sha1 in self.__places
+
+  def read(self, sha1: str, fileinfo_of: Callable[[str], FileInfo]) -> bytes | None:
+    """
+    Reads a chunk with the hash from any file holding it, the bytes are hashed again so that a file changed on the disk is never trusted
+    Args:
+      sha1: The SHA-1 hash of the chunk
+      fileinfo_of: The function giving the FileInfo of a file
+    Returns:
+      bytes | None: The bytes of the chunk, None if no file holds it
+    """
+    with self.__lock:
+      places = list(self.__places.get(sha1, []))
+
+    for filename, chunk in places:
+      try:
+        start_byte, end_byte = fileinfo_of(filename).chunk_range(chunk)
+        with open(os.path.join(self.downloads, filename), 'rb') as f:
+          f.seek(start_byte)
+          data = f.read(end_byte - start_byte + 1)
+      except (KeyError, IndexError, OSError):
+        continue
+      if hashlib.sha1(data).hexdigest() == sha1:
+        with self.__lock:
+          self.__reused += 1
+        return data
+    return None
+
+  def link(self, source: str, filename: str):
+    """
+    Makes a file share the bytes of an identical file held already, through a hard link. Only downloaded files are linked, and a linked file gets its own copy (`unshare`) before it's written in place, so a change never reaches the other file.
+    Args:
+      source: The name of the file held already
+      filename: The name of the identical file
+    Raises:
+      OSError: If the link couldn't be made
+    """
+    destination = os.path.join(self.downloads, filename)
+    tmp_path = f"{destination}.{secrets.token_hex(4)}.link"
+    os.link(os.path.join(self.downloads, source), tmp_path)
+    try:
+      os.replace(tmp_path, destination)
+    except OSError:
+      os.remove(tmp_path)
+      raise
+    with self.__lock:
+      self.__linked += 1
+
+  def alias(self, filelist: FileList, manifests: ManifestStore, filename: str, fileinfo: FileInfo) -> bool:
+    """
+    Links a new file to a downloaded file with the same SHA-512 hash, so the file is neither downloaded nor stored again. The manifest is shared too when both files have the same chunk size.
+    Args:
+      filelist: The files
+      manifests: The manifests of the files
+      filename: The name of the new file
+      fileinfo: The FileInfo object of the new file
+    Returns:
+      bool: Returns True if the file is linked, otherwise False
+    """
+    if (source := filelist.findDownloaded(fileinfo.filehash)) is None or source == filename:
+      return False
+    try:
+      self.link(source, filename)
+    except OSError:
+      return False
+
+    source_manifest = manifests.get(source)
+    if manifests.get(filename) is None and source_manifest is not None and filelist.get(source).chunk_size == fileinfo.chunk_size:
+      manifests.save(filename, Manifest(source_manifest.total, source_manifest.hashes(), source_manifest.checksums))
+    if (manifest := manifests.get(filename)) is not None:
+      for chunk, sha1 in enumerate(manifest.hashes(), start=1):
+        if sha1 is not None:
+          self.add(sha1, filename, chunk)
+    return True
+
+  def stats(self) -> dict:
+    """
+    Get the counters of the store
+    Returns:
+      dict: The count of distinct chunks, the chunks reused instead of downloaded, and the files linked instead of stored again
+    """
+    with self.__lock:
+      return {
+          "chunks": len(self.__places),
+          "reused": self.__reused,
+          "linked": self.__linked,
+      }
@@ -0,0 +1,219 @@
+from .Cache import ChunkCache
+from .FileInfo import FileInfo
+from threading import Lock
+from typing import Callable, Iterable, Iterator
+import struct
+import zlib
+
+# The chunks are compressed into a zlib stream, the `deflate` coding of HTTP
+ENCODING = "deflate"
+
+# Header through which a node asks for the compressed chunks, and which marks a compressed answer. The Content-Range of a range counts the bytes before the coding, so the standard Content-Encoding can't be used, and clients other than the nodes never get a compressed range
+HEADER = "X-Chunk-Encoding"
+
+# Compression level of the chunks, the compressed chunks are cached so a slower level pays off
+LEVEL = 6
+
+# Size of the sample compressed to probe a chunk (In Bytes)
+PROBE_SIZE = 64 * 1024
+
+# A chunk is compressed only if its sample shrinks at least to this ratio
+MAX_RATIO = 0.9
+
+# Modulus of the Adler-32 checksum
+ADLER_BASE = 65521
+
+
+def accepts(header: str, encoding: str = ENCODING) -> bool:
+  """
+  Check if the X-Chunk-Encoding header of a request allows the encoding, it's negotiated like Accept-Encoding
+  Args:
+    header: The value of the header
+    encoding: The content coding
+  Returns:
+    bool: Returns True if the encoding is accepted with a non-zero quality
+  """
+  for item in header.split(","):
+    name, _, params = item.strip().partition(";")
+    if name.strip().lower() not in (encoding, "*"):
+      continue
+    quality = 1.0
+    for param in params.split(";"):
+      key, _, value = param.strip().partition("=")
+      if key.strip().lower() == "q":
+        try:
+          quality = float(value)
+        except ValueError:
+          quality = 0.0
+    return quality > 0
+  return False
+
+
+def compressible(data: bytes) -> bool:
+  """
+  Probes if a chunk is worth compressing, a sample from its start is compressed with the fastest level. Already compressed media doesn't shrink, so it's sent as it is.
+  Args:
+    data: The bytes of the chunk
+  """
+  sample = data[:PROBE_SIZE]
+  return len(sample) > 0 and len(zlib.compress(sample, 1)) <= len(sample) * MAX_RATIO
+
+
+def adler32_combine(adler1: int, adler2: int, length2: int) -> int:
+  """
+  Combines the Adler-32 checksums of two pieces of data into the checksum of the data joined
+  Args:
+    adler1: The checksum of the first piece
+    adler2: The checksum of the second piece
+    length2: The length of the second piece (In Bytes)
+  Returns:
+    int: The checksum of the joined data
+  """
+  remainder = length2 % ADLER_BASE
+  sum1 = (adler1 & 0xFFFF) + (adler2 & 0xFFFF) + ADLER_BASE - 1
+  sum2 = (remainder * (adler1 & 0xFFFF)) + (adler1 >> 16) + (adler2 >> 16) + ADLER_BASE - remainder
+  return (sum1 % ADLER_BASE) | ((sum2 % ADLER_BASE) << 16)
+
+
+def deflate(data: bytes, level: int) -> bytes:
+  """
+  Compresses a chunk into a piece of a deflate stream which can be joined with the pieces of other chunks, the piece is prefixed by the Adler-32 checksum of the chunk
+  Args:
+    data: The bytes of the chunk
+    level: The compression level, 0 stores the bytes as they are
+  Returns:
+    bytes: The checksum (4 bytes) followed by the compressed piece
+  """
+  compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+  piece = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+  return struct.pack(">I", zlib.adler32(data)) + piece
+
+
+def join(pieces: Iterable[tuple[bytes, int]]) -> Iterator[bytes]:
+  """
+  Joins the compressed pieces of adjacent chunks into a single zlib stream, the stream is given while the pieces come
+  Args:
+    pieces: The pieces given by deflate, along with the length of their chunk (In Bytes)
+  Returns:
+    Iterator[bytes]: The parts of the zlib stream of the chunks
+  """
+  adler = 1
+  yield b"\x78\x9c"
+  for piece, length in pieces:
+    adler = adler32_combine(adler, struct.unpack(">I", piece[:4])[0], length)
+    yield piece[4:]
+  # An empty final block ends the deflate stream
+  yield b"\x03\x00" + struct.pack(">I", adler)
+
+
+def inflate(parts: Iterable[bytes], size: int) -> Iterator[bytes]:
+  """
+  Decodes a zlib stream while it's received, no decoded part is larger than the size, so a stream which expands a lot never fills the memory
+  Args:
+    parts: The parts of the received stream
+    size: The most length of a decoded part (In Bytes)
+  Returns:
+    Iterator[bytes]: The decoded parts
+  Raises:
+    ValueError: If the stream is invalid, cut short, or followed by more bytes
+  """
+  decoder = zlib.decompressobj()
+  try:
+    for part in parts:
+      if decoder.eof:
+        raise ValueError("received bytes after the compressed stream")
+      while part:
+        if decoded := decoder.decompress(part, size):
+          yield decoded
+        part = decoder.unconsumed_tail
+  except zlib.error as e:
+    raise ValueError(f"invalid compressed stream: {e}")
+  if not decoder.eof:
+    raise ValueError("compressed stream is cut short")
+
+
+class Compressor:
+  """
+  Compressor encodes the chunks sent to the nodes accepting it, every chunk is compressed on its own and probed first, so the media which doesn't shrink is never compressed. The compressed chunks are cached along with the raw ones, and a chunk found not worth compressing is cached as an empty piece, so it isn't probed again.
+  """
+
+  def __init__(self, cache: ChunkCache, level: int = LEVEL):
+    """
+    Args:
+      cache: The cache of the served chunks
+      level: The compression level of the chunks
+    """
+    self.cache = cache
+    self.level = level
+    self.__lock = Lock()
+    self.__compressed = 0
+    self.__skipped = 0
+    self.__raw_bytes = 0
+    self.__sent_bytes = 0
+
+  def __piece(self, data: bytes) -> bytes:
+    """
+    Compresses a chunk if it's worth it, otherwise gives an empty piece
+    """
+    if not compressible(data):
+      with self.__lock:
+        self.__skipped += 1
+      return b""
+    piece = deflate(data, self.level)
+    with self.__lock:
+      self.__compressed += 1
+    return piece
+
+  def encode(self, filename: str, fileinfo: FileInfo, first: int, last: int, read: Callable[[int], bytes]) -> Iterator[bytes] | None:
+    """
+    Encodes adjacent chunks of a file into a single zlib stream, the chunks are read and compressed while the stream is sent, so the range is never held in memory
+    Args:
+      filename: The name of the file
+      fileinfo: The FileInfo object of the file
+      first: The number of the first chunk
+      last: The number of the last chunk
+      read: The function reading the bytes of a chunk by its number
+    Returns:
+      Iterator[bytes] | None: The parts of the zlib stream of the chunks, None if all the chunks are known to be not worth compressing
+    """
+    probed = (self.cache.peek(filename, *fileinfo.chunk_range(chunk), ENCODING) for chunk in range(first, last + 1))
+    if all(piece == b"" for piece in probed):
+      return None
+    return join(self.__pieces(filename, fileinfo, first, last, read))
+
+  def __pieces(self, filename: str, fileinfo: FileInfo, first: int, last: int, read: Callable[[int], bytes]) -> Iterator[tuple[bytes, int]]:
+    """
+    Gives the compressed pieces of the chunks, every chunk is read at most once. The chunks not worth compressing are stored as they are, inside the stream
+    """
+    for chunk in range(first, last + 1):
+      start_byte, end_byte = fileinfo.chunk_range(chunk)
+      data: bytes | None = None
+
+      def load() -> bytes:
+        nonlocal data
+        data = read(chunk)
+        return self.__piece(data)
+
+      piece = self.cache.get(filename, start_byte, end_byte, load, ENCODING)
+      if piece == b"":
+        piece = deflate(data if data is not None else read(chunk), 0)
+      length = end_byte - start_byte + 1
+      with self.__lock:
+        self.__raw_bytes += length
+        self.__sent_bytes += len(piece) - 4
+      yield piece, length
+
+  def stats(self) -> dict:
+    """
+    Get the counters of the compression
+    Returns:
+      dict: The chunks compressed and skipped by the probe, and the bytes of the chunks sent encoded against the bytes sent
+    """
+    with self.__lock:
+      return {
+          "compressed": self.__compressed,
+          "skipped": self.__skipped,
+          "raw_bytes": self.__raw_bytes,
+          "sent_bytes": self.__sent_bytes,
+          "ratio": self.__sent_bytes / self.__raw_bytes if self.__raw_bytes else 1.0,
+      }
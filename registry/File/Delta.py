@@ -0,0 +1,74 @@
+from .FileInfo import FileInfo
+from .Manifest import Manifest
+from . import Rolling
+import hashlib
+import os
+
+
+def keep_basis(downloads: str, bases: str, filename: str) -> bool:
+  """
+  Moves the bytes of a file aside when a new version of the file is added, they're kept as the basis from where the chunks of the new version are built
+  Args:
+    downloads: The directory of the files
+    bases: The directory of the previous versions
+    filename: The name of the file
+  Returns:
+    bool: Returns True if the file is moved, False if the current node has no bytes of the file
+  """
+  try:
+    os.replace(os.path.join(downloads, filename), os.path.join(bases, filename))
+  except FileNotFoundError:
+    return False
+  return True
+
+
+def patch(basis: str, fd: int, fileinfo: FileInfo, manifest: Manifest, held: set[int]) -> dict[int, str]:
+  """
+  Builds the chunks of a new version of a file which are found in its previous version. When the manifest has the weak rolling checksums of the chunks, they are searched at every offset of the previous version, so the chunks moved by an insertion or a deletion are found too. Otherwise only the same offsets are compared.
+  Args:
+    basis: The path of the previous version
+    fd: The file descriptor of the new version
+    fileinfo: The FileInfo object of the new version
+    manifest: The verified manifest of the new version
+    held: The chunks of the new version which are held already
+  Returns:
+    dict[int, str]: The SHA-1 hashes of the chunks written into the new version, by the number of the chunk
+  """
+  wanted = [
+      chunk for chunk in range(1, fileinfo.total_chunks + 1)
+      if chunk not in held and manifest.get(chunk) is not None
+  ]
+  places: dict[int, list[int]] = {chunk: [] for chunk in wanted}
+  patched: dict[int, str] = {}
+
+  with open(basis, 'rb') as f:
+    size = os.fstat(f.fileno()).st_size
+    if manifest.checksums is not None:
+      targets: dict[int, dict[str, list[int]]] = {}
+      for chunk in wanted:
+        start_byte, end_byte = fileinfo.chunk_range(chunk)
+        if end_byte - start_byte + 1 == fileinfo.chunk_size:
+          targets.setdefault(manifest.checksums[chunk - 1], {}).setdefault(manifest.get(chunk), []).append(chunk)
+      for chunk, offset in Rolling.find_chunks(f, fileinfo.chunk_size, targets).items():
+        places[chunk].append(offset)
+    else:
+      for chunk in wanted:
+        places[chunk].append(fileinfo.chunk_range(chunk)[0])
+
+    # The last chunk is shorter than the others, so it's looked for at the end of the previous version
+    if fileinfo.total_chunks in places:
+      start_byte, end_byte = fileinfo.chunk_range(fileinfo.total_chunks)
+      places[fileinfo.total_chunks].append(size - (end_byte - start_byte + 1))
+
+    for chunk in wanted:
+      start_byte, end_byte = fileinfo.chunk_range(chunk)
+      length = end_byte - start_byte + 1
+      for offset in places[chunk]:
+        if offset < 0 or offset + length > size:
+          continue
+        data = os.pread(f.fileno(), length, offset)
+        if (sha1 := hashlib.sha1(data).hexdigest()) == manifest.get(chunk):
+          os.pwrite(fd, data, start_byte)
+          patched[chunk] = sha1
+          break
+  return patched
@@ -1,5 +1,41 @@
 from dataclasses import dataclass
 
+# Size of a chunk of the files which don't record their chunk size (In Bytes)
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Bounds of the chunk size picked for a file (In Bytes)
+MIN_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Count of chunks which the picked chunk size aims for
+TARGET_CHUNKS = 1024
+
+
+def choose_chunk_size(size: int, configured: int = 0) -> int:
+  """
+  Picks the chunk size of a file from its size, a power of two which splits the file into about TARGET_CHUNKS chunks within the bounds. Small files get few chunks, so they take few round trips, and huge files don't create tens of thousands of chunks.
+  Args:
+    size: The size of the file (In Bytes)
+    configured: The chunk size configured for all the files (In Bytes), 0 to pick it from the size
+  Returns:
+    int: The chunk size (In Bytes)
+  """
+  if configured > 0:
+    return configured
+  wanted = -(-size // TARGET_CHUNKS)
+  chunk_size = 1 << max(wanted - 1, 0).bit_length()
+  return min(max(chunk_size, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+
+
+def chunk_count(size: int, chunk_size: int = CHUNK_SIZE) -> int:
+  """
+  Get the count of chunks of a file
+  Args:
+    size: The size of the file (In Bytes)
+    chunk_size: The size of a chunk (In Bytes)
+  """
+  return -(-size // chunk_size)
+
 
 @dataclass(frozen=True)
 class FileInfo:
@@ -10,12 +46,16 @@ class FileInfo:
     size: The size of the file (In Bytes)
     added_time: The time when the file was added (Unix Time)
     total_chunks: The total chunks the file is seperated
+    merkle_root: The root of the Merkle tree over the sha1 hashes of the chunks, empty if the file has no Merkle tree
+    chunk_size: The size of a chunk of the file (In Bytes)
   """
 
   filehash: str
   size: int
   added_time: int
   total_chunks: int
+  merkle_root: str = ""
+  chunk_size: int = CHUNK_SIZE
 
   def to_dict(self) -> dict:
     """
@@ -26,6 +66,8 @@ class FileInfo:
         "size": self.size,
         "added_time": self.added_time,
         "total_chunks": self.total_chunks,
+        "merkle_root": self.merkle_root,
+        "chunk_size": self.chunk_size,
     }
 
   @classmethod
@@ -34,3 +76,18 @@ class FileInfo:
     Method converts the Dictionary object to a File object
     """
     return cls(**data)
+
+  def chunk_range(self, chunk: int) -> tuple[int, int]:
+    """
+    Get the bytes of a chunk of the file
+    Args:
+      chunk: The number of the chunk
+    Returns:
+      tuple[int, int]: The starting byte and the ending byte of the chunk (Both inclusive)
+    Raises:
+      IndexError: If the chunk is out of the range
+    """
+    if not 1 <= chunk <= self.total_chunks:
+      raise IndexError(f"chunk {chunk} is out of range 1-{self.total_chunks}")
+    start_byte = (chunk - 1) * self.chunk_size
+    return start_byte, min(start_byte + self.chunk_size, self.size) - 1
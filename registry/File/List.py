@@ -1,7 +1,13 @@
 from . import FileInfo
+from .Bitmap import ChunkBitmap
+from ..Journal import Journal
+from threading import RLock
 import json
 import base64
 
+# Least count of journaled changes after which the journal is compacted
+COMPACT_AFTER = 4096
+
 
 class FileList:
   """
@@ -9,7 +15,9 @@ class FileList:
   """
 
   def __init__(self):
-    self.__list: dict[str, tuple[FileInfo.FileInfo, int]] = {}
+    self.__list: dict[str, tuple[FileInfo.FileInfo, ChunkBitmap]] = {}
+    self.__journal: Journal | None = None
+    self.__lock = RLock()
 
   def add(self, filename: str, fileinfo: FileInfo.FileInfo, downloaded=False):
     """
@@ -21,13 +29,12 @@ class FileList:
     Raises:
       KeyError: If the filename already exist into the system
     """
-    if filename in self.__list:
-      raise KeyError("The filename already exist")
+    with self.__lock:
+      if filename in self.__list:
+        raise KeyError("The filename already exist")
 
-    if downloaded:
-      self.__list[filename] = (fileinfo, fileinfo.total_chunks)
-    else:
-      self.__list[filename] = (fileinfo, 0)
+      self.__list[filename] = (fileinfo, ChunkBitmap(fileinfo.total_chunks, downloaded))
+      self.__append({"op": "add", "file": filename, "info": fileinfo.to_dict(), "downloaded": downloaded})
 
   def remove(self, filename: str):
     """
@@ -37,10 +44,12 @@ class FileList:
     Raises:
       KeyError: If the filename doesn't exist
     """
-    if filename in self.__list:
-      del self.__list[filename]
-    else:
-      raise KeyError(f"the filename `{filename}` doesn't exist")
+    with self.__lock:
+      if filename in self.__list:
+        del self.__list[filename]
+        self.__append({"op": "remove", "file": filename})
+      else:
+        raise KeyError(f"the filename `{filename}` doesn't exist")
 
   def get(self, filename: str) -> FileInfo.FileInfo:
     """
@@ -69,46 +78,150 @@ class FileList:
     else:
       return False
 
-  def save(self, filepath: str):
+  def __snapshot(self) -> bytes:
+    """
+    Serializes the whole list, must be called while holding the lock
+    Returns:
+      bytes: The base64 encoded JSON map of the files, their information and their bitmaps
     """
-    Save the FileList to a file
+    data = {}
+    for filename, (fileinfo, bitmap) in self.__list.items():
+      data[filename] = (fileinfo.to_dict(), bitmap.to_base64())
+    return base64.b64encode(json.dumps(data).encode('utf-8'))
+
+  def __append(self, record: dict):
+    """
+    Appends the change into the attached journal, and compacts the journal when it grows too much. Must be called while holding the lock
+    Args:
+      record: The change which is done to the list
+    """
+    if self.__journal is None:
+      return
+    # Compacting only after as many changes as there are files keeps the cost of a change constant
+    self.__journal.compact_after = max(COMPACT_AFTER, len(self.__list))
+    if self.__journal.append(record):
+      self.__journal.write_snapshot(self.__snapshot())
+
+  def attach(self, filepath: str):
+    """
+    Keep the FileList saved into a file, after attaching every change (Including every completed chunk) is appended into the journal of the file instead of rewriting the whole file
     Args:
       filepath: The path where to save the data at
     """
-    data = {}
-    for filename, fileinfo in self.__list.items():
-      data[filename] = (fileinfo[0].to_dict(), fileinfo[1])
+    with self.__lock:
+      if self.__journal is not None:
+        self.__journal.close()
+      self.__journal = Journal(filepath)
+      self.__journal.write_snapshot(self.__snapshot())
 
-    with open(filepath, 'wb') as f:
-      f.write(base64.b64encode(json.dumps(data).encode('utf-8')))
+  def save(self, filepath: str):
+    """
+    Save the whole FileList to a file
+    Args:
+      filepath: The path where to save the data at
+    """
+    with self.__lock:
+      if self.__journal is not None and self.__journal.filepath == filepath:
+        self.__journal.write_snapshot(self.__snapshot())
+      else:
+        Journal(filepath).write_snapshot(self.__snapshot())
 
   def load(self, filepath: str):
     """
-    Load the FileList from a file
+    Load the FileList from a file, the current files are replaced by the files of the file. The journal of the file is replayed over it, and a torn change at its end is dropped.
     Args:
       filepath: The path where the file is saved
+    Raises:
+      FileNotFoundError: If nothing is saved at the path
     """
-    with open(filepath, 'rb') as f:
-      bdata = base64.b64decode(f.read())
-      obj: dict[str, tuple[dict, int]] = json.loads(bdata)
-      for filename, fileinfo in obj.items():
-        self.__list[filename] = (FileInfo.FileInfo.from_dict(fileinfo[0]), fileinfo[1])
+    journal = Journal(filepath)
+    if not journal.exists():
+      raise FileNotFoundError(filepath)
+
+    with self.__lock:
+      self.__list.clear()
+      if (snapshot := journal.read_snapshot()) is not None:
+        obj: dict[str, tuple[dict, str | int]] = json.loads(base64.b64decode(snapshot))
+        for filename, (info, progress) in obj.items():
+          fileinfo = FileInfo.FileInfo.from_dict(info)
+          # Older files only kept the last serially downloaded chunk
+          if isinstance(progress, int):
+            bitmap = ChunkBitmap.from_prefix(fileinfo.total_chunks, progress)
+          else:
+            bitmap = ChunkBitmap.from_base64(fileinfo.total_chunks, progress)
+          self.__list[filename] = (fileinfo, bitmap)
+
+      for record in journal.replay():
+        filename = record["file"]
+        match record["op"]:
+          case "add":
+            fileinfo = FileInfo.FileInfo.from_dict(record["info"])
+            self.__list[filename] = (fileinfo, ChunkBitmap(fileinfo.total_chunks, record["downloaded"]))
+          case "remove":
+            self.__list.pop(filename, None)
+          case "chunk":
+            if filename in self.__list:
+              try:
+                self.__list[filename][1].set(record["chunk"])
+              except IndexError:
+                pass
+          case "clear":
+            if filename in self.__list:
+              try:
+                self.__list[filename][1].clear(record["chunk"])
+              except IndexError:
+                pass
+          case "reset":
+            if filename in self.__list:
+              fileinfo = self.__list[filename][0]
+              self.__list[filename] = (fileinfo, ChunkBitmap(fileinfo.total_chunks))
 
   def completed(self, filename: str, chunk_num: int) -> bool:
     """
-    Mark download complete of the specific chunk, make sure that you complete downloading the chunk serially, otherwise this method will throw an error
+    Mark download complete of the specific chunk, the chunks can be completed in any order
     Args:
       filename: The name of the file
       chunk_num: The chunk which download has been completed
     Returns:
-      bool: Returns True if successful, otherwise False
+      bool: Returns True if the chunk is newly completed, False if it was already completed or out of range
     """
-    fileinfo, cchunk = self.__list[filename]
-    if (chunk_num == (cchunk + 1)) and (chunk_num <= fileinfo.total_chunks):
-      self.__list[filename] = (fileinfo, chunk_num)
-      return True
-    else:
-      return False
+    with self.__lock:
+      try:
+        newly = self.__list[filename][1].set(chunk_num)
+      except IndexError:
+        return False
+      if newly:
+        self.__append({"op": "chunk", "file": filename, "chunk": chunk_num})
+      return newly
+
+  def uncompleted(self, filename: str, chunk_num: int) -> bool:
+    """
+    Mark the specific chunk as not downloaded, used when the bytes of a recorded chunk are lost
+    Args:
+      filename: The name of the file
+      chunk_num: The number of the chunk
+    Returns:
+      bool: Returns True if the chunk was completed before, False if it wasn't completed or out of range
+    """
+    with self.__lock:
+      try:
+        cleared = self.__list[filename][1].clear(chunk_num)
+      except IndexError:
+        return False
+      if cleared:
+        self.__append({"op": "clear", "file": filename, "chunk": chunk_num})
+      return cleared
+
+  def reset(self, filename: str):
+    """
+    Mark all the chunks of the file as not downloaded
+    Args:
+      filename: The name of the file
+    """
+    with self.__lock:
+      fileinfo = self.__list[filename][0]
+      self.__list[filename] = (fileinfo, ChunkBitmap(fileinfo.total_chunks))
+      self.__append({"op": "reset", "file": filename})
 
   def isDownloaded(self, filename: str) -> bool:
     """
@@ -118,19 +231,73 @@ class FileList:
     Returns:
       bool: Returns True if downloaded, otherwise False
     """
-    fileinfo, cchunk = self.__list[filename]
-    return cchunk == fileinfo.total_chunks
+    return self.__list[filename][1].is_complete()
 
-  def getLastDownloadedChunk(self, filename: str) -> int:
+  def hasChunk(self, filename: str, chunk_num: int) -> bool:
+    """
+    Check if the specific chunk of the file is downloaded
+    Args:
+      filename: The name of the file
+      chunk_num: The number of the chunk
+    Returns:
+      bool: Returns True if downloaded, otherwise False
     """
-    Get the last downloaded chunk of the file
+    return self.__list[filename][1].has(chunk_num)
+
+  def getMissingChunks(self, filename: str) -> list[int]:
+    """
+    Get the chunks of the file which are not downloaded yet
     Args:
       filename: The name of the file
     Returns:
-      int: Returns the last downloaded chunk
+      list[int]: Returns the missing chunks in increasing order
+    """
+    return self.__list[filename][1].missing()
+
+  def getCompletedCount(self, filename: str) -> int:
+    """
+    Get the count of downloaded chunks of the file
+    Args:
+      filename: The name of the file
+    Returns:
+      int: Returns the count of downloaded chunks
+    """
+    return self.__list[filename][1].count()
+
+  def getBitmap(self, filename: str) -> ChunkBitmap:
+    """
+    Get the bitmap of the downloaded chunks of the file
+    Args:
+      filename: The name of the file
+    Returns:
+      ChunkBitmap: Returns the bitmap of the file
     """
     return self.__list[filename][1]
 
+  def getLastDownloadedChunk(self, filename: str) -> int:
+    """
+    Get the last chunk of the chunks which are downloaded serially from the first chunk
+    Args:
+      filename: The name of the file
+    Returns:
+      int: Returns the last serially downloaded chunk, 0 if the first chunk is missing
+    """
+    return self.__list[filename][1].prefix()
+
+  def findDownloaded(self, filehash: str) -> str | None:
+    """
+    Find a downloaded file by its hash
+    Args:
+      filehash: The SHA-512 hash of the file
+    Returns:
+      str | None: Returns the name of the file, None if no downloaded file has the hash
+    """
+    with self.__lock:
+      for filename, (fileinfo, bitmap) in self.__list.items():
+        if fileinfo.filehash == filehash and bitmap.is_complete():
+          return filename
+    return None
+
   def size(self) -> int:
     """
     Get the size of the list
@@ -0,0 +1,300 @@
+from .FileInfo import FileInfo, CHUNK_SIZE
+from .Rolling import Checksum
+from ..Journal import Journal
+from threading import Lock
+import hashlib
+import json
+import os
+
+# Least count of journaled hashes after which the journal of a manifest is compacted
+COMPACT_AFTER = 1024
+
+
+class ChunkHasher:
+  """
+  ChunkHasher calculates the SHA-1 hash and the weak rolling checksum of every chunk of a stream, the stream can be fed in pieces of any size
+  """
+
+  def __init__(self, chunk_size: int = CHUNK_SIZE):
+    """
+    Args:
+      chunk_size: The size of a chunk (In Bytes)
+    """
+    self.chunk_size = chunk_size
+    self.__hashes: list[str] = []
+    self.__current = hashlib.sha1()
+    self.__checksums: list[int] = []
+    self.__checksum = Checksum()
+    self.__filled = 0
+
+  def update(self, data: bytes):
+    """
+    Feed the next piece of the stream
+    Args:
+      data: The piece of the stream
+    """
+    view = memoryview(data)
+    while len(view) > 0:
+      take = min(len(view), self.chunk_size - self.__filled)
+      self.__current.update(view[:take])
+      self.__checksum.update(view[:take])
+      self.__filled += take
+      view = view[take:]
+      if self.__filled == self.chunk_size:
+        self.__hashes.append(self.__current.hexdigest())
+        self.__checksums.append(self.__checksum.value())
+        self.__current = hashlib.sha1()
+        self.__checksum = Checksum()
+        self.__filled = 0
+
+  def hexdigests(self) -> list[str]:
+    """
+    Get the hashes of the chunks, including the last partial chunk
+    Returns:
+      list[str]: The SHA-1 hashes in the order of the chunks
+    """
+    if self.__filled > 0:
+      return self.__hashes + [self.__current.hexdigest()]
+    return list(self.__hashes)
+
+  def checksums(self) -> list[int]:
+    """
+    Get the weak rolling checksums of the chunks, including the last partial chunk
+    Returns:
+      list[int]: The checksums in the order of the chunks
+    """
+    if self.__filled > 0:
+      return self.__checksums + [self.__checksum.value()]
+    return list(self.__checksums)
+
+
+class Manifest:
+  """
+  Manifest keeps the SHA-1 hash of every chunk of a file, the hashes of the chunks not downloaded yet can be unknown. The manifest of an uploaded file also keeps the weak rolling checksums of the chunks, which let the nodes find the chunks in the previous version of the file. They aren't covered by the Merkle root, so they're only a hint and every chunk found through them is verified with its SHA-1 hash.
+  """
+
+  def __init__(self, total_chunks: int, hashes: list[str | None] | None = None, checksums: list[int] | None = None):
+    """
+    Args:
+      total_chunks: The total chunks of the file
+      hashes: The hashes of the chunks in the order of the chunks (Default all unknown)
+      checksums: The weak rolling checksums of the chunks in the order of the chunks (Default unknown)
+    Raises:
+      ValueError: If the count of hashes or checksums doesn't match the total chunks
+    """
+    if hashes is None:
+      hashes = [None] * total_chunks
+    elif len(hashes) != total_chunks:
+      raise ValueError(f"manifest has {len(hashes)} hashes, not {total_chunks}")
+    if checksums is not None and len(checksums) != total_chunks:
+      raise ValueError(f"manifest has {len(checksums)} checksums, not {total_chunks}")
+    self.total = total_chunks
+    self.__hashes = list(hashes)
+    self.checksums = None if checksums is None else list(checksums)
+
+  def get(self, chunk: int) -> str | None:
+    """
+    Get the hash of a chunk
+    Args:
+      chunk: The number of the chunk
+    Returns:
+      str | None: The SHA-1 hash of the chunk, None if it's unknown or the chunk is out of the range
+    """
+    if not 1 <= chunk <= self.total:
+      return None
+    return self.__hashes[chunk - 1]
+
+  def set(self, chunk: int, sha1: str) -> bool:
+    """
+    Set the hash of a chunk
+    Args:
+      chunk: The number of the chunk
+      sha1: The SHA-1 hash of the chunk
+    Returns:
+      bool: Returns True if the hash is changed, otherwise False
+    Raises:
+      IndexError: If the chunk is out of the range
+    """
+    if not 1 <= chunk <= self.total:
+      raise IndexError(f"chunk {chunk} is out of range 1-{self.total}")
+    if self.__hashes[chunk - 1] == sha1:
+      return False
+    self.__hashes[chunk - 1] = sha1
+    return True
+
+  def hashes(self) -> list[str | None]:
+    """
+    Get the hashes of all the chunks
+    Returns:
+      list[str | None]: The hashes in the order of the chunks, None where unknown
+    """
+    return list(self.__hashes)
+
+  def is_complete(self) -> bool:
+    """
+    Check if the hashes of all the chunks are known
+    """
+    return None not in self.__hashes
+
+  def to_dict(self) -> dict:
+    """
+    Method converts the Manifest object to Dictionary object
+    """
+    data = {
+        "total_chunks": self.total,
+        "hashes": self.__hashes,
+    }
+    if self.checksums is not None:
+      data["checksums"] = self.checksums
+    return data
+
+  @classmethod
+  def from_dict(cls, data: dict) -> "Manifest":
+    """
+    Method converts the Dictionary object to a Manifest object
+    """
+    return cls(data["total_chunks"], data["hashes"], data.get("checksums"))
+
+
+class ManifestStore:
+  """
+  ManifestStore keeps the manifests of the files, every manifest is saved into its own file so that announcing a chunk never needs to read the data of the chunk. The hashes of the downloaded chunks are appended into the journal of the manifest instead of rewriting the whole manifest.
+  """
+
+  def __init__(self, directory: str, downloads: str):
+    """
+    Args:
+      directory: The directory where the manifests are saved
+      downloads: The directory of the files, used for hashing the chunks of the files which don't have a manifest
+    """
+    self.directory = directory
+    self.downloads = downloads
+    self.__lock = Lock()
+    self.__cache: dict[str, Manifest] = {}
+    # Journals of the manifests being recorded, guarded by the lock
+    self.__journals: dict[str, Journal] = {}
+
+  def __path(self, filename: str) -> str:
+    return os.path.join(self.directory, f"{filename}.json")
+
+  def __journal(self, filename: str) -> Journal:
+    """
+    Get the journal of a manifest, must be called while holding the lock
+    """
+    if (journal := self.__journals.get(filename)) is None:
+      journal = self.__journals[filename] = Journal(self.__path(filename), COMPACT_AFTER)
+    return journal
+
+  def __write(self, filename: str, manifest: Manifest):
+    """
+    Atomically saves the whole manifest and empties its journal, must be called while holding the lock
+    """
+    journal = self.__journal(filename)
+    journal.write_snapshot(json.dumps(manifest.to_dict(), separators=(",", ":")).encode('utf-8'))
+    if manifest.is_complete():
+      # No more hashes will be recorded, so the log isn't kept open
+      journal.close()
+      del self.__journals[filename]
+
+  def __load(self, filename: str) -> Manifest | None:
+    """
+    Loads the manifest from its snapshot, and replays its journal over it. Must be called while holding the lock
+    """
+    journal = self.__journal(filename)
+    manifest = None
+    if (snapshot := journal.read_snapshot()) is not None:
+      manifest = Manifest.from_dict(json.loads(snapshot))
+    for record in journal.replay():
+      if manifest is None:
+        manifest = Manifest(record["total"])
+      try:
+        manifest.set(record["chunk"], record["sha1"])
+      except IndexError:
+        pass
+    if manifest is None:
+      journal.close()
+      del self.__journals[filename]
+    return manifest
+
+  def get(self, filename: str) -> Manifest | None:
+    """
+    Get the manifest of a file
+    Args:
+      filename: The name of the file
+    Returns:
+      Manifest | None: The manifest, None if the file has no manifest
+    """
+    with self.__lock:
+      if filename in self.__cache:
+        return self.__cache[filename]
+      if (manifest := self.__load(filename)) is not None:
+        self.__cache[filename] = manifest
+      return manifest
+
+  def save(self, filename: str, manifest: Manifest):
+    """
+    Save the manifest of a file
+    Args:
+      filename: The name of the file
+      manifest: The manifest of the file
+    """
+    with self.__lock:
+      self.__write(filename, manifest)
+      self.__cache[filename] = manifest
+
+  def remove(self, filename: str):
+    """
+    Remove the manifest of a file
+    Args:
+      filename: The name of the file
+    """
+    with self.__lock:
+      self.__cache.pop(filename, None)
+      journal = self.__journals.pop(filename, None) or Journal(self.__path(filename))
+      journal.close()
+      for path in (journal.filepath, journal.logpath):
+        if os.path.exists(path):
+          os.remove(path)
+
+  def record(self, filename: str, total_chunks: int, chunk: int, sha1: str):
+    """
+    Record the hash of a verified chunk of a file, the hash is appended into the journal of the manifest
+    Args:
+      filename: The name of the file
+      total_chunks: The total chunks of the file
+      chunk: The number of the chunk
+      sha1: The SHA-1 hash of the chunk
+    """
+    manifest = self.get(filename) or Manifest(total_chunks)
+    with self.__lock:
+      self.__cache[filename] = manifest
+      if not manifest.set(chunk, sha1):
+        return
+      journal = self.__journal(filename)
+      # Compacting only after as many hashes as there are chunks keeps the cost of a hash constant
+      journal.compact_after = max(COMPACT_AFTER, manifest.total)
+      if journal.append({"total": manifest.total, "chunk": chunk, "sha1": sha1}) or manifest.is_complete():
+        self.__write(filename, manifest)
+
+  def chunk_hash(self, filename: str, fileinfo: FileInfo, chunk: int) -> str:
+    """
+    Get the hash of a chunk of a file which is held by the current node. The chunks of the files saved before the manifests existed are hashed once from the file, and remembered.
+    Args:
+      filename: The name of the file
+      fileinfo: The FileInfo object of the file
+      chunk: The number of the chunk
+    Returns:
+      str: The SHA-1 hash of the chunk
+    Raises:
+      IndexError: If the chunk is out of the range
+    """
+    manifest = self.get(filename)
+    if manifest is not None and (sha1 := manifest.get(chunk)) is not None:
+      return sha1
+
+    start_byte, end_byte = fileinfo.chunk_range(chunk)
+    with open(os.path.join(self.downloads, filename), 'rb') as f:
+      f.seek(start_byte)
+      sha1 = hashlib.sha1(f.read(end_byte - start_byte + 1)).hexdigest()
+    self.record(filename, fileinfo.total_chunks, chunk, sha1)
+    return sha1
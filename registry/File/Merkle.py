@@ -0,0 +1,30 @@
+import hashlib
+
+# Prefixes of the hashed leaves and the hashed inner nodes, so that a leaf can never be passed as an inner node
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def merkle_root(chunk_hashes: list[str]) -> str:
+  """
+  Calculates the root of the Merkle tree over the hashes of the chunks of a file. The leaves are the SHA-1 hashes of the chunks in their order, the tree is hashed with SHA-256, and a node without a pair is moved up to the next level unchanged.
+  Args:
+    chunk_hashes: The SHA-1 hashes of the chunks (In hex)
+  Returns:
+    str: The root of the tree (In hex)
+  Raises:
+    ValueError: If a hash is not a valid hex string
+  """
+  if not chunk_hashes:
+    return hashlib.sha256(b"").hexdigest()
+
+  level = [hashlib.sha256(LEAF_PREFIX + bytes.fromhex(h)).digest() for h in chunk_hashes]
+  while len(level) > 1:
+    paired = [
+        hashlib.sha256(NODE_PREFIX + level[i] + level[i + 1]).digest()
+        for i in range(0, len(level) - 1, 2)
+    ]
+    if len(level) % 2 == 1:
+      paired.append(level[-1])
+    level = paired
+  return level[0].hex()
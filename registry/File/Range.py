@@ -0,0 +1,171 @@
+from typing import BinaryIO, Iterator
+import secrets
+
+# Size of the buffer used for streaming a file (In Bytes)
+BUFFER_SIZE = 256 * 1024
+
+# More ranges than this in a single request are ignored, and the whole file is sent
+MAX_RANGES = 16
+
+
+class UnsatisfiableRange(ValueError):
+  """
+  Raised when none of the requested ranges overlaps the file
+  """
+
+
+def parse_range(header: str, size: int) -> list[tuple[int, int]] | None:
+  """
+  Parses the Range header of a request (RFC 9110), supports the closed (`0-99`), open ended (`100-`) and suffix (`-100`) ranges, and multiple ranges separated by commas
+  Args:
+    header: The value of the Range header
+    size: The size of the file (In Bytes)
+  Returns:
+    list[tuple[int, int]] | None: The starting byte and the ending byte of the ranges (Both inclusive), None if the header is invalid and must be ignored
+  Raises:
+    UnsatisfiableRange: If no range overlaps the file
+  """
+  unit, _, value = header.strip().partition("=")
+  if unit.strip().lower() != "bytes" or not value:
+    return None
+
+  specs = value.split(",")
+  if len(specs) > MAX_RANGES:
+    return None
+
+  ranges: list[tuple[int, int]] = []
+  for spec in specs:
+    first, dash, last = spec.strip().partition("-")
+    if not dash or (first and not first.isdigit()) or (last and not last.isdigit()):
+      return None
+
+    if not first:
+      # Suffix range, the last bytes of the file
+      if not last:
+        return None
+      if int(last) == 0:
+        continue
+      ranges.append((max(size - int(last), 0), size - 1))
+    else:
+      start = int(first)
+      if last and int(last) < start:
+        return None
+      if start >= size:
+        continue
+      end = int(last) if last else size - 1
+      ranges.append((start, min(end, size - 1)))
+
+  if not ranges:
+    raise UnsatisfiableRange(f"no range satisfies the size {size}")
+  return ranges
+
+
+class RangeFile:
+  """
+  RangeFile is a read only view of a part of a file. It streams the part with a bounded buffer, and exposes the descriptor of the file so that the server can send the part with sendfile. The file is positioned at the start of the part, which is where sendfile starts.
+  """
+
+  def __init__(self, file: BinaryIO, start: int, length: int):
+    """
+    Args:
+      file: The file opened in binary mode, it's closed along with the RangeFile
+      start: The starting byte of the part
+      length: The length of the part (In Bytes)
+    """
+    self.__file = file
+    self.__remaining = length
+    self.__file.seek(start)
+
+  def fileno(self) -> int:
+    """
+    Get the descriptor of the file, used by the server for sendfile
+    """
+    return self.__file.fileno()
+
+  def read(self, size: int = -1) -> bytes:
+    """
+    Reads the next bytes of the part
+    Args:
+      size: The maximum count of bytes (Default till the end of the part)
+    """
+    if size < 0 or size > self.__remaining:
+      size = self.__remaining
+    data = self.__file.read(size)
+    self.__remaining -= len(data)
+    return data
+
+  def close(self):
+    """
+    Closes the file
+    """
+    self.__file.close()
+
+
+def stream(file: BinaryIO, start: int, length: int) -> Iterator[bytes]:
+  """
+  Streams a part of a file with a bounded buffer
+  Args:
+    file: The file opened in binary mode
+    start: The starting byte of the part
+    length: The length of the part (In Bytes)
+  """
+  file.seek(start)
+  while length > 0:
+    data = file.read(min(BUFFER_SIZE, length))
+    if not data:
+      break
+    length -= len(data)
+    yield data
+
+
+class MultipartRanges:
+  """
+  MultipartRanges builds the `multipart/byteranges` body of a response with multiple ranges
+  """
+
+  def __init__(self, filepath: str, ranges: list[tuple[int, int]], size: int, content_type: str = "application/octet-stream"):
+    """
+    Args:
+      filepath: The path of the file
+      ranges: The starting byte and the ending byte of the ranges (Both inclusive)
+      size: The size of the file (In Bytes)
+      content_type: The content type of every part
+    """
+    self.filepath = filepath
+    self.ranges = ranges
+    self.boundary = secrets.token_hex(16)
+    self.__headers = [
+        (
+            f"--{self.boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode()
+        for start, end in ranges
+    ]
+    self.__closing = f"\r\n--{self.boundary}--\r\n".encode()
+
+  @property
+  def content_type(self) -> str:
+    """
+    Get the content type of the response, which carries the boundary of the parts
+    """
+    return f"multipart/byteranges; boundary={self.boundary}"
+
+  def __len__(self) -> int:
+    """
+    Get the length of the whole body (In Bytes)
+    """
+    parts = sum(end - start + 1 for start, end in self.ranges)
+    # Every part except the first one is separated from the previous part with a line break
+    return sum(len(h) for h in self.__headers) + parts + 2 * (len(self.ranges) - 1) + len(self.__closing)
+
+  def __iter__(self) -> Iterator[bytes]:
+    """
+    Streams the body, the parts are read with a bounded buffer
+    """
+    with open(self.filepath, "rb") as f:
+      for i, (start, end) in enumerate(self.ranges):
+        yield (b"\r\n" if i > 0 else b"") + self.__headers[i]
+        yield from stream(f, start, end - start + 1)
+      yield self.__closing
+
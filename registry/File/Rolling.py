@@ -0,0 +1,135 @@
+from typing import BinaryIO
+import hashlib
+import numpy as np
+
+# Count of window positions checked together while scanning a file (In Bytes)
+SEGMENT = 4 * 1024 * 1024
+
+
+def combine(a: int, b: int) -> int:
+  """
+  Combines the two sums of a window into its weak checksum
+  """
+  return (a & 0xFFFF) | ((b & 0xFFFF) << 16)
+
+
+class Checksum:
+  """
+  Checksum calculates the weak rolling checksum (The one of rsync) of a chunk, the chunk can be fed in pieces of any size. The checksum is cheap to slide over a file one byte at a time, so a chunk can be searched at every offset of a file, and only the offsets where the checksum matches are hashed with SHA-1.
+  """
+
+  def __init__(self):
+    self.length = 0
+    # Sum of the bytes, and sum of the bytes weighted by their position
+    self.__sum = 0
+    self.__weighted = 0
+
+  def update(self, data: bytes | memoryview):
+    """
+    Feed the next piece of the chunk
+    Args:
+      data: The piece of the chunk
+    """
+    view = np.frombuffer(data, dtype=np.uint8)
+    for start in range(0, len(view), SEGMENT):
+      piece = view[start:start + SEGMENT].astype(np.int64)
+      positions = np.arange(self.length, self.length + len(piece), dtype=np.int64)
+      self.__sum += int(piece.sum())
+      self.__weighted += int((piece * positions).sum())
+      self.length += len(piece)
+
+  def sums(self) -> tuple[int, int]:
+    """
+    Get the two sums of the bytes fed so far, every byte is weighted by its distance from the end of the chunk in the second one
+    """
+    return self.__sum, self.length * self.__sum - self.__weighted
+
+  def value(self) -> int:
+    """
+    Get the checksum of the bytes fed so far
+    Returns:
+      int: The 32 bit weak checksum
+    """
+    return combine(*self.sums())
+
+
+def checksum(data: bytes | memoryview) -> int:
+  """
+  Get the weak rolling checksum of a chunk
+  Args:
+    data: The bytes of the chunk
+  Returns:
+    int: The 32 bit weak checksum
+  """
+  summer = Checksum()
+  summer.update(data)
+  return summer.value()
+
+
+def find_chunks(f: BinaryIO, window: int, targets: dict[int, dict[str, list[int]]]) -> dict[int, int]:
+  """
+  Searches the chunks at every offset of a file, the weak checksum is rolled over the file a segment at a time, and the offsets where it matches a chunk are verified with SHA-1
+  Args:
+    f: The file which is searched, read from its current position
+    window: The size of the chunks (In Bytes)
+    targets: The numbers of the searched chunks by their SHA-1 hash, by their weak checksum
+  Returns:
+    dict[int, int]: The offset where every found chunk starts in the file, by the number of the chunk
+  """
+  found: dict[int, int] = {}
+  targets = {weak: dict(hashes) for weak, hashes in targets.items()}
+  if window <= 0 or not targets:
+    return found
+  keys = np.array(sorted(targets), dtype=np.uint32)
+  # A table over the upper halves of the checksums drops most offsets before the whole checksums are compared
+  table = np.zeros(1 << 16, dtype=bool)
+  table[keys >> 16] = True
+  # Only the lower 16 bits of the sums are kept, so they're rolled in 16 bit integers which wrap around
+  scale = np.uint16(window & 0xFFFF)
+
+  buffer = bytearray(f.read(window + SEGMENT - 1))
+  if len(buffer) < window:
+    return found
+  first = Checksum()
+  first.update(buffer[:window])
+  a0, b0 = first.sums()
+  base = 0
+  while len(buffer) >= window and targets:
+    # Sums of the windows starting at the offsets base, base + 1, ..., base + count - 1
+    # Sliding by one byte drops the leaving byte from both sums, and adds the whole new window to the weighted one
+    count = len(buffer) - window + 1
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    leaving = data[:count - 1].astype(np.uint16)
+    entering = data[window:window + count - 1].astype(np.uint16)
+    a = np.empty(count, dtype=np.uint16)
+    b = np.empty(count, dtype=np.uint16)
+    a[0], b[0] = a0 & 0xFFFF, b0 & 0xFFFF
+    np.cumsum(entering - leaving, dtype=np.uint16, out=a[1:])
+    a[1:] += a[0]
+    np.cumsum(a[1:] - scale * leaving, dtype=np.uint16, out=b[1:])
+    b[1:] += b[0]
+
+    candidates = np.flatnonzero(table[b])
+    weak = a[candidates].astype(np.uint32) | (b[candidates].astype(np.uint32) << 16)
+    matched = np.isin(weak, keys)
+    for index, value in zip(candidates[matched], weak[matched]):
+      if (hashes := targets.get(int(value))) is None:
+        continue
+      sha1 = hashlib.sha1(data[index:index + window]).hexdigest()
+      if (chunks := hashes.pop(sha1, None)) is None:
+        continue
+      for chunk in chunks:
+        found[chunk] = base + int(index)
+      if not hashes:
+        del targets[int(value)]
+
+    # The sums are carried to the next segment, and the view must be released before the buffer is resized
+    leaving_byte = int(data[count - 1])
+    del data
+    base += count
+    del buffer[:count]
+    buffer += f.read(count)
+    if len(buffer) >= window:
+      a0 = int(a[-1]) - leaving_byte + buffer[window - 1]
+      b0 = int(b[-1]) - window * leaving_byte + a0
+  return found
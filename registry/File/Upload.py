@@ -0,0 +1,363 @@
+from .FileInfo import CHUNK_SIZE, chunk_count
+from .Rolling import checksum
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Callable
+import hashlib
+import json
+import os
+import secrets
+
+# Size of the pieces in which the body of an upload is read (In Bytes)
+BUFFER_SIZE = 256 * 1024
+
+
+class UploadConflict(ValueError):
+  """
+  Raised when the bytes of an upload would leave a gap inside a chunk, or the upload is finalized before all the bytes arrived
+  """
+
+
+def parse_content_range(header: str) -> tuple[int, int, int]:
+  """
+  Parses the Content-Range header of an upload, like `bytes 0-99/1000`
+  Args:
+    header: The value of the Content-Range header
+  Returns:
+    tuple[int, int, int]: The starting byte, the ending byte (Both inclusive) and the size of the file
+  Raises:
+    ValueError: If the header is invalid
+  """
+  unit, _, value = header.strip().partition(" ")
+  span, _, size = value.partition("/")
+  first, _, last = span.partition("-")
+  if unit.lower() != "bytes" or not (first.isdigit() and last.isdigit() and size.isdigit()):
+    raise ValueError(f"invalid Content-Range: {header}")
+  start, end, size = int(first), int(last), int(size)
+  if end < start or end >= size:
+    raise ValueError(f"invalid Content-Range: {header}")
+  return start, end, size
+
+
+class UploadSession:
+  """
+  UploadSession receives the bytes of a file in ranges of any size and in any order, and can be resumed after the connection drops. Every chunk is hashed in the pool as soon as all its bytes arrived, and the SHA-512 hash of the file advances over the chunks as they complete in order, so finalizing the upload only waits for the last chunk.
+  """
+
+  def __init__(self, upload_id: str, filename: str, size: int, path: str, pool: ThreadPoolExecutor, chunk_size: int = CHUNK_SIZE):
+    """
+    Args:
+      upload_id: The id of the upload
+      filename: The name of the file being uploaded
+      size: The size of the file (In Bytes)
+      path: The path where the bytes of the upload are written
+      pool: The pool which hashes the chunks
+      chunk_size: The size of a chunk (In Bytes)
+    """
+    self.id = upload_id
+    self.filename = filename
+    self.size = size
+    self.path = path
+    self.chunk_size = chunk_size
+    self.total_chunks = chunk_count(size, chunk_size)
+    self.__pool = pool
+    self.__lock = Lock()
+    # Count of bytes received from the start of every chunk
+    self.__filled = [0] * self.total_chunks
+    self.__hashes: list[str | None] = [None] * self.total_chunks
+    self.__checksums: list[int | None] = [None] * self.total_chunks
+    self.__futures: list[Future] = []
+    self.__digest_lock = Lock()
+    self.__sha512 = hashlib.sha512()
+    self.__digested = 0
+
+    self.__fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    if os.fstat(self.__fd).st_size != size:
+      os.ftruncate(self.__fd, size)
+
+  def chunk_length(self, chunk: int) -> int:
+    """
+    Get the length of a chunk (In Bytes)
+    Args:
+      chunk: The index of the chunk (Starting from 0)
+    """
+    return min(self.chunk_size, self.size - chunk * self.chunk_size)
+
+  def received(self) -> int:
+    """
+    Get the count of bytes received
+    """
+    with self.__lock:
+      return sum(self.__filled)
+
+  def missing(self) -> list[tuple[int, int]]:
+    """
+    Get the ranges of bytes which are not received yet, the upload is resumed by sending them
+    Returns:
+      list[tuple[int, int]]: The starting byte and the ending byte of the ranges (Both inclusive)
+    """
+    ranges: list[tuple[int, int]] = []
+    with self.__lock:
+      for chunk, filled in enumerate(self.__filled):
+        length = self.chunk_length(chunk)
+        if filled == length:
+          continue
+        start = chunk * self.chunk_size + filled
+        end = chunk * self.chunk_size + length - 1
+        if ranges and ranges[-1][1] + 1 == start:
+          ranges[-1] = (ranges[-1][0], end)
+        else:
+          ranges.append((start, end))
+    return ranges
+
+  def write(self, start: int, length: int, read: Callable[[int], bytes]) -> int:
+    """
+    Writes a range of bytes of the file, the bytes are read in pieces of a bounded size. A range may start anywhere up to the bytes already received in its chunk, and bytes of chunks which are already complete are skipped.
+    Args:
+      start: The starting byte of the range
+      length: The length of the range (In Bytes)
+      read: The function reading the next bytes of the range, at most the given count
+    Returns:
+      int: The count of bytes read, less than the length if the body ended early
+    Raises:
+      UploadConflict: If the range is outside the file, or starts after the bytes received in its chunk
+    """
+    if start < 0 or length < 0 or start + length > self.size:
+      raise UploadConflict(f"range {start}+{length} is outside the file of size {self.size}")
+    if length > 0:
+      chunk, offset = divmod(start, self.chunk_size)
+      with self.__lock:
+        if offset > self.__filled[chunk]:
+          raise UploadConflict(f"chunk {chunk + 1} has only {self.__filled[chunk]} bytes, cannot write at {offset}")
+
+    position = start
+    end = start + length
+    while position < end:
+      data = read(min(BUFFER_SIZE, end - position))
+      if not data:
+        break
+      view = memoryview(data)
+      while len(view) > 0:
+        chunk, offset = divmod(position, self.chunk_size)
+        take = min(len(view), self.chunk_size - offset)
+        self.__write_chunk(chunk, offset, view[:take])
+        position += take
+        view = view[take:]
+    return position - start
+
+  def __write_chunk(self, chunk: int, offset: int, data: memoryview):
+    """
+    Writes bytes inside a chunk, and hashes the chunk once it's complete
+    """
+    with self.__lock:
+      length = self.chunk_length(chunk)
+      if self.__filled[chunk] == length:
+        return
+      os.pwrite(self.__fd, data, chunk * self.chunk_size + offset)
+      self.__filled[chunk] = max(self.__filled[chunk], offset + len(data))
+      if self.__filled[chunk] == length:
+        self.__futures.append(self.__pool.submit(self.__hash_chunk, chunk))
+
+  def __read_chunk(self, chunk: int) -> bytes:
+    return os.pread(self.__fd, self.chunk_length(chunk), chunk * self.chunk_size)
+
+  def __hash_chunk(self, chunk: int):
+    """
+    Hashes a complete chunk, runs in the pool
+    """
+    data = self.__read_chunk(chunk)
+    sha1 = hashlib.sha1(data).hexdigest()
+    weak = checksum(data)
+    with self.__lock:
+      self.__checksums[chunk] = weak
+      self.__hashes[chunk] = sha1
+    self.__advance(chunk, data)
+
+  def __ready(self) -> bool:
+    """
+    Check if the next chunk of the SHA-512 hash is hashed
+    """
+    with self.__lock:
+      return self.__digested < self.total_chunks and self.__hashes[self.__digested] is not None
+
+  def __advance(self, chunk: int = -1, data: bytes | None = None):
+    """
+    Feeds the SHA-512 hash with the hashed chunks which follow the bytes already fed. Only one thread feeds the hash at a time, the others leave their chunks to it.
+    Args:
+      chunk: The index of the chunk which the caller has already read
+      data: The bytes of that chunk
+    """
+    while self.__ready():
+      if not self.__digest_lock.acquire(blocking=False):
+        return
+      try:
+        while self.__ready():
+          next_chunk = self.__digested
+          self.__sha512.update(data if next_chunk == chunk else self.__read_chunk(next_chunk))
+          self.__digested += 1
+      finally:
+        self.__digest_lock.release()
+
+  def finalize(self) -> tuple[str, list[str]]:
+    """
+    Waits for the chunks being hashed, and gives the hashes of the file
+    Returns:
+      tuple[str, list[str]]: The SHA-512 hash of the file, and the SHA-1 hashes of the chunks
+    Raises:
+      UploadConflict: If some bytes of the file are not received
+    """
+    if self.missing():
+      raise UploadConflict("upload is not complete")
+    with self.__lock:
+      futures = list(self.__futures)
+    for future in wait(futures).done:
+      future.result()
+    self.__advance()
+    with self.__digest_lock:
+      return self.__sha512.hexdigest(), list(self.__hashes)
+
+  def checksums(self) -> list[int | None]:
+    """
+    Get the weak rolling checksums of the chunks hashed so far, all of them are known after the upload is finalized
+    Returns:
+      list[int | None]: The checksums in the order of the chunks, None where the chunk isn't hashed yet
+    """
+    with self.__lock:
+      return list(self.__checksums)
+
+  def resume(self):
+    """
+    Hashes the complete chunks again after the session is loaded from the disk, the chunks whose hash or checksum isn't saved
+    """
+    with self.__lock:
+      for chunk, filled in enumerate(self.__filled):
+        if filled == self.chunk_length(chunk) and (self.__hashes[chunk] is None or self.__checksums[chunk] is None):
+          self.__futures.append(self.__pool.submit(self.__hash_chunk, chunk))
+    self.__pool.submit(self.__advance)
+
+  def close(self):
+    """
+    Closes the file of the upload
+    """
+    os.close(self.__fd)
+
+  def to_dict(self) -> dict:
+    """
+    Method converts the UploadSession object to Dictionary object
+    """
+    with self.__lock:
+      return {
+          "id": self.id,
+          "filename": self.filename,
+          "size": self.size,
+          "chunk_size": self.chunk_size,
+          "filled": list(self.__filled),
+          "hashes": list(self.__hashes),
+          "checksums": list(self.__checksums),
+      }
+
+  @classmethod
+  def from_dict(cls, data: dict, path: str, pool: ThreadPoolExecutor) -> "UploadSession":
+    """
+    Method converts the Dictionary object to an UploadSession object
+    """
+    session = cls(data["id"], data["filename"], data["size"], path, pool, data["chunk_size"])
+    session.__filled = data["filled"]
+    session.__hashes = data["hashes"]
+    # Older sessions didn't save the checksums, their chunks are hashed again on resume
+    session.__checksums = data.get("checksums", [None] * session.total_chunks)
+    return session
+
+
+class UploadStore:
+  """
+  UploadStore keeps the upload sessions, the state of every session is saved next to its bytes so that an upload can be resumed after a restart too
+  """
+
+  def __init__(self, directory: str, workers: int | None = None):
+    """
+    Args:
+      directory: The directory where the bytes and the state of the uploads are saved
+      workers: The count of chunks hashed at the same time (Default the count of CPUs)
+    """
+    self.directory = directory
+    self.__pool = ThreadPoolExecutor(workers or os.cpu_count() or 1, thread_name_prefix="upload-hash")
+    self.__lock = Lock()
+    self.__sessions: dict[str, UploadSession] = {}
+
+  def __path(self, upload_id: str, extension: str) -> str:
+    return os.path.join(self.directory, f"{upload_id}.{extension}")
+
+  def load(self):
+    """
+    Loads the upload sessions saved in the directory
+    """
+    for name in os.listdir(self.directory):
+      if not name.endswith(".json"):
+        continue
+      upload_id = name[:-len(".json")]
+      if not os.path.exists(self.__path(upload_id, "part")):
+        continue
+      with open(self.__path(upload_id, "json"), 'r') as f:
+        session = UploadSession.from_dict(json.load(f), self.__path(upload_id, "part"), self.__pool)
+      session.resume()
+      with self.__lock:
+        self.__sessions[upload_id] = session
+
+  def create(self, filename: str, size: int, chunk_size: int = CHUNK_SIZE) -> UploadSession:
+    """
+    Creates an upload session
+    Args:
+      filename: The name of the file
+      size: The size of the file (In Bytes)
+      chunk_size: The size of a chunk (In Bytes)
+    Returns:
+      UploadSession: The new session
+    Raises:
+      UploadConflict: If the file is being uploaded already
+    """
+    with self.__lock:
+      if any(s.filename == filename for s in self.__sessions.values()):
+        raise UploadConflict(f"{filename} is being uploaded already")
+      upload_id = secrets.token_hex(16)
+      session = UploadSession(upload_id, filename, size, self.__path(upload_id, "part"), self.__pool, chunk_size)
+      self.__sessions[upload_id] = session
+    self.save(session)
+    return session
+
+  def get(self, upload_id: str) -> UploadSession | None:
+    """
+    Get an upload session
+    Args:
+      upload_id: The id of the upload
+    Returns:
+      UploadSession | None: The session, None if there is no such upload
+    """
+    with self.__lock:
+      return self.__sessions.get(upload_id)
+
+  def save(self, session: UploadSession):
+    """
+    Atomically saves the state of an upload session
+    Args:
+      session: The upload session
+    """
+    tmp_path = f"{self.__path(session.id, 'json')}.tmp"
+    with open(tmp_path, 'w') as f:
+      json.dump(session.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp_path, self.__path(session.id, "json"))
+
+  def remove(self, upload_id: str, keep_data: bool = False):
+    """
+    Removes an upload session
+    Args:
+      upload_id: The id of the upload
+      keep_data: If True then the bytes of the upload are kept, used when they are moved into the downloads
+    """
+    with self.__lock:
+      session = self.__sessions.pop(upload_id, None)
+    if session is not None:
+      session.close()
+    for extension in ("json",) if keep_data else ("json", "part"):
+      if os.path.exists(self.__path(upload_id, extension)):
+        os.remove(self.__path(upload_id, extension))
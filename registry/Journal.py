@@ -0,0 +1,116 @@
+import json
+import os
+from threading import Lock
+from typing import Iterator
+
+
+class Journal:
+  """
+  Journal keeps the changes of a state as records appended to a log file which lives next to a snapshot file of the whole state. Loading the snapshot and then replaying the log gives back the state, so a change costs one small append instead of rewriting the whole state.
+  """
+
+  def __init__(self, filepath: str, compact_after: int = 1000):
+    """
+    Args:
+      filepath: The path of the snapshot file, the log is stored at `<filepath>.log`
+      compact_after: The count of records after which the log should be compacted into the snapshot
+    """
+    self.filepath = filepath
+    self.logpath = f"{filepath}.log"
+    self.compact_after = compact_after
+    self.__lock = Lock()
+    self.__records = 0
+    self.__log = None
+
+  def exists(self) -> bool:
+    """
+    Check if the snapshot or the log exists
+    Returns:
+      bool: Returns True if there is anything to load, otherwise False
+    """
+    return os.path.exists(self.filepath) or os.path.exists(self.logpath)
+
+  def read_snapshot(self) -> bytes | None:
+    """
+    Read the snapshot file
+    Returns:
+      bytes | None: Returns the content of the snapshot, None if there is no snapshot
+    """
+    if not os.path.exists(self.filepath):
+      return None
+    with open(self.filepath, 'rb') as f:
+      return f.read()
+
+  def replay(self) -> Iterator[dict]:
+    """
+    Read the records of the log in the order they were appended. A torn record at the end of the log (Process died while writing it) is dropped.
+    Returns:
+      Iterator[dict]: The records of the log
+    """
+    if not os.path.exists(self.logpath):
+      return
+
+    valid_bytes = 0
+    records = 0
+    with open(self.logpath, 'rb') as f:
+      for line in f:
+        if not line.endswith(b"\n"):
+          break
+        try:
+          record = json.loads(line)
+        except ValueError:
+          break
+        valid_bytes += len(line)
+        records += 1
+        yield record
+
+    # Cutting the torn record, so that the next appends stay readable
+    if os.path.getsize(self.logpath) != valid_bytes:
+      with open(self.logpath, 'r+b') as f:
+        f.truncate(valid_bytes)
+    self.__records = records
+
+  def append(self, record: dict) -> bool:
+    """
+    Append a record to the log
+    Args:
+      record: The JSON serializable record
+    Returns:
+      bool: Returns True if the log has grown enough to be compacted, otherwise False
+    """
+    line = json.dumps(record, separators=(",", ":")).encode('utf-8') + b"\n"
+    with self.__lock:
+      if self.__log is None:
+        self.__log = open(self.logpath, 'ab')
+      self.__log.write(line)
+      self.__log.flush()
+      self.__records += 1
+      return self.__records >= self.compact_after
+
+  def write_snapshot(self, data: bytes):
+    """
+    Atomically replace the snapshot with the new state, and empty the log which is now part of the snapshot
+    Args:
+      data: The whole state
+    """
+    with self.__lock:
+      tmp_path = f"{self.filepath}.tmp"
+      with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+      os.replace(tmp_path, self.filepath)
+
+      if self.__log is not None:
+        self.__log.close()
+      self.__log = open(self.logpath, 'wb')
+      self.__records = 0
+
+  def close(self):
+    """
+    Close the log file
+    """
+    with self.__lock:
+      if self.__log is not None:
+        self.__log.close()
+        self.__log = None
@@ -0,0 +1,381 @@
+from dataclasses import dataclass
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Lock
+from typing import Callable
+import base64
+import hashlib
+import json
+import logging
+import math
+import time
+import httpx
+from environments import Env
+from .List import NodeList
+
+# Count of messages remembered for deduplication and for repairing other nodes
+MAX_MESSAGES = 4096
+
+# Count of the newest messages which are sent in a digest
+DIGEST_SIZE = 256
+
+# Seconds between two push-pull digest exchanges
+DIGEST_INTERVAL = 5.0
+
+# Hops of the chunk availability announcements, with the adaptive fanout they reach the square of the fanout count of nodes
+CHUNK_TTL = 2
+
+
+@dataclass(frozen=True)
+class Message:
+  """
+  Class refers to a message which is spread through the network by gossip
+  Args:
+    id: The unique id of the message
+    kind: The kind of the message, decides which handler receives it (e.g. 'block', 'chunks')
+    payload: The content of the message
+    ttl: The count of hops the message can still travel
+    origin_time: The time when the message was published (Unix Time)
+  """
+
+  id: str
+  kind: str
+  payload: bytes
+  ttl: int
+  origin_time: float
+
+  def to_dict(self) -> dict:
+    """
+    Method converts the Message object to Dictionary object
+    """
+    return {
+        "id": self.id,
+        "kind": self.kind,
+        "payload": base64.b64encode(self.payload).decode(),
+        "ttl": self.ttl,
+        "origin_time": self.origin_time,
+    }
+
+  @classmethod
+  def from_dict(cls, data: dict) -> "Message":
+    """
+    Method converts the Dictionary object to a Message object
+    """
+    return cls(
+        data["id"],
+        data["kind"],
+        base64.b64decode(data["payload"]),
+        int(data["ttl"]),
+        float(data["origin_time"]),
+    )
+
+
+class Gossip:
+  """
+  Class spreads messages (New blocks, chunk availability) through the network by epidemic push, and repairs the missed messages by periodically exchanging digests with a random node (push-pull)
+  """
+
+  def __init__(self, nodelist: NodeList):
+    """
+    Args:
+      nodelist: The nodes where the messages are spread
+    """
+    self.__nodelist = nodelist
+    self.__handlers: dict[str, Callable[[bytes], bool]] = {}
+    self.__piggyback: dict[str, tuple[Callable[[], str], Callable[[str, int, str], None]]] = {}
+    self.__messages: OrderedDict[str, Message] = OrderedDict()
+    self.__lock = Lock()
+    self.__pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gossip")
+    self.__job = Thread(target=self.__work, daemon=True)
+    self.__delays: deque[float] = deque(maxlen=1000)
+    self.__counters = {
+        "published": 0,
+        "received": 0,
+        "duplicates": 0,
+        "delivered": 0,
+        "pushed": 0,
+        "push_failures": 0,
+        "repaired": 0,
+    }
+
+  def register(self, kind: str, handler: Callable[[bytes], bool]):
+    """
+    Register the handler of a message kind
+    Args:
+      kind: The kind of the message
+      handler: Function which receives the payload, and returns True if the message is valid and must be spread further
+    """
+    self.__handlers[kind] = handler
+
+  def piggyback(self, header: str, provider: Callable[[], str], observer: Callable[[str, int, str], None]):
+    """
+    Piggyback a value on the gossip traffic, the value is sent as a header with every push and digest exchange (Both requests and responses), so that nodes learn it without extra requests
+    Args:
+      header: The name of the HTTP header
+      provider: Function which returns the value of the current node
+      observer: Function which receives the IP Address, port and value of the other node
+    """
+    self.__piggyback[header] = (provider, observer)
+
+  def piggyback_headers(self) -> dict[str, str]:
+    """
+    Get the piggybacked headers of the current node
+    Returns:
+      dict[str, str]: The headers and their values
+    """
+    return {header: provider() for header, (provider, _) in self.__piggyback.items()}
+
+  def observe(self, ip: str, port: int, headers) -> None:
+    """
+    Give the piggybacked headers sent by other node to their observers
+    Args:
+      ip: The IP Address of the other node
+      port: The port number of the other node
+      headers: The headers of the request or response
+    """
+    for header, (_, observer) in self.__piggyback.items():
+      if (value := headers.get(header)) is not None:
+        try:
+          observer(ip, port, value)
+        except Exception:
+          continue
+
+  def fanout(self) -> int:
+    """
+    Get the count of nodes a message is pushed to, it grows with the logarithm of the network size so that small networks don't get many redundant copies and large networks still get fully covered
+    Returns:
+      int: The count of nodes
+    """
+    peers = self.__nodelist.size() - 1
+    if peers <= 0:
+      return 0
+    return min(peers, math.ceil(math.log(peers)) + 1)
+
+  def default_ttl(self) -> int:
+    """
+    Get the count of hops which is enough for a message to cover the whole network
+    Returns:
+      int: The count of hops
+    """
+    return math.ceil(math.log2(self.__nodelist.size() + 1)) + 1
+
+  def publish(self, kind: str, payload: bytes, msg_id: str | None = None, ttl: int | None = None) -> bool:
+    """
+    Publish a new message from the current node
+    Args:
+      kind: The kind of the message
+      payload: The content of the message
+      msg_id: The unique id of the message, sha256 of the kind and payload by default
+      ttl: The count of hops the message can travel, by default enough to cover the whole network
+    Returns:
+      bool: Returns True if the message is published, False if the message was already known
+    """
+    if msg_id is None:
+      msg_id = hashlib.sha256(kind.encode() + b"\0" + payload).hexdigest()
+    if ttl is None:
+      ttl = self.default_ttl()
+
+    msg = Message(msg_id, kind, payload, ttl, time.time())
+    if not self.__remember(msg):
+      return False
+
+    self.__counters["published"] += 1
+    self.__spread(msg, exclude=None)
+    return True
+
+  def receive(self, msg: Message, sender_ip: str | None = None, forward: bool = True) -> bool:
+    """
+    Receive a message from other node, new messages are given to their handler, and then pushed to other nodes if the handler accepts them
+    Args:
+      msg: The received message
+      sender_ip: The IP Address of the node which pushed the message
+      forward: Set it False to not push the message any further
+    Returns:
+      bool: Returns True if the message was new, otherwise False
+    """
+    self.__counters["received"] += 1
+    if not self.__remember(msg):
+      self.__counters["duplicates"] += 1
+      return False
+
+    self.__delays.append(max(0.0, time.time() - msg.origin_time))
+
+    if (handler := self.__handlers.get(msg.kind)) is None:
+      logging.warning(f"no gossip handler for message kind `{msg.kind}`")
+      return True
+
+    try:
+      accepted = handler(msg.payload)
+    except Exception as e:
+      logging.error(f"gossip handler of `{msg.kind}` failed: {e}")
+      return True
+
+    self.__counters["delivered"] += 1
+    if accepted and forward and msg.ttl > 1:
+      self.__spread(
+          Message(msg.id, msg.kind, msg.payload, msg.ttl - 1, msg.origin_time),
+          exclude=sender_ip,
+      )
+    return True
+
+  def digest(self) -> list[str]:
+    """
+    Get the ids of the newest messages known by the current node
+    Returns:
+      list[str]: The ids of the messages
+    """
+    with self.__lock:
+      ids = list(self.__messages.keys())
+    return ids[-DIGEST_SIZE:]
+
+  def exchange(self, ids: list[str]) -> tuple[list[Message], list[str]]:
+    """
+    Compare the digest of other node with the messages of the current node
+    Args:
+      ids: The digest of the other node
+    Returns:
+      tuple[list[Message], list[str]]: The messages which the other node is missing, and the ids which the current node is missing
+    """
+    remote = set(ids)
+    with self.__lock:
+      newest = list(self.__messages.items())[-DIGEST_SIZE:]
+      missing_remote = [msg for msg_id, msg in newest if msg_id not in remote]
+      missing_local = [i for i in ids if i not in self.__messages]
+    return missing_remote, missing_local
+
+  def get(self, msg_id: str) -> Message | None:
+    """
+    Get a remembered message
+    Args:
+      msg_id: The id of the message
+    Returns:
+      Message | None: The message, None if it's not remembered
+    """
+    with self.__lock:
+      return self.__messages.get(msg_id)
+
+  def stats(self) -> dict:
+    """
+    Get the counters of the gossip
+    Returns:
+      dict: The counters, the redundancy ratio (Share of received messages which were already known) and the delay between publishing and receiving of the messages. The largest delay among all the nodes is the time to full coverage
+    """
+    counters = dict(self.__counters)
+    received = counters["received"]
+    delays = sorted(self.__delays)
+    counters["redundancy_ratio"] = counters["duplicates"] / received if received else 0.0
+    counters["median_delay"] = delays[len(delays) // 2] if delays else 0.0
+    counters["time_to_coverage"] = delays[-1] if delays else 0.0
+    counters["fanout"] = self.fanout()
+    return counters
+
+  def start(self):
+    """
+    Starts the periodic push-pull digest exchange
+    Raises:
+      ChildProcessError: If the exchange is already running
+    """
+    if self.__job.is_alive():
+      raise ChildProcessError("job is already started")
+    self.__job.start()
+
+  def __remember(self, msg: Message) -> bool:
+    """
+    Remember the message, so that the duplicates are ignored
+    Returns:
+      bool: Returns True if the message was not known before, otherwise False
+    """
+    with self.__lock:
+      if msg.id in self.__messages:
+        return False
+      self.__messages[msg.id] = msg
+      if len(self.__messages) > MAX_MESSAGES:
+        self.__messages.popitem(last=False)
+      return True
+
+  def __peers(self, k: int, exclude: str | None) -> list[tuple[str, int]]:
+    """
+    Picks k healthy nodes excluding the current node
+    Args:
+      k: The count of nodes
+      exclude: IP Address of the node which must not be picked
+    """
+    machine_ip: str = Env.get("IPADDRESS")
+    picked = self.__nodelist.weighted_picks(k + 2)
+    return [(ip, port) for ip, port in picked if ip not in (machine_ip, exclude)][:k]
+
+  def __sender_headers(self) -> dict[str, str]:
+    """
+    Get the headers which tell other node who is sending the request, including the piggybacked headers
+    """
+    return {
+        "X-Gossip-Sender": Env.get("IPADDRESS"),
+        "X-Gossip-Port": str(Env.get("PORT")),
+        **self.piggyback_headers(),
+    }
+
+  def __spread(self, msg: Message, exclude: str | None):
+    """
+    Push the message to the fanout count of nodes in the background
+    """
+    for ip, port in self.__peers(self.fanout(), exclude):
+      self.__pool.submit(self.__push, ip, port, msg)
+
+  def __push(self, ip: str, port: int, msg: Message):
+    """
+    Push the message to a node
+    """
+    try:
+      with self.__nodelist.track(ip):
+        response = httpx.post(
+            url=f"http://{ip}:{port}/gossip",
+            content=msg.payload,
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Gossip-Id": msg.id,
+                "X-Gossip-Kind": msg.kind,
+                "X-Gossip-Ttl": str(msg.ttl),
+                "X-Gossip-Time": str(msg.origin_time),
+                **self.__sender_headers(),
+            },
+            timeout=10,
+        )
+      self.__counters["pushed"] += 1
+      self.observe(ip, port, response.headers)
+    except httpx.HTTPError:
+      self.__counters["push_failures"] += 1
+
+  def __exchange_with(self, ip: str, port: int):
+    """
+    Exchange digests with a node, take the messages the node has and push the messages it is missing
+    """
+    with self.__nodelist.track(ip):
+      response = httpx.post(
+          url=f"http://{ip}:{port}/gossipDigest",
+          json={"ids": self.digest()},
+          headers=self.__sender_headers(),
+          timeout=10,
+      )
+      response.raise_for_status()
+      data = response.json()
+    self.observe(ip, port, response.headers)
+
+    for item in data.get("messages", []):
+      if self.receive(Message.from_dict(item), ip, forward=False):
+        self.__counters["repaired"] += 1
+
+    for msg_id in data.get("wants", []):
+      if (msg := self.get(msg_id)) is not None:
+        self.__push(ip, port, Message(msg.id, msg.kind, msg.payload, 1, msg.origin_time))
+
+  def __work(self):
+    """
+    Method refers to the periodic digest exchange with a random node
+    """
+    while True:
+      time.sleep(DIGEST_INTERVAL)
+      try:
+        for ip, port in self.__peers(1, None):
+          self.__exchange_with(ip, port)
+      except Exception:
+        continue
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+import math
+import time
+
+# Weight of the newest sample into the smoothed values
+SMOOTHING = 0.2
+
+# Consecutive failures after which the circuit of the node is opened
+FAILURE_THRESHOLD = 3
+
+# Backoff of the open circuit (In Seconds), doubles on every failure after the threshold
+BASE_BACKOFF = 2.0
+MAX_BACKOFF = 300.0
+
+# Requests faster than this are treated as this value (In Seconds)
+MIN_RTT = 0.001
+
+
+@dataclass
+class PeerHealth:
+  """
+  Class keeps the health of a remote node, which is used for deciding which nodes should be picked first
+  Args:
+    rtt: The smoothed round trip time of the requests made to the node (In Seconds)
+    error_rate: The smoothed ratio of the failed requests (Between 0 and 1)
+    failures: The count of consecutive failed requests
+    open_until: The time till which the circuit of the node is open (Unix Time)
+  """
+
+  rtt: float = 0.5
+  error_rate: float = 0.0
+  failures: int = 0
+  open_until: float = 0.0
+
+  def success(self, rtt: float):
+    """
+    Records a successful request, and closes the circuit of the node
+    Args:
+      rtt: The time taken by the request (In Seconds)
+    """
+    self.rtt = (1 - SMOOTHING) * self.rtt + SMOOTHING * max(rtt, MIN_RTT)
+    self.error_rate = (1 - SMOOTHING) * self.error_rate
+    self.failures = 0
+    self.open_until = 0.0
+
+  def failure(self):
+    """
+    Records a failed request, if the node keeps failing then the circuit is opened with exponential backoff
+    """
+    self.error_rate = (1 - SMOOTHING) * self.error_rate + SMOOTHING
+    self.failures += 1
+    if self.failures >= FAILURE_THRESHOLD:
+      # The exponent is bounded, so a node failing for long doesn't overflow the backoff
+      doublings = min(self.failures - FAILURE_THRESHOLD, int(math.log2(MAX_BACKOFF / BASE_BACKOFF)) + 1)
+      self.open_until = time.time() + min(BASE_BACKOFF * (2 ** doublings), MAX_BACKOFF)
+
+  def is_open(self) -> bool:
+    """
+    Check if the circuit of the node is open, after the backoff is over the node is allowed again (half open), and the next request decides if it closes or opens again
+    Returns:
+      bool: Returns True if the node must not be picked, otherwise False
+    """
+    return self.open_until > time.time()
+
+  def weight(self) -> float:
+    """
+    Get the weight of the node for the weighted selection, fast (nearby) nodes with less errors gets more weight
+    Returns:
+      float: Returns the weight of the node, 0 if the circuit is open
+    """
+    if self.is_open():
+      return 0.0
+    return max((1 - self.error_rate) ** 2, 0.01) / self.rtt
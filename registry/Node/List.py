@@ -1,8 +1,20 @@
 import base64
 import json
 import httpx
-from typing import List, Dict
+from typing import List, Iterator
+from contextlib import contextmanager
+from threading import RLock
+import heapq
 import random
+import time
+from .Health import PeerHealth
+from ..Journal import Journal
+
+# Count of random candidates looked at per picked node by weighted_picks
+CANDIDATES_PER_PICK = 8
+
+# Least count of journaled changes after which the journal is compacted
+COMPACT_AFTER = 1000
 
 
 class NodeList:
@@ -12,8 +24,11 @@ class NodeList:
 
   def __init__(self):
     self._ip_list: List[str] = []
-    self._ip_set: set[str] = set()
+    self._index: dict[str, int] = {}
     self._ports: dict[str, int] = {}
+    self._health: dict[str, PeerHealth] = {}
+    self._journal: Journal | None = None
+    self._lock = RLock()
 
   def add(self, ip_address: str, port: int) -> bool:
     """
@@ -26,12 +41,11 @@ class NodeList:
     Returns:
       bool: True if added successfully, False if it already exists.
     """
-    if ip_address in self._ip_set:
-      return False
-    self._ip_set.add(ip_address)
-    self._ip_list.append(ip_address)
-    self._ports[ip_address] = port
-    return True
+    with self._lock:
+      if not self.__insert(ip_address, port):
+        return False
+      self.__journal({"op": "add", "ip": ip_address, "port": port})
+      return True
 
   def remove(self, ip_address: str) -> bool:
     """
@@ -43,12 +57,11 @@ class NodeList:
     Returns:
       bool: True if removed, False if not found.
     """
-    if ip_address not in self._ip_set:
-      return False
-    self._ip_set.remove(ip_address)
-    self._ip_list.remove(ip_address)
-    del self._ports[ip_address]
-    return True
+    with self._lock:
+      if not self.__delete(ip_address):
+        return False
+      self.__journal({"op": "remove", "ip": ip_address})
+      return True
 
   def random_picks(self, k: int) -> List[tuple[str, int]]:
     """
@@ -63,14 +76,109 @@ class NodeList:
     Raises:
       ValueError: If k is larger than the list size.
     """
-    if k > len(self._ip_list):
-      raise ValueError("Sample size exceeds list size")
-    random_lst = random.sample(self._ip_list, k)
-    final: List[tuple[str, int]] = []
-    for ip in random_lst:
-      final.append((ip, self._ports[ip]))
+    with self._lock:
+      if k > len(self._ip_list):
+        raise ValueError("Sample size exceeds list size")
+      # Sampling positions from a range doesn't copy the whole list
+      final: List[tuple[str, int]] = []
+      for i in random.sample(range(len(self._ip_list)), k):
+        ip = self._ip_list[i]
+        final.append((ip, self._ports[ip]))
+
+      return final
+
+  def weighted_picks(self, k: int) -> List[tuple[str, int]]:
+    """
+    Picks at most k nodes, preferring fast and healthy nodes. Nodes whose circuit is open are never picked, so the result can be smaller than k.
+    Only a bounded amount of random candidates is looked at, so the cost doesn't depend on the size of the list.
+
+    Args:
+      k: Number of nodes to pick.
+
+    Returns:
+      List[tuple[str, int]]: List of picked IP addresses and their ports, best node first.
+    """
+    with self._lock:
+      total = len(self._ip_list)
+      candidates = min(total, max(k, 1) * CANDIDATES_PER_PICK)
+
+      # Weighted sampling without replacement (Efraimidis-Spirakis)
+      keyed: List[tuple[float, str]] = []
+      for i in random.sample(range(total), candidates):
+        ip = self._ip_list[i]
+        weight = self.health(ip).weight()
+        if weight > 0:
+          keyed.append((random.random() ** (1 / weight), ip))
+
+      return [(ip, self._ports[ip]) for _, ip in heapq.nlargest(k, keyed)]
+
+  def health(self, ip_address: str) -> PeerHealth:
+    """
+    Get the health record of the node
+
+    Args:
+      ip_address: The IP Address of the node
+
+    Returns:
+      PeerHealth: The health of the node
+
+    Raises:
+      KeyError: If the node doesn't exist
+    """
+    if (health := self._health.get(ip_address)) is None:
+      if ip_address not in self._index:
+        raise KeyError(f"the node `{ip_address}` doesn't exist")
+      health = self._health.setdefault(ip_address, PeerHealth())
+    return health
+
+  def is_available(self, ip_address: str) -> bool:
+    """
+    Checks if the node can be contacted (The circuit of the node is not open)
+
+    Args:
+      ip_address: The IP Address of the node
+
+    Returns:
+      bool: Return True if the node is known and its circuit is closed, otherwise False
+    """
+    return ip_address in self._index and not self.health(ip_address).is_open()
+
+  def record_success(self, ip_address: str, rtt: float):
+    """
+    Records a successful request to the node, unknown nodes are ignored
 
-    return final
+    Args:
+      ip_address: The IP Address of the node
+      rtt: The time taken by the request (In Seconds)
+    """
+    if ip_address in self._index:
+      self.health(ip_address).success(rtt)
+
+  def record_failure(self, ip_address: str):
+    """
+    Records a failed request to the node, unknown nodes are ignored
+
+    Args:
+      ip_address: The IP Address of the node
+    """
+    if ip_address in self._index:
+      self.health(ip_address).failure()
+
+  @contextmanager
+  def track(self, ip_address: str) -> Iterator[None]:
+    """
+    Measures the request made to the node inside the with block and records it into the health of the node. Any exception raised inside the block is recorded as a failure and raised again.
+
+    Args:
+      ip_address: The IP Address of the node
+    """
+    start = time.monotonic()
+    try:
+      yield
+    except Exception:
+      self.record_failure(ip_address)
+      raise
+    self.record_success(ip_address, time.monotonic() - start)
 
   def exists(self, ip_address: str) -> bool:
     """
@@ -82,7 +190,20 @@ class NodeList:
     Returns:
       bool: Return True if exist, otherwise False
     """
-    return ip_address in self._ip_set
+    return ip_address in self._index
+
+  def get_port(self, ip_address: str) -> int | None:
+    """
+    Gets the port number of a node
+
+    Args:
+      ip_address: The IP Address of the node
+
+    Returns:
+      int | None: The port number, None if the node doesn't exist
+    """
+    with self._lock:
+      return self._ports.get(ip_address)
 
   def size(self) -> int:
     """
@@ -93,28 +214,112 @@ class NodeList:
     """
     return len(self._ip_list)
 
+  def __journal(self, record: dict):
+    """
+    Appends the change into the attached journal, and compacts the journal when it grows too much
+    Args:
+      record: The change which is done to the list
+    """
+    if self._journal is None:
+      return
+    # Compacting only after as many changes as there are nodes keeps the cost of a change constant
+    self._journal.compact_after = max(COMPACT_AFTER, len(self._ip_list))
+    if self._journal.append(record):
+      self._journal.write_snapshot(self.__snapshot())
+
+  def __snapshot(self) -> bytes:
+    """
+    Serializes the whole list
+    Returns:
+      bytes: The base64 encoded JSON map of the IP Addresses and their ports
+    """
+    return base64.b64encode(json.dumps(self._ports).encode('utf-8'))
+
+  def attach(self, filepath: str):
+    """
+    Keep the NodeList saved into a file, after attaching every add or remove is appended into the journal of the file instead of rewriting the whole file
+    Args:
+      filepath: The path where to save the data at
+    """
+    with self._lock:
+      if self._journal is not None:
+        self._journal.close()
+      self._journal = Journal(filepath)
+      self._journal.write_snapshot(self.__snapshot())
+
   def save(self, filepath: str):
     """
-    Save the NodeList into a file
+    Save the whole NodeList into a file
     Args:
       filepath: The path where to save the data at
     """
-    with open(filepath, 'wb') as f:
-      f.write(base64.b64encode(json.dumps(self._ports).encode('utf-8')))
+    with self._lock:
+      if self._journal is not None and self._journal.filepath == filepath:
+        self._journal.write_snapshot(self.__snapshot())
+      else:
+        Journal(filepath).write_snapshot(self.__snapshot())
 
   def load(self, filepath: str):
     """
-    Load the NodeList from a file
+    Load the NodeList from a file, the current nodes are replaced by the nodes of the file
     Args:
       filepath: The path where the file is saved
+    Raises:
+      FileNotFoundError: If nothing is saved at the path
+    """
+    journal = Journal(filepath)
+    if not journal.exists():
+      raise FileNotFoundError(filepath)
+
+    with self._lock:
+      self._ip_list.clear()
+      self._index.clear()
+      self._ports.clear()
+      self._health.clear()
+
+      if (snapshot := journal.read_snapshot()) is not None:
+        ports: dict[str, int] = json.loads(base64.b64decode(snapshot))
+        for ipAddress, port in ports.items():
+          self.__insert(ipAddress, port)
+
+      for record in journal.replay():
+        if record["op"] == "add":
+          self.__insert(record["ip"], record["port"])
+        elif record["op"] == "remove":
+          self.__delete(record["ip"])
+
+  def __insert(self, ip_address: str, port: int) -> bool:
+    """
+    Adds the node without journaling it
+    Returns:
+      bool: True if added, False if it already exists
+    """
+    if ip_address in self._index:
+      return False
+    self._index[ip_address] = len(self._ip_list)
+    self._ip_list.append(ip_address)
+    self._ports[ip_address] = port
+    self._health[ip_address] = PeerHealth()
+    return True
+
+  def __delete(self, ip_address: str) -> bool:
+    """
+    Removes the node without journaling it, the last node is moved into the place of the removed node so that removing takes constant time
+    Returns:
+      bool: True if removed, False if not found
     """
-    with open(filepath, 'rb') as f:
-      bdata = base64.b64decode(f.read())
-      self._ports: dict[str, int] = json.loads(bdata)
+    if ip_address not in self._index:
+      return False
 
-      for ipAddress in self._ports.keys():
-        self._ip_set.add(ipAddress)
-        self._ip_list.append(ipAddress)
+    position = self._index.pop(ip_address)
+    last = self._ip_list.pop()
+    if last != ip_address:
+      self._ip_list[position] = last
+      self._index[last] = position
+
+    del self._ports[ip_address]
+    self._health.pop(ip_address, None)
+    return True
 
   @staticmethod
   def get_hash(ip_address: str, port: int, block_number: int) -> str:
@@ -179,38 +384,5 @@ class NodeList:
       bytes: Byte data of blocks.
     """
     url = f"http://{ip_address}:{port}/getBlockDatas"
-    headers = {"Content-Type": "text/plain"}
-    response = httpx.post(url, content=str(
-        start_block_num), headers=headers)
+    response = httpx.post(url, data={"num": start_block_num})
     return response.content
-
-  @staticmethod
-  def most_matched_hash_nodes(
-      nodes: List[tuple[str, int]], block_num: int
-  ) -> List[tuple[str, int]]:
-    """
-    Checks all nodes for a specific block's hash and returns the list of nodes
-    that share the most common hash value.
-
-    Args:
-      nodes: IP Address + ports of the nodes
-      block_num: Block number to check.
-
-    Returns:
-      List[tuple[str, int]]: List of nodes with the most matched hash.
-    """
-    hash_map: Dict[str, List[tuple[str, int]]] = {}
-    most_common_hash = ""
-    highest_count = 0
-
-    for ip, port in nodes:
-      try:
-        hash_val = NodeList.get_hash(ip, port, block_num)
-        hash_map[hash_val].append((ip, port))
-        if len(hash_map[hash_val]) > highest_count:
-          most_common_hash = hash_val
-          highest_count = len(hash_map[hash_val])
-      except Exception:
-        continue
-
-    return hash_map.get(most_common_hash, [])
@@ -1,7 +1,13 @@
 from django.apps import AppConfig
 from environments import Env
 from registry.Node.List import NodeList
+from registry.Node.Gossip import Gossip
 from registry.File.List import FileList
+from registry.File.Manifest import ManifestStore
+from registry.File.Cache import ChunkCache
+from registry.File.Upload import UploadStore
+from registry.File.ChunkStore import ChunkStore
+from registry.File.Compression import Compressor
 import os
 
 
@@ -23,23 +29,102 @@ class RegistryConfig(AppConfig):
 
     Env.set("DOWNLOADS", downloads)
 
+    # If IP Address is not into Environment then set localhost IP as default
+    # The address is set before the other apps start their threads, as the threads tell it to the other nodes
+    currentNodeIP = os.getenv("MACHINE_IP", "127.0.0.1")
+
+    # If Port number is not into Environment then make 8000 as default
+    port = os.getenv("PORT", "8000")
+    if not port.isnumeric():
+      raise ValueError("PORT Environment variable can only be integers")
+
+    port = int(port)
+    if port >= 65536:
+      raise ValueError("port number can't be more than 65535")
+    if port <= 0:
+      raise ValueError("port number can't be less than 1")
+
+    Env.set("IPADDRESS", currentNodeIP)
+    Env.set("PORT", port)
+
     chain_dir = os.path.join(downloads, "chaindata")
+    os.makedirs(chain_dir, exist_ok=True)
 
     # FileList
     filelist = os.path.join(chain_dir, 'filelist.bin')
     Env.set("FILELIST_PATH", filelist)
 
     fileListObj = FileList()
-    if os.path.exists(filelist):
+    try:
       fileListObj.load(filelist)
+    except FileNotFoundError:
+      pass
+    # Every change of the files and every downloaded chunk is journaled into the file from now on
+    fileListObj.attach(filelist)
 
     Env.set("FILES", fileListObj)
 
+    # Hashes of the chunks of the files
+    manifests = os.path.join(chain_dir, 'manifests')
+    os.makedirs(manifests, exist_ok=True)
+    manifestStore = ManifestStore(manifests, downloads)
+    Env.set("MANIFESTS", manifestStore)
+
+    # Previous versions of the updated files, till the chunks which didn't change are copied from them
+    bases = os.path.join(chain_dir, 'bases')
+    os.makedirs(bases, exist_ok=True)
+    Env.set("BASES", bases)
+
+    # Chunks held by the current node by their hash, shared by the files having them (0 turns it off)
+    chunk_store = os.getenv("CHUNK_STORE", "1")
+    if chunk_store not in ("0", "1"):
+      raise ValueError("CHUNK_STORE Environment variable can only be 0 or 1")
+    chunkStore = None
+    if chunk_store == "1":
+      chunkStore = ChunkStore(downloads)
+      chunkStore.load(fileListObj, manifestStore)
+    Env.set("CHUNK_STORE", chunkStore)
+
+    # Chunk size of the uploaded files (Size in MiB), 0 picks it from the size of every file
+    chunk_size = os.getenv("CHUNK_SIZE", "0")
+    if not chunk_size.isnumeric():
+      raise ValueError("CHUNK_SIZE Environment variable can only be non-negative integers")
+    Env.set("CHUNK_SIZE", int(chunk_size) * 1024 * 1024)
+
+    # Resumable uploads which are not finalized yet
+    uploads = os.path.join(chain_dir, 'uploads')
+    os.makedirs(uploads, exist_ok=True)
+    uploadStore = UploadStore(uploads)
+    uploadStore.load()
+    Env.set("UPLOADS", uploadStore)
+
+    # Recently served chunks (Size in MiB)
+    cache_size = os.getenv("CHUNK_CACHE_SIZE", "64")
+    if not cache_size.isnumeric():
+      raise ValueError("CHUNK_CACHE_SIZE Environment variable can only be non-negative integers")
+    chunkCache = ChunkCache(int(cache_size) * 1024 * 1024)
+    Env.set("CHUNK_CACHE", chunkCache)
+
+    # Compression of the chunks sent to the nodes accepting it, and asking for it when downloading (0 turns it off)
+    compression = os.getenv("COMPRESSION", "1")
+    if compression not in ("0", "1"):
+      raise ValueError("COMPRESSION Environment variable can only be 0 or 1")
+    Env.set("COMPRESSOR", Compressor(chunkCache) if compression == "1" else None)
+
     # NodeList
     nodelist = os.path.join(chain_dir, 'nodelist.bin')
     Env.set("NODELIST_PATH", nodelist)
     nodelistObj = NodeList()
 
-    if os.path.exists(nodelist):
+    try:
       nodelistObj.load(nodelist)
+    except FileNotFoundError:
+      pass
+    # Every join or leave is journaled into the file from now on
+    nodelistObj.attach(nodelist)
     Env.set("NODES", nodelistObj)
+
+    # Gossip (Blocks and chunk announcements are spread through it)
+    gossip = Gossip(nodelistObj)
+    Env.set("GOSSIP", gossip)
+    gossip.start()
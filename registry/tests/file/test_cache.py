@@ -0,0 +1,86 @@
+from django.test import TestCase
+from threading import Event, Thread
+
+from ...File.Cache import ChunkCache
+
+
+class ChunkCacheTest(TestCase):
+  """Tests for the ChunkCache class."""
+
+  def test_hit_and_miss(self):
+    """Test that a cached chunk isn't read again."""
+    cache = ChunkCache(100)
+    reads = []
+    load = lambda: reads.append(1) or b"x" * 10  # noqa: E731
+    self.assertEqual(cache.get("a", 0, 9, load), b"x" * 10)
+    self.assertEqual(cache.get("a", 0, 9, load), b"x" * 10)
+    self.assertEqual(len(reads), 1)
+    stats = cache.stats()
+    self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+    self.assertEqual(stats["hit_rate"], 0.5)
+
+  def test_lru_eviction(self):
+    """Test that the least recently used chunk is evicted when the cache is full."""
+    cache = ChunkCache(25)
+    for start in (0, 10):
+      cache.get("a", start, start + 9, lambda: b"x" * 10)
+    # Using the first chunk, so that the second one is the least recently used
+    cache.get("a", 0, 9, lambda: b"y" * 10)
+    cache.get("a", 20, 29, lambda: b"z" * 10)
+
+    self.assertEqual(cache.stats()["evictions"], 1)
+    self.assertEqual(cache.stats()["bytes"], 20)
+    self.assertEqual(cache.get("a", 10, 19, lambda: b"n" * 10), b"n" * 10)
+
+  def test_too_large_is_not_cached(self):
+    """Test that a chunk larger than the cache is served but not kept."""
+    cache = ChunkCache(5)
+    self.assertEqual(cache.get("a", 0, 9, lambda: b"x" * 10), b"x" * 10)
+    self.assertEqual(cache.stats()["entries"], 0)
+
+  def test_coalescing(self):
+    """Test that concurrent requests of the same chunk share one read."""
+    cache = ChunkCache(100)
+    started, release = Event(), Event()
+    reads = []
+
+    def load():
+      reads.append(1)
+      started.set()
+      release.wait(5)
+      return b"data"
+
+    results = []
+    first = Thread(target=lambda: results.append(cache.get("a", 0, 3, load)))
+    first.start()
+    started.wait(5)
+    others = [Thread(target=lambda: results.append(cache.get("a", 0, 3, load))) for _ in range(3)]
+    for thread in others:
+      thread.start()
+    while cache.stats()["coalesced"] < 3:
+      pass
+    release.set()
+    for thread in [first, *others]:
+      thread.join(5)
+
+    self.assertEqual(results, [b"data"] * 4)
+    self.assertEqual(len(reads), 1)
+
+  def test_error_is_shared_and_not_cached(self):
+    """Test that a failed read raises and is not cached."""
+    cache = ChunkCache(100)
+
+    def fail():
+      raise OSError("disk error")
+
+    with self.assertRaises(OSError):
+      cache.get("a", 0, 3, fail)
+    self.assertEqual(cache.get("a", 0, 3, lambda: b"data"), b"data")
+
+  def test_invalidate(self):
+    """Test that invalidating a file drops its chunks."""
+    cache = ChunkCache(100)
+    cache.get("a", 0, 3, lambda: b"data")
+    cache.get("b", 0, 3, lambda: b"data")
+    cache.invalidate("a")
+    self.assertEqual(cache.stats()["entries"], 1)
@@ -0,0 +1,78 @@
+from django.test import TestCase
+import hashlib
+import os
+import tempfile
+
+from ...File.ChunkStore import ChunkStore, unshare
+from ...File.FileInfo import FileInfo
+from ...File.List import FileList
+from ...File.Manifest import Manifest, ManifestStore
+
+
+class ChunkStoreTest(TestCase):
+  """Tests for the ChunkStore class."""
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.addCleanup(self.tmpdir.cleanup)
+    self.downloads = self.tmpdir.name
+    os.makedirs(os.path.join(self.downloads, "manifests"))
+    self.manifests = ManifestStore(os.path.join(self.downloads, "manifests"), self.downloads)
+    self.store = ChunkStore(self.downloads)
+    self.filelist = FileList()
+
+    # A file of 3 chunks of 100 bytes, the first and the last chunks are same
+    self.data = b"a" * 100 + b"b" * 100 + b"a" * 100
+    self.hashes = [hashlib.sha1(self.data[i:i + 100]).hexdigest() for i in range(0, 300, 100)]
+    self.info = FileInfo(hashlib.sha512(self.data).hexdigest(), 300, 0, 3, chunk_size=100)
+    with open(os.path.join(self.downloads, "movie.mp4"), "wb") as f:
+      f.write(self.data)
+    self.filelist.add("movie.mp4", self.info, downloaded=True)
+    self.manifests.save("movie.mp4", Manifest(3, self.hashes))
+
+  def test_load_and_read(self):
+    """Test that the chunks of the held files are found by their hash."""
+    self.store.load(self.filelist, self.manifests)
+    self.assertEqual(self.store.stats()["chunks"], 2)
+    self.assertTrue(self.store.has(self.hashes[1]))
+    self.assertEqual(self.store.read(self.hashes[1], self.filelist.get), b"b" * 100)
+    self.assertIsNone(self.store.read("0" * 40, self.filelist.get))
+
+  def test_changed_file_not_trusted(self):
+    """Test that a chunk whose bytes changed on the disk is not given."""
+    self.store.add(self.hashes[1], "movie.mp4", 2)
+    with open(os.path.join(self.downloads, "movie.mp4"), "r+b") as f:
+      f.seek(150)
+      f.write(b"x")
+    self.assertIsNone(self.store.read(self.hashes[1], self.filelist.get))
+
+  def test_forget(self):
+    """Test that the chunks of a removed file are forgotten."""
+    self.store.load(self.filelist, self.manifests)
+    self.store.forget("movie.mp4")
+    self.assertFalse(self.store.has(self.hashes[0]))
+
+  def test_identical_file_is_linked(self):
+    """Test that a file identical to a downloaded file shares its bytes and its manifest."""
+    self.assertTrue(self.store.alias(self.filelist, self.manifests, "copy.mp4", self.info))
+    source = os.stat(os.path.join(self.downloads, "movie.mp4"))
+    copy = os.stat(os.path.join(self.downloads, "copy.mp4"))
+    self.assertEqual(source.st_ino, copy.st_ino)
+    self.assertEqual(self.manifests.get("copy.mp4").hashes(), self.hashes)
+    self.assertEqual(self.store.stats()["linked"], 1)
+
+  def test_incomplete_file_not_linked(self):
+    """Test that only a downloaded file is linked to."""
+    self.filelist.reset("movie.mp4")
+    self.assertFalse(self.store.alias(self.filelist, self.manifests, "copy.mp4", self.info))
+    self.assertFalse(os.path.exists(os.path.join(self.downloads, "copy.mp4")))
+
+  def test_unshare_linked_file(self):
+    """Test that a linked file gets its own bytes before it's written, so the file linked to it isn't changed."""
+    self.store.alias(self.filelist, self.manifests, "copy.mp4", self.info)
+    unshare(os.path.join(self.downloads, "copy.mp4"))
+    with open(os.path.join(self.downloads, "copy.mp4"), "r+b") as f:
+      f.write(b"x")
+    with open(os.path.join(self.downloads, "movie.mp4"), "rb") as f:
+      self.assertEqual(f.read(), self.data)
+    self.assertEqual(os.stat(os.path.join(self.downloads, "movie.mp4")).st_nlink, 1)
@@ -0,0 +1,91 @@
+from django.test import TestCase
+import os
+import zlib
+
+from ...File import Compression
+from ...File.Cache import ChunkCache
+from ...File.FileInfo import FileInfo
+
+
+class CompressionTest(TestCase):
+  """Tests for the compression of the chunks."""
+
+  def test_accepts(self):
+    """Test that the Accept-Encoding header is negotiated with its qualities."""
+    self.assertTrue(Compression.accepts("gzip, deflate"))
+    self.assertTrue(Compression.accepts("deflate;q=0.5"))
+    self.assertTrue(Compression.accepts("*"))
+    self.assertFalse(Compression.accepts("gzip"))
+    self.assertFalse(Compression.accepts("deflate;q=0"))
+    self.assertFalse(Compression.accepts("identity"))
+    self.assertFalse(Compression.accepts(""))
+
+  def test_probe(self):
+    """Test that text is compressed and random bytes are not."""
+    self.assertTrue(Compression.compressible(b"INFO request served\n" * 1000))
+    self.assertFalse(Compression.compressible(os.urandom(10000)))
+
+  def test_joined_pieces(self):
+    """Test that the pieces of the chunks make a single zlib stream, the stored ones included."""
+    chunks = [b"log line\n" * 500, os.urandom(3000), b"another log line\n" * 300]
+    stream = b"".join(Compression.join([
+        (Compression.deflate(chunks[0], 6), len(chunks[0])),
+        (Compression.deflate(chunks[1], 0), len(chunks[1])),
+        (Compression.deflate(chunks[2], 6), len(chunks[2])),
+    ]))
+    self.assertEqual(zlib.decompress(stream), b"".join(chunks))
+
+  def test_inflate(self):
+    """Test that a stream is decoded in bounded parts, and a cut stream is rejected."""
+    data = b"a" * 100_000
+    stream = zlib.compress(data)
+    parts = list(Compression.inflate([stream[:10], stream[10:]], 4096))
+    self.assertEqual(b"".join(parts), data)
+    self.assertLessEqual(max(len(part) for part in parts), 4096)
+    with self.assertRaises(ValueError):
+      list(Compression.inflate([stream[:-4]], 4096))
+    with self.assertRaises(ValueError):
+      list(Compression.inflate([stream, b"extra"], 4096))
+
+
+class CompressorTest(TestCase):
+  """Tests for the Compressor class."""
+
+  def setUp(self):
+    self.cache = ChunkCache(1024 * 1024)
+    self.compressor = Compression.Compressor(self.cache)
+    self.reads: list[int] = []
+
+  def encode(self, chunks: list[bytes], first: int, last: int) -> bytes | None:
+    """Encodes the chunks of a file made of the given chunks of 1000 bytes."""
+    data = b"".join(chunks)
+    info = FileInfo("hash", len(data), 0, len(chunks), chunk_size=1000)
+
+    def read(chunk: int) -> bytes:
+      self.reads.append(chunk)
+      return chunks[chunk - 1]
+
+    parts = self.compressor.encode("file.log", info, first, last, read)
+    return None if parts is None else b"".join(parts)
+
+  def test_compressed_chunks_cached(self):
+    """Test that a compressed chunk is cached and not read again."""
+    chunks = [b"a" * 1000, b"b" * 1000]
+    self.assertEqual(zlib.decompress(self.encode(chunks, 1, 2)), b"".join(chunks))
+    self.assertEqual(zlib.decompress(self.encode(chunks, 2, 2)), chunks[1])
+    self.assertEqual(self.reads, [1, 2])
+    self.assertEqual(self.compressor.stats()["compressed"], 2)
+
+  def test_media_not_compressed(self):
+    """Test that the chunks which don't shrink are stored in the stream till they're probed, then sent as they are, and read only once."""
+    chunks = [os.urandom(1000), os.urandom(1000)]
+    self.assertEqual(zlib.decompress(self.encode(chunks, 1, 2)), b"".join(chunks))
+    self.assertIsNone(self.encode(chunks, 1, 2))
+    self.assertEqual(self.reads, [1, 2])
+    self.assertEqual(self.compressor.stats()["skipped"], 2)
+
+  def test_mixed_range(self):
+    """Test that a chunk not worth compressing is stored inside the stream of a compressed range."""
+    chunks = [b"a" * 1000, os.urandom(1000)]
+    self.assertEqual(zlib.decompress(self.encode(chunks, 1, 2)), b"".join(chunks))
+    self.assertEqual(self.reads, [1, 2])
@@ -0,0 +1,102 @@
+from django.test import TestCase
+import hashlib
+import io
+import os
+import random
+import tempfile
+
+from ...File import Delta, Rolling
+from ...File.FileInfo import FileInfo
+from ...File.Manifest import ChunkHasher, Manifest
+
+
+def version(data: bytes, chunk_size: int, checksums: bool = True) -> tuple[FileInfo, Manifest]:
+  """Gives the FileInfo and the manifest of a version of a file."""
+  hasher = ChunkHasher(chunk_size)
+  hasher.update(data)
+  hashes = hasher.hexdigests()
+  info = FileInfo(hashlib.sha512(data).hexdigest(), len(data), 0, len(hashes), "root", chunk_size)
+  return info, Manifest(len(hashes), hashes, hasher.checksums() if checksums else None)
+
+
+class RollingTest(TestCase):
+  """Tests for the weak rolling checksum."""
+
+  def test_find_shifted_chunks(self):
+    """Test that the chunks are found at any offset, across the segments of the scan."""
+    self.addCleanup(setattr, Rolling, "SEGMENT", Rolling.SEGMENT)
+    Rolling.SEGMENT = 37
+    data = random.Random(1).randbytes(1000)
+    targets: dict[int, dict[str, list[int]]] = {}
+    for chunk, offset in enumerate((0, 13, 555, 936), start=1):
+      window = data[offset:offset + 64]
+      targets.setdefault(Rolling.checksum(window), {}).setdefault(hashlib.sha1(window).hexdigest(), []).append(chunk)
+
+    found = Rolling.find_chunks(io.BytesIO(data), 64, targets)
+    self.assertEqual(found, {1: 0, 2: 13, 3: 555, 4: 936})
+
+  def test_missing_chunk(self):
+    """Test that a chunk which isn't in the file is not found."""
+    window = b"x" * 64
+    targets = {Rolling.checksum(window): {hashlib.sha1(window).hexdigest(): [1]}}
+    self.assertEqual(Rolling.find_chunks(io.BytesIO(b"y" * 500), 64, targets), {})
+
+
+class DeltaTest(TestCase):
+  """Tests for building a new version of a file from its previous version."""
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.addCleanup(self.tmpdir.cleanup)
+    self.old = random.Random(2).randbytes(1000)
+    self.basis = os.path.join(self.tmpdir.name, "basis")
+    with open(self.basis, "wb") as f:
+      f.write(self.old)
+
+  def build(self, new: bytes, checksums: bool = True, held: set[int] | None = None) -> tuple[dict[int, str], bytes]:
+    """Patches the new version, and gives the patched chunks and the bytes written."""
+    info, manifest = version(new, 100, checksums)
+    path = os.path.join(self.tmpdir.name, "new")
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+      os.ftruncate(fd, len(new))
+      patched = Delta.patch(self.basis, fd, info, manifest, held or set())
+    finally:
+      os.close(fd)
+    with open(path, "rb") as f:
+      return patched, f.read()
+
+  def test_insertion(self):
+    """Test that only the chunk with the inserted bytes is left, the moved chunks are found."""
+    new = self.old[:250] + b"inserted" + self.old[250:]
+    patched, written = self.build(new)
+    self.assertEqual(sorted(patched), [1, 2, 4, 5, 6, 7, 8, 9, 10, 11])
+    for chunk in patched:
+      self.assertEqual(written[(chunk - 1) * 100:chunk * 100], new[(chunk - 1) * 100:chunk * 100])
+
+  def test_without_checksums(self):
+    """Test that only the same offsets, and the end for the last chunk, are compared when the checksums are not known."""
+    new = self.old[:250] + b"inserted" + self.old[250:]
+    patched, _ = self.build(new, checksums=False)
+    self.assertEqual(sorted(patched), [1, 2, 11])
+
+    changed = self.old[:250] + b"x" + self.old[251:]
+    patched, _ = self.build(changed, checksums=False)
+    self.assertEqual(sorted(patched), [1, 2, 4, 5, 6, 7, 8, 9, 10])
+
+  def test_held_chunks_skipped(self):
+    """Test that the chunks held already are not written again."""
+    patched, _ = self.build(self.old, held={1, 2})
+    self.assertEqual(sorted(patched), list(range(3, 11)))
+
+  def test_keep_basis(self):
+    """Test that the bytes of a file are moved aside as its basis."""
+    downloads = os.path.join(self.tmpdir.name, "downloads")
+    bases = os.path.join(self.tmpdir.name, "bases")
+    os.makedirs(downloads)
+    os.makedirs(bases)
+    with open(os.path.join(downloads, "movie.mp4"), "wb") as f:
+      f.write(b"old")
+    self.assertTrue(Delta.keep_basis(downloads, bases, "movie.mp4"))
+    self.assertFalse(os.path.exists(os.path.join(downloads, "movie.mp4")))
+    self.assertFalse(Delta.keep_basis(downloads, bases, "movie.mp4"))
@@ -0,0 +1,171 @@
+from django.test import TestCase
+import base64
+import json
+import os
+import tempfile
+
+from ...File.Bitmap import ChunkBitmap
+from ...File.FileInfo import FileInfo, choose_chunk_size, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE
+from ...File.List import FileList
+
+
+class FileInfoTest(TestCase):
+  """Tests for the chunk size of the FileInfo class."""
+
+  def test_chunk_range_uses_chunk_size(self):
+    info = FileInfo("hash", 2500, 0, 3, chunk_size=1000)
+    self.assertEqual(info.chunk_range(1), (0, 999))
+    self.assertEqual(info.chunk_range(3), (2000, 2499))
+
+  def test_old_dict_has_default_chunk_size(self):
+    """Test that a FileInfo saved before the chunk size keeps 4 MiB chunks."""
+    data = FileInfo("hash", 10, 0, 1).to_dict()
+    del data["chunk_size"]
+    self.assertEqual(FileInfo.from_dict(data).chunk_size, 4 * 1024 * 1024)
+
+  def test_choose_chunk_size(self):
+    self.assertEqual(choose_chunk_size(10), MIN_CHUNK_SIZE)
+    self.assertEqual(choose_chunk_size(4 * 1024**3), 4 * 1024**2)
+    self.assertEqual(choose_chunk_size(20 * 1024**3), 32 * 1024**2)
+    self.assertEqual(choose_chunk_size(1024**4), MAX_CHUNK_SIZE)
+    # A configured chunk size is used for every file
+    self.assertEqual(choose_chunk_size(10, configured=512), 512)
+
+
+class ChunkBitmapTest(TestCase):
+  """Tests for the ChunkBitmap class."""
+
+  def test_set_out_of_order(self):
+    """Test that chunks can be marked in any order."""
+    bitmap = ChunkBitmap(10)
+    self.assertTrue(bitmap.set(7))
+    self.assertTrue(bitmap.set(1))
+    self.assertFalse(bitmap.set(7))
+    self.assertEqual(bitmap.count(), 2)
+    self.assertEqual(bitmap.prefix(), 1)
+    self.assertEqual(bitmap.missing(), [2, 3, 4, 5, 6, 8, 9, 10])
+
+  def test_range(self):
+    """Test that chunks outside of the file are rejected."""
+    bitmap = ChunkBitmap(3)
+    self.assertFalse(bitmap.has(0))
+    self.assertFalse(bitmap.has(4))
+    with self.assertRaises(IndexError):
+      bitmap.set(4)
+
+  def test_completed(self):
+    """Test that a completed bitmap has all the chunks and no extra bits."""
+    bitmap = ChunkBitmap(11, completed=True)
+    self.assertTrue(bitmap.is_complete())
+    self.assertEqual(bitmap.prefix(), 11)
+    self.assertEqual(bitmap.missing(), [])
+    self.assertEqual(bitmap.to_bytes(), b"\xff\x07")
+
+  def test_round_trip(self):
+    """Test that the bitmap survives serialization."""
+    bitmap = ChunkBitmap(20)
+    for chunk in (2, 9, 20):
+      bitmap.set(chunk)
+    restored = ChunkBitmap.from_base64(20, bitmap.to_base64())
+    self.assertEqual(restored.to_bytes(), bitmap.to_bytes())
+    self.assertEqual(restored.count(), 3)
+    with self.assertRaises(ValueError):
+      ChunkBitmap.from_bytes(30, bitmap.to_bytes())
+
+
+class FileListTest(TestCase):
+  """Tests for the chunk progress of the FileList class."""
+
+  def setUp(self):
+    self.info = FileInfo("hash", 10 * 4194304, 0, 10)
+    self.filelist = FileList()
+    self.filelist.add("movie.mp4", self.info)
+
+  def test_completed_out_of_order(self):
+    """Test that chunks can be completed out of order."""
+    self.assertTrue(self.filelist.completed("movie.mp4", 5))
+    self.assertFalse(self.filelist.completed("movie.mp4", 5))
+    self.assertFalse(self.filelist.completed("movie.mp4", 11))
+    self.assertTrue(self.filelist.hasChunk("movie.mp4", 5))
+    self.assertFalse(self.filelist.hasChunk("movie.mp4", 1))
+    self.assertEqual(self.filelist.getLastDownloadedChunk("movie.mp4"), 0)
+    self.assertEqual(self.filelist.getCompletedCount("movie.mp4"), 1)
+
+    for chunk in self.filelist.getMissingChunks("movie.mp4"):
+      self.filelist.completed("movie.mp4", chunk)
+    self.assertTrue(self.filelist.isDownloaded("movie.mp4"))
+
+  def test_save_and_load(self):
+    """Test that the progress survives saving and loading."""
+    self.filelist.completed("movie.mp4", 3)
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, "filelist.dat")
+      self.filelist.save(path)
+      loaded = FileList()
+      loaded.load(path)
+    self.assertTrue(loaded.hasChunk("movie.mp4", 3))
+    self.assertEqual(loaded.getCompletedCount("movie.mp4"), 1)
+
+  def test_load_old_counter(self):
+    """Test that files saved with the serial counter are still loaded."""
+    data = {"movie.mp4": (self.info.to_dict(), 4)}
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, "filelist.dat")
+      with open(path, "wb") as f:
+        f.write(base64.b64encode(json.dumps(data).encode()))
+      loaded = FileList()
+      loaded.load(path)
+    self.assertEqual(loaded.getLastDownloadedChunk("movie.mp4"), 4)
+    self.assertEqual(loaded.getMissingChunks("movie.mp4"), [5, 6, 7, 8, 9, 10])
+
+  def test_load_replays_journal(self):
+    """Test that a loaded FileList matches the journaled changes."""
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, "filelist.dat")
+      self.filelist.attach(path)
+      self.filelist.completed("movie.mp4", 3)
+      self.filelist.completed("movie.mp4", 3)
+      self.filelist.add("song.mp3", FileInfo("hash", 10, 0, 1), downloaded=True)
+      self.filelist.add("old.iso", FileInfo("hash", 10, 0, 1))
+      self.filelist.remove("old.iso")
+      with open(f"{path}.log", "rb") as f:
+        self.assertEqual(len(f.readlines()), 4)
+
+      loaded = FileList()
+      loaded.load(path)
+    self.assertEqual(sorted(loaded.getFiles()), ["movie.mp4", "song.mp3"])
+    self.assertEqual(loaded.getMissingChunks("movie.mp4"), [1, 2, 4, 5, 6, 7, 8, 9, 10])
+    self.assertTrue(loaded.isDownloaded("song.mp3"))
+
+  def test_load_replays_reset(self):
+    """Test that a reset file loses its journaled chunks, and a torn change is dropped."""
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, "filelist.dat")
+      self.filelist.attach(path)
+      self.filelist.completed("movie.mp4", 1)
+      self.filelist.reset("movie.mp4")
+      self.filelist.completed("movie.mp4", 2)
+      with open(f"{path}.log", "ab") as f:
+        f.write(b'{"op":"chunk","file":"movie.mp4","ch')
+
+      loaded = FileList()
+      loaded.load(path)
+    self.assertEqual(loaded.getCompletedCount("movie.mp4"), 1)
+    self.assertTrue(loaded.hasChunk("movie.mp4", 2))
+
+  def test_load_replays_uncompleted(self):
+    """Test that only the uncompleted chunk is journaled, and it's missing after loading."""
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, "filelist.dat")
+      self.filelist.attach(path)
+      for chunk in (1, 2, 3):
+        self.filelist.completed("movie.mp4", chunk)
+      self.assertTrue(self.filelist.uncompleted("movie.mp4", 2))
+      self.assertFalse(self.filelist.uncompleted("movie.mp4", 2))
+      with open(f"{path}.log", "rb") as f:
+        self.assertEqual(len(f.readlines()), 4)
+
+      loaded = FileList()
+      loaded.load(path)
+    self.assertEqual(loaded.getMissingChunks("movie.mp4")[:2], [2, 4])
+    self.assertEqual(loaded.getCompletedCount("movie.mp4"), 2)
@@ -0,0 +1,111 @@
+from django.test import TestCase
+import hashlib
+import os
+import tempfile
+
+from ...File.FileInfo import FileInfo
+from ...File.Manifest import ChunkHasher, Manifest, ManifestStore
+from ...File.Rolling import checksum
+
+
+class ChunkHasherTest(TestCase):
+  """Tests for the ChunkHasher class."""
+
+  def test_pieces_of_any_size(self):
+    """Test that the hashes don't depend on how the stream is split."""
+    data = os.urandom(25)
+    expected = [hashlib.sha1(data[i:i + 10]).hexdigest() for i in range(0, 25, 10)]
+
+    for size in (1, 3, 10, 25):
+      hasher = ChunkHasher(chunk_size=10)
+      for i in range(0, len(data), size):
+        hasher.update(data[i:i + size])
+      self.assertEqual(hasher.hexdigests(), expected)
+
+  def test_exact_chunks(self):
+    """Test that no empty chunk is added after the last full chunk."""
+    hasher = ChunkHasher(chunk_size=4)
+    hasher.update(b"abcdefgh")
+    self.assertEqual(len(hasher.hexdigests()), 2)
+
+  def test_checksums(self):
+    """Test that the weak checksums are calculated along with the hashes."""
+    data = os.urandom(25)
+    hasher = ChunkHasher(chunk_size=10)
+    for i in range(0, len(data), 3):
+      hasher.update(data[i:i + 3])
+    self.assertEqual(hasher.checksums(), [checksum(data[i:i + 10]) for i in range(0, 25, 10)])
+
+
+class ChunkRangeTest(TestCase):
+  """Tests for the chunk range of the FileInfo class."""
+
+  def test_last_chunk_is_partial(self):
+    """Test that the last chunk ends at the end of the file."""
+    size = 4 * 1024 * 1024 + 10
+    info = FileInfo("hash", size, 0, 2)
+    self.assertEqual(info.chunk_range(1), (0, 4 * 1024 * 1024 - 1))
+    self.assertEqual(info.chunk_range(2), (4 * 1024 * 1024, size - 1))
+    with self.assertRaises(IndexError):
+      info.chunk_range(3)
+
+
+class ManifestStoreTest(TestCase):
+  """Tests for the ManifestStore class."""
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    self.addCleanup(self.tmp.cleanup)
+    self.store = ManifestStore(self.tmp.name, self.tmp.name)
+
+  def test_save_and_get(self):
+    """Test that a saved manifest is read back by a new store."""
+    self.store.save("movie.mp4", Manifest(2, ["a", "b"]))
+    store = ManifestStore(self.tmp.name, self.tmp.name)
+    self.assertEqual(store.get("movie.mp4").hashes(), ["a", "b"])
+    self.assertIsNone(store.get("movie.mp4").checksums)
+    self.assertIsNone(store.get("other.mp4"))
+
+  def test_checksums_saved(self):
+    """Test that the weak checksums are saved along with the hashes."""
+    self.store.save("movie.mp4", Manifest(2, ["a", "b"], [1, 2]))
+    store = ManifestStore(self.tmp.name, self.tmp.name)
+    self.assertEqual(store.get("movie.mp4").checksums, [1, 2])
+    with self.assertRaises(ValueError):
+      Manifest(2, ["a", "b"], [1])
+
+  def test_record(self):
+    """Test that the hashes of the downloaded chunks are recorded."""
+    self.store.record("movie.mp4", 3, 2, "b")
+    manifest = ManifestStore(self.tmp.name, self.tmp.name).get("movie.mp4")
+    self.assertEqual(manifest.hashes(), [None, "b", None])
+    self.assertFalse(manifest.is_complete())
+
+  def test_chunk_hash_without_manifest(self):
+    """Test that a file without manifest is hashed once and remembered."""
+    data = b"hello world"
+    with open(os.path.join(self.tmp.name, "hello.txt"), "wb") as f:
+      f.write(data)
+    info = FileInfo("hash", len(data), 0, 1)
+
+    self.assertEqual(self.store.chunk_hash("hello.txt", info, 1), hashlib.sha1(data).hexdigest())
+    os.remove(os.path.join(self.tmp.name, "hello.txt"))
+    self.assertEqual(self.store.chunk_hash("hello.txt", info, 1), hashlib.sha1(data).hexdigest())
+
+  def test_record_journaled(self):
+    """Test that a recorded hash is appended into the journal, and the manifest is rewritten once it's complete."""
+    path = os.path.join(self.tmp.name, "movie.mp4.json")
+    self.store.save("movie.mp4", Manifest(3, [None, None, None]))
+    saved = os.path.getmtime(path), os.path.getsize(path)
+    self.store.record("movie.mp4", 3, 1, "a")
+    self.store.record("movie.mp4", 3, 3, "c")
+    self.assertEqual((os.path.getmtime(path), os.path.getsize(path)), saved)
+    self.assertEqual(ManifestStore(self.tmp.name, self.tmp.name).get("movie.mp4").hashes(), ["a", None, "c"])
+
+    self.store.record("movie.mp4", 3, 2, "b")
+    self.assertEqual(os.path.getsize(f"{path}.log"), 0)
+    self.assertEqual(ManifestStore(self.tmp.name, self.tmp.name).get("movie.mp4").hashes(), ["a", "b", "c"])
+
+    self.store.remove("movie.mp4")
+    self.assertFalse(os.path.exists(path) or os.path.exists(f"{path}.log"))
+    self.assertIsNone(ManifestStore(self.tmp.name, self.tmp.name).get("movie.mp4"))
@@ -0,0 +1,34 @@
+from django.test import TestCase
+import hashlib
+
+from ...File.Merkle import merkle_root
+
+
+def chunk_hashes(count: int) -> list[str]:
+  """Creates the hashes of count chunks."""
+  return [hashlib.sha1(str(i).encode()).hexdigest() for i in range(count)]
+
+
+class MerkleRootTest(TestCase):
+  """Tests for the Merkle root of the chunks."""
+
+  def test_single_chunk(self):
+    """Test that the root of a single chunk is its hashed leaf."""
+    leaf = chunk_hashes(1)[0]
+    self.assertEqual(merkle_root([leaf]), hashlib.sha256(b"\x00" + bytes.fromhex(leaf)).hexdigest())
+
+  def test_any_changed_chunk_changes_root(self):
+    """Test that changing or reordering any chunk changes the root."""
+    hashes = chunk_hashes(7)
+    root = merkle_root(hashes)
+    self.assertEqual(root, merkle_root(list(hashes)))
+    for i in range(len(hashes)):
+      changed = list(hashes)
+      changed[i] = hashlib.sha1(b"bad").hexdigest()
+      self.assertNotEqual(merkle_root(changed), root)
+    self.assertNotEqual(merkle_root(hashes[::-1]), root)
+
+  def test_odd_node_not_duplicated(self):
+    """Test that a file is not confused with a file repeating its last chunk."""
+    hashes = chunk_hashes(3)
+    self.assertNotEqual(merkle_root(hashes), merkle_root(hashes + hashes[-1:]))
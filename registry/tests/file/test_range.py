@@ -0,0 +1,164 @@
+from django.test import TestCase, RequestFactory
+import os
+import zlib
+import tempfile
+
+from environments import Env
+from ...File.FileInfo import FileInfo
+from ...File.List import FileList
+from ...File.Range import parse_range, UnsatisfiableRange, MultipartRanges
+from ...File.Cache import ChunkCache
+from ...File import Compression
+from ... import views
+
+
+class ParseRangeTest(TestCase):
+  """Tests for the parsing of the Range header."""
+
+  def test_forms(self):
+    """Test the closed, open ended and suffix ranges."""
+    self.assertEqual(parse_range("bytes=0-99", 1000), [(0, 99)])
+    self.assertEqual(parse_range("bytes=900-", 1000), [(900, 999)])
+    self.assertEqual(parse_range("bytes=-100", 1000), [(900, 999)])
+    self.assertEqual(parse_range("bytes=-5000", 1000), [(0, 999)])
+    self.assertEqual(parse_range("bytes=990-5000", 1000), [(990, 999)])
+    self.assertEqual(parse_range("bytes=0-0, -1", 1000), [(0, 0), (999, 999)])
+
+  def test_invalid_is_ignored(self):
+    """Test that a malformed header is ignored."""
+    for header in ("items=0-1", "bytes=a-b", "bytes=5-1", "bytes=-", "bytes=" + ",".join(["0-1"] * 20)):
+      self.assertIsNone(parse_range(header, 1000), header)
+
+  def test_unsatisfiable(self):
+    """Test that ranges outside of the file are unsatisfiable."""
+    with self.assertRaises(UnsatisfiableRange):
+      parse_range("bytes=1000-", 1000)
+    with self.assertRaises(UnsatisfiableRange):
+      parse_range("bytes=-0", 1000)
+
+
+class DownloadViewTest(TestCase):
+  """Tests for the download view."""
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    self.addCleanup(self.tmp.cleanup)
+    self.data = os.urandom(10_000)
+    with open(os.path.join(self.tmp.name, "data.bin"), "wb") as f:
+      f.write(self.data)
+
+    filelist = FileList()
+    filelist.add("data.bin", FileInfo("hash", len(self.data), 0, 1), downloaded=True)
+    for name, value in (("DOWNLOADS", self.tmp.name), ("FILES", filelist)):
+      self.addCleanup(Env.update, name, Env.get(name))
+      Env.update(name, value)
+    self.factory = RequestFactory()
+
+  def get(self, range_header: str | None = None, **extra: str):
+    headers = {"Range": range_header} if range_header is not None else {}
+    headers.update(extra)
+    response = views.download(self.factory.get("/download", {"file": "data.bin"}, headers=headers))
+    body = b"".join(response.streaming_content) if response.streaming else response.content
+    if hasattr(response, "close"):
+      response.close()
+    return response, body
+
+  def test_whole_file(self):
+    """Test that the whole file is streamed."""
+    response, body = self.get()
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(body, self.data)
+    self.assertEqual(int(response["Content-Length"]), len(self.data))
+
+  def test_compressed_range(self):
+    """Test that a range is only compressed for the nodes asking for it, never through Content-Encoding."""
+    text = b"INFO request served\n" * 500
+    with open(os.path.join(self.tmp.name, "data.bin"), "wb") as f:
+      f.write(text)
+    filelist = FileList()
+    filelist.add("data.bin", FileInfo("hash", len(text), 0, 1), downloaded=True)
+    for name, value in (("FILES", filelist), ("COMPRESSOR", Compression.Compressor(ChunkCache(1024 * 1024)))):
+      self.addCleanup(Env.update, name, Env.get(name))
+      Env.update(name, value)
+
+    response, body = self.get(f"bytes=0-{len(text) - 1}", **{"Accept-Encoding": "deflate, *"})
+    self.assertEqual(body, text)
+    self.assertFalse(response.has_header("Content-Encoding"))
+
+    response, body = self.get(f"bytes=0-{len(text) - 1}", **{Compression.HEADER: "deflate"})
+    self.assertEqual(response[Compression.HEADER], "deflate")
+    self.assertFalse(response.has_header("Content-Encoding"))
+    self.assertEqual(response["Content-Range"], f"bytes 0-{len(text) - 1}/{len(text)}")
+    self.assertEqual(zlib.decompress(body), text)
+
+  def test_single_range(self):
+    """Test that a single range only sends its bytes."""
+    response, body = self.get("bytes=100-199")
+    self.assertEqual(response.status_code, 206)
+    self.assertEqual(body, self.data[100:200])
+    self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.data)}")
+
+    response, body = self.get("bytes=-10")
+    self.assertEqual(body, self.data[-10:])
+
+  def test_whole_chunk_is_cached(self):
+    """Test that a range which is exactly a downloaded chunk is served from the cache."""
+    cache = ChunkCache(1024 * 1024)
+    self.addCleanup(Env.update, "CHUNK_CACHE", Env.get("CHUNK_CACHE"))
+    Env.update("CHUNK_CACHE", cache)
+
+    for _ in range(2):
+      response, body = self.get(f"bytes=0-{len(self.data) - 1}")
+      self.assertEqual(response.status_code, 206)
+      self.assertEqual(body, self.data)
+    self.assertEqual(cache.stats()["hits"], 1)
+
+  def test_multiple_ranges(self):
+    """Test that multiple ranges are sent as multipart/byteranges."""
+    response, body = self.get("bytes=0-9,5000-5009")
+    self.assertEqual(response.status_code, 206)
+    self.assertTrue(response["Content-Type"].startswith("multipart/byteranges; boundary="))
+    self.assertEqual(int(response["Content-Length"]), len(body))
+    self.assertIn(self.data[0:10], body)
+    self.assertIn(self.data[5000:5010], body)
+    self.assertIn(f"Content-Range: bytes 5000-5009/{len(self.data)}".encode(), body)
+
+  def test_unsatisfiable(self):
+    """Test that a range after the end of the file is rejected."""
+    response, _ = self.get("bytes=20000-")
+    self.assertEqual(response.status_code, 416)
+    self.assertEqual(response["Content-Range"], f"bytes */{len(self.data)}")
+
+  def test_file_not_held(self):
+    """Test that a listed file whose bytes are not held is not found."""
+    os.remove(os.path.join(self.tmp.name, "data.bin"))
+    response, _ = self.get()
+    self.assertEqual(response.status_code, 404)
+
+  def test_chunks_not_held(self):
+    """Test that only the downloaded chunks of a file being downloaded are sent."""
+    filelist = FileList()
+    filelist.add("data.bin", FileInfo("hash", len(self.data), 0, 10, "", 1000))
+    filelist.completed("data.bin", 1)
+    Env.update("FILES", filelist)
+
+    response, body = self.get("bytes=0-999")
+    self.assertEqual(response.status_code, 206)
+    self.assertEqual(body, self.data[:1000])
+    response, _ = self.get("bytes=500-1500")
+    self.assertEqual(response.status_code, 416)
+    response, _ = self.get()
+    self.assertEqual(response.status_code, 404)
+
+
+class MultipartRangesTest(TestCase):
+  """Tests for the MultipartRanges class."""
+
+  def test_length_matches_body(self):
+    """Test that the announced length is the length of the streamed body."""
+    with tempfile.NamedTemporaryFile() as f:
+      f.write(b"0123456789")
+      f.flush()
+      body = MultipartRanges(f.name, [(0, 1), (4, 4), (8, 9)], 10)
+      self.assertEqual(len(b"".join(body)), len(body))
+
@@ -0,0 +1,121 @@
+from django.test import TestCase
+import hashlib
+import io
+import os
+import tempfile
+
+from ...File.Manifest import ChunkHasher
+from ...File.Upload import UploadStore, UploadConflict, parse_content_range
+
+
+class ParseContentRangeTest(TestCase):
+  """Tests for the parse_content_range function."""
+
+  def test_valid(self):
+    self.assertEqual(parse_content_range("bytes 0-99/1000"), (0, 99, 1000))
+
+  def test_invalid(self):
+    for header in ("", "bytes 0-99", "bytes 99-0/1000", "bytes 0-1000/1000", "items 0-1/2", "bytes 0-/10"):
+      with self.assertRaises(ValueError, msg=header):
+        parse_content_range(header)
+
+
+class UploadSessionTest(TestCase):
+  """Tests for the UploadSession and UploadStore classes."""
+
+  def setUp(self):
+    self.tmp = tempfile.TemporaryDirectory()
+    self.addCleanup(self.tmp.cleanup)
+    self.store = UploadStore(self.tmp.name, workers=4)
+    self.data = os.urandom(1000)
+
+  def expected(self, chunk_size: int) -> tuple[str, list[str]]:
+    hasher = ChunkHasher(chunk_size)
+    hasher.update(self.data)
+    return hashlib.sha512(self.data).hexdigest(), hasher.hexdigests()
+
+  def put(self, session, start: int, end: int) -> int:
+    return session.write(start, end - start, io.BytesIO(self.data[start:end]).read)
+
+  def test_out_of_order_ranges(self):
+    """Test that the ranges starting at chunk boundaries can arrive in any order, and the hashes match the file."""
+    session = self.store.create("a.bin", len(self.data), chunk_size=64)
+    for start in reversed(range(0, len(self.data), 192)):
+      self.put(session, start, min(start + 192, len(self.data)))
+
+    self.assertEqual(session.missing(), [])
+    self.assertEqual(session.finalize(), self.expected(64))
+    with open(session.path, "rb") as f:
+      self.assertEqual(f.read(), self.data)
+
+  def test_resume_after_dropped_body(self):
+    """Test that the bytes received before the body ended are kept, and the upload resumes from them."""
+    session = self.store.create("a.bin", len(self.data), chunk_size=64)
+    # The body ends after 100 bytes out of the 1000
+    written = session.write(0, len(self.data), io.BytesIO(self.data[:100]).read)
+    self.assertEqual(written, 100)
+    self.assertEqual(session.received(), 100)
+    self.assertEqual(session.missing(), [(100, 999)])
+
+    with self.assertRaises(UploadConflict):
+      session.finalize()
+    self.put(session, 100, len(self.data))
+    self.assertEqual(session.finalize(), self.expected(64))
+
+  def test_gap_inside_chunk(self):
+    """Test that a range leaving a gap inside its chunk is refused."""
+    session = self.store.create("a.bin", len(self.data), chunk_size=64)
+    self.put(session, 0, 10)
+    with self.assertRaises(UploadConflict):
+      self.put(session, 20, 30)
+    # A range starting at a chunk boundary never leaves a gap
+    self.put(session, 128, 200)
+    self.assertEqual(session.missing(), [(10, 127), (200, 999)])
+
+  def test_outside_file(self):
+    session = self.store.create("a.bin", 10)
+    with self.assertRaises(UploadConflict):
+      session.write(5, 10, io.BytesIO(b"x" * 10).read)
+
+  def test_duplicate_filename(self):
+    self.store.create("a.bin", 10)
+    with self.assertRaises(UploadConflict):
+      self.store.create("a.bin", 10)
+
+  def test_empty_file(self):
+    session = self.store.create("a.bin", 0)
+    self.assertEqual(session.finalize(), (hashlib.sha512(b"").hexdigest(), []))
+
+  def test_load_after_restart(self):
+    """Test that an upload saved to the disk is resumed by a new store."""
+    session = self.store.create("a.bin", len(self.data), chunk_size=64)
+    self.put(session, 0, 500)
+    self.store.save(session)
+
+    store = UploadStore(self.tmp.name, workers=2)
+    store.load()
+    restored = store.get(session.id)
+    self.assertEqual(restored.missing(), [(500, 999)])
+    self.put(restored, 500, len(self.data))
+    self.assertEqual(restored.finalize(), self.expected(64))
+
+  def test_checksums_after_restart(self):
+    """Test that the checksums of the chunks hashed before a restart are kept."""
+    session = self.store.create("a.bin", len(self.data), chunk_size=400)
+    self.put(session, 0, len(self.data))
+    session.finalize()
+    checksums = session.checksums()
+    self.store.save(session)
+
+    store = UploadStore(self.tmp.name, workers=2)
+    store.load()
+    restored = store.get(session.id)
+    self.assertEqual(restored.finalize(), self.expected(400))
+    self.assertEqual(restored.checksums(), checksums)
+    self.assertNotIn(None, checksums)
+
+  def test_remove(self):
+    session = self.store.create("a.bin", 10)
+    self.store.remove(session.id)
+    self.assertIsNone(self.store.get(session.id))
+    self.assertEqual(os.listdir(self.tmp.name), [])
@@ -0,0 +1,66 @@
+from django.test import TestCase
+import time
+
+from ...Node.List import NodeList
+from ...Node.Gossip import Gossip, Message
+
+
+class GossipTest(TestCase):
+  """Tests for the Gossip class."""
+
+  def setUp(self):
+    """Set up a Gossip without remote nodes, so nothing is pushed."""
+    self.nodelist = NodeList()
+    self.gossip = Gossip(self.nodelist)
+    self.delivered: list[bytes] = []
+    self.gossip.register("test", lambda payload: self.delivered.append(payload) or True)
+
+  def message(self, msg_id: str) -> Message:
+    """Create a test message."""
+    return Message(msg_id, "test", msg_id.encode(), 3, time.time())
+
+  def test_duplicates_are_not_delivered(self):
+    """Test that a message is given to the handler only once."""
+    self.assertTrue(self.gossip.receive(self.message("a")))
+    self.assertFalse(self.gossip.receive(self.message("a")))
+    self.assertEqual(self.delivered, [b"a"])
+
+    stats = self.gossip.stats()
+    self.assertEqual(stats["received"], 2)
+    self.assertEqual(stats["duplicates"], 1)
+    self.assertEqual(stats["redundancy_ratio"], 0.5)
+
+  def test_published_message_is_known(self):
+    """Test that the own published messages are treated as duplicates."""
+    self.assertTrue(self.gossip.publish("test", b"payload", msg_id="b"))
+    self.assertFalse(self.gossip.publish("test", b"payload", msg_id="b"))
+    self.assertFalse(self.gossip.receive(self.message("b")))
+    self.assertEqual(self.delivered, [])
+
+  def test_exchange(self):
+    """Test that the digest exchange finds the missing messages of both sides."""
+    self.gossip.receive(self.message("a"))
+    self.gossip.receive(self.message("b"))
+
+    missing_remote, missing_local = self.gossip.exchange(["b", "c"])
+    self.assertEqual([m.id for m in missing_remote], ["a"])
+    self.assertEqual(missing_local, ["c"])
+
+  def test_message_dict_roundtrip(self):
+    """Test that a message survives the conversion to a dictionary."""
+    msg = self.message("a")
+    self.assertEqual(Message.from_dict(msg.to_dict()), msg)
+
+  def test_fanout_adapts_to_size(self):
+    """Test that the fanout grows slowly with the network size."""
+    self.assertEqual(self.gossip.fanout(), 0)
+    for i in range(3):
+      self.nodelist.add(f"10.0.0.{i}", 8000)
+    small = self.gossip.fanout()
+    for i in range(3, 1000):
+      self.nodelist.add(f"10.0.{i >> 8}.{i & 255}", 8000)
+    large = self.gossip.fanout()
+
+    self.assertEqual(small, 2)
+    self.assertGreater(large, small)
+    self.assertLess(large, 20)
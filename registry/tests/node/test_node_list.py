@@ -0,0 +1,150 @@
+from django.test import TestCase
+import os
+import tempfile
+import time
+
+from ...Node.List import NodeList
+from ...Node.Health import PeerHealth, FAILURE_THRESHOLD, MAX_BACKOFF
+
+
+class PeerHealthTest(TestCase):
+  """Tests for the PeerHealth class."""
+
+  def test_success_closes_circuit(self):
+    """Test that a success after failures closes the circuit."""
+    health = PeerHealth()
+    for _ in range(FAILURE_THRESHOLD):
+      health.failure()
+    self.assertTrue(health.is_open())
+    self.assertEqual(health.weight(), 0.0)
+
+    health.success(0.05)
+    self.assertFalse(health.is_open())
+    self.assertEqual(health.failures, 0)
+    self.assertGreater(health.weight(), 0.0)
+
+  def test_backoff_grows(self):
+    """Test that the circuit stays open longer on repeated failures."""
+    health = PeerHealth()
+    for _ in range(FAILURE_THRESHOLD):
+      health.failure()
+    first = health.open_until
+    health.failure()
+    self.assertGreater(health.open_until, first)
+
+  def test_backoff_bounded(self):
+    """Test that a node failing for long is backed off at most MAX_BACKOFF, without overflowing."""
+    health = PeerHealth()
+    for _ in range(5000):
+      health.failure()
+    self.assertLessEqual(health.open_until, time.time() + MAX_BACKOFF)
+    self.assertTrue(health.is_open())
+
+  def test_fast_node_weighs_more(self):
+    """Test that a faster node gets a higher weight."""
+    fast, slow = PeerHealth(), PeerHealth()
+    for _ in range(10):
+      fast.success(0.01)
+      slow.success(1.0)
+    self.assertGreater(fast.weight(), slow.weight())
+
+
+class NodeListHealthTest(TestCase):
+  """Tests for the health tracking of the NodeList class."""
+
+  def setUp(self):
+    """Set up a NodeList with few nodes."""
+    self.nodelist = NodeList()
+    for i in range(5):
+      self.nodelist.add(f"10.0.0.{i}", 8000)
+
+  def test_weighted_picks_skips_open_circuit(self):
+    """Test that nodes with an open circuit are never picked."""
+    for _ in range(FAILURE_THRESHOLD):
+      self.nodelist.record_failure("10.0.0.0")
+
+    self.assertFalse(self.nodelist.is_available("10.0.0.0"))
+    for _ in range(20):
+      picked = self.nodelist.weighted_picks(5)
+      self.assertEqual(len(picked), 4)
+      self.assertNotIn(("10.0.0.0", 8000), picked)
+
+  def test_weighted_picks_limits_size(self):
+    """Test that weighted_picks never returns more than the available nodes."""
+    self.assertEqual(len(self.nodelist.weighted_picks(2)), 2)
+    self.assertEqual(len(self.nodelist.weighted_picks(10)), 5)
+
+  def test_track_records_failure(self):
+    """Test that an exception inside track is recorded and raised again."""
+    with self.assertRaises(ConnectionError):
+      with self.nodelist.track("10.0.0.1"):
+        raise ConnectionError()
+    self.assertEqual(self.nodelist.health("10.0.0.1").failures, 1)
+
+    with self.nodelist.track("10.0.0.1"):
+      pass
+    self.assertEqual(self.nodelist.health("10.0.0.1").failures, 0)
+
+  def test_remove_drops_health(self):
+    """Test that removing a node also removes its health record."""
+    self.nodelist.remove("10.0.0.1")
+    with self.assertRaises(KeyError):
+      self.nodelist.health("10.0.0.1")
+
+
+class NodeListTest(TestCase):
+  """Tests for the membership and persistence of the NodeList class."""
+
+  def setUp(self):
+    """Set up a NodeList journaled into a temporary directory."""
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.tmpdir.name, "nodelist.bin")
+    self.nodelist = NodeList()
+    self.nodelist.attach(self.path)
+
+  def tearDown(self):
+    """Remove the temporary directory."""
+    self.tmpdir.cleanup()
+
+  def test_swap_remove(self):
+    """Test that removing keeps every remaining node reachable."""
+    for i in range(10):
+      self.nodelist.add(f"10.0.0.{i}", 8000 + i)
+    self.assertTrue(self.nodelist.remove("10.0.0.3"))
+    self.assertTrue(self.nodelist.remove("10.0.0.9"))
+    self.assertFalse(self.nodelist.remove("10.0.0.3"))
+
+    self.assertEqual(self.nodelist.size(), 8)
+    picked = dict(self.nodelist.random_picks(8))
+    self.assertNotIn("10.0.0.3", picked)
+    self.assertEqual(picked["10.0.0.5"], 8005)
+    for ip in picked:
+      self.assertTrue(self.nodelist.exists(ip))
+
+  def test_load_replays_journal(self):
+    """Test that a loaded NodeList matches the journaled changes."""
+    for i in range(5):
+      self.nodelist.add(f"10.0.0.{i}", 8000)
+    self.nodelist.remove("10.0.0.2")
+
+    loaded = NodeList()
+    loaded.add("192.168.0.1", 8000)
+    loaded.load(self.path)
+    self.assertEqual(loaded.size(), 4)
+    self.assertFalse(loaded.exists("192.168.0.1"))
+    self.assertFalse(loaded.exists("10.0.0.2"))
+
+  def test_load_ignores_torn_record(self):
+    """Test that a half written record at the end of the journal is dropped."""
+    self.nodelist.add("10.0.0.1", 8000)
+    with open(f"{self.path}.log", "ab") as f:
+      f.write(b'{"op":"add","ip":"10.0')
+
+    loaded = NodeList()
+    loaded.load(self.path)
+    self.assertEqual(loaded.size(), 1)
+
+  def test_load_missing_file(self):
+    """Test that loading from an empty path raises FileNotFoundError."""
+    with self.assertRaises(FileNotFoundError):
+      NodeList().load(os.path.join(self.tmpdir.name, "missing.bin"))
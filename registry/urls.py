@@ -1,4 +1,16 @@
 from django.urls import path
 from . import views
 
-urlpatterns = [path("upload", views.upload), path("download", views.download)]
+urlpatterns = [
+    path("upload", views.upload),
+    path("uploadSession", views.upload_session),
+    path("uploadFinalize", views.upload_finalize),
+    path("download", views.download),
+    path("manifest", views.manifest),
+    path("gossip", views.gossip),
+    path("gossipDigest", views.gossip_digest),
+    path("gossipStats", views.gossip_stats),
+    path("cacheStats", views.cache_stats),
+    path("chunkStoreStats", views.chunk_store_stats),
+    path("compressionStats", views.compression_stats),
+]
@@ -1,89 +1,58 @@
-from django.http import JsonResponse, HttpRequest, HttpResponseNotAllowed, HttpResponse
+from django.http import JsonResponse, HttpRequest, HttpResponseNotAllowed, HttpResponse, FileResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from environments import Env
-from .File import List as FileList, FileInfo
-from .Node import List as NodeList
+from .File import List as FileList, FileInfo, Manifest, Range, Cache, Upload, ChunkStore, Compression
+from .File.Merkle import merkle_root
+from .Node import Gossip
 import os
+import json
 import hashlib
 import time
-import httpx
+from typing import Iterator
 from blockchain.chain import Block, Blockchain, Key
 from blockchain.chain.ActionData import File
-from blockchain.views import send_block
-
-
-def tell_about_chunk(
-    file_details: FileInfo.FileInfo,
-    filename: str,
-    ip: str,
-    port: int,
-    machine_ip: str,
-    chunk_num: int,
-    start_byte: int,
-    end_byte: int,
-):
+from filefetcher import Announcer
+
+
+def announce_chunk(file_details: FileInfo.FileInfo, filename: str, chunk_num: int):
   """
-  Function which tells other nodes about the specific chunk
+  Function which tells other nodes that the current node has the specific chunk
   Args:
     file_details: The FileInfo Object of the file
     filename: The name of the file
-    ip: The IP Address of the remote node
-    port: The port number of the remote node
-    machine_ip: The ip address of the current node
     chunk_num: The number of the chunk
-    start_byte: The starting byte location of the chunk
-    end_byte: The ending byte location of the chunk
   """
-  # Getting the sha1 hash of current chunk
-  file_path: str = os.path.join(Env.get("DOWNLOADS"), filename)
-  with open(file_path, "rb") as f:
-    f.seek(start_byte)
-    length = (end_byte - start_byte) + 1
-    sha1hash = hashlib.sha1(f.read(length)).hexdigest()
+  # Getting the sha1 hash of current chunk from the manifest
+  manifests: Manifest.ManifestStore = Env.get("MANIFESTS")
+  sha1hash = manifests.chunk_hash(filename, file_details, chunk_num)
 
-  # Telling other nodes about the chunk
-  try:
-    httpx.post(
-        url=f"http://{ip}:{port}/response",
-        data={
-            "filename": filename,
-            "chunk": chunk_num,
-            "total_chunks": file_details.total_chunks,
-            "start_byte": start_byte,
-            "end_byte": end_byte,
-            "sha1": sha1hash,
-            "ip_address": machine_ip,
-            "port": port,
-        },
-    )
-  except httpx.ReadTimeout:
-    pass
+  # Telling other nodes about the chunk, along with the other chunks announced meanwhile
+  announcer: Announcer.Announcer = Env.get("ANNOUNCER")
+  announcer.publish(Announcer.Announcement(filename, file_details.total_chunks, chunk_num, sha1hash))
 
 
-def tell_other_nodes(
-    filename: str, file_details: FileInfo.FileInfo, start_range: int, end_range: int
-):
+def tell_other_nodes(filename: str, file_details: FileInfo.FileInfo, previous: str = ""):
   """
-  Function tells random 4 nodes about the specific chunk
+  Function creates the add_file block of the file, and tells other nodes about the block and the first chunk
+  Args:
+    filename: The name of the file
+    file_details: The FileInfo Object of the file
+    previous: The SHA-512 hash of the version which the file replaces, an update_file block is created for it
   """
-  nodelist: NodeList.NodeList = Env.get("NODES")
   chain: Blockchain.Blockchain = Env.get("CHAIN")
   machine_ip: str = Env.get("IPADDRESS")
   port: int = Env.get("PORT")
   keyring: Key.Key = Env.get("KEY")
   chain_path: str = Env.get("CHAINDATA")
 
-  if nodelist.size() > 4:
-    picked_nodes = nodelist.random_picks(4)
-  else:
-    picked_nodes = nodelist.random_picks(nodelist.size())
-
   if (private_key := keyring.get_private_key_raw()) is not None:
     blk = Block.Block(
         chain.size(),
         chain.last_block_hash(),
-        "add_file",
-        File.File(filename, file_details.filehash, file_details.size),
+        "update_file" if previous else "add_file",
+        File.File(
+            filename, file_details.filehash, file_details.size, file_details.merkle_root, file_details.chunk_size, previous
+        ),
         machine_ip,
         port,
         private_key,
@@ -94,20 +63,19 @@ def tell_other_nodes(
   chain.add(blk)
   chain.save(chain_path)
 
-  # Sending the blocks to the nodes
+  # Sending the block to the nodes
   # And telling them that the current node have downloadable chunks
-  for nodeIP, portNum in picked_nodes:
-    send_block(nodeIP, portNum, blk)
-    tell_about_chunk(
-        file_details, filename, nodeIP, port, machine_ip, 1, start_range, end_range
-    )
+  gossip: Gossip.Gossip = Env.get("GOSSIP")
+  gossip.publish("block", blk.to_bytes(), msg_id=blk.get_hash())
+  if file_details.total_chunks > 0:
+    announce_chunk(file_details, filename, 1)
 
 
 # Create your views here.
 @csrf_exempt
 def upload(response: HttpRequest):
   """
-  Function to handle uploading of files
+  Function to handle uploading of files, `?update=1` uploads a new version of a file which exists already
   """
   if response.method != "POST":
     return HttpResponseNotAllowed(["POST"])
@@ -118,7 +86,7 @@ def upload(response: HttpRequest):
   uploaded_file = response.FILES["file"]
 
   filelist: FileList.FileList = Env.get("FILES")
-  if filelist.exist(uploaded_file.name):
+  if filelist.exist(uploaded_file.name) and response.GET.get("update") != "1":
     return JsonResponse(
         {
             "status": False,
@@ -127,39 +95,272 @@ def upload(response: HttpRequest):
         status=500,
     )
 
+  # The hashes of the chunks are calculated in the same pass as the hash of the file
   sha512 = hashlib.sha512()
+  chunk_size = FileInfo.choose_chunk_size(uploaded_file.size, Env.get("CHUNK_SIZE"))
+  hasher = Manifest.ChunkHasher(chunk_size)
   save_path: str = os.path.join(Env.get("DOWNLOADS"), uploaded_file.name)
-  with open(save_path, "wb") as f:
+  # The file is written aside and moved in place, so the previous version is served till then
+  tmp_path = f"{save_path}.upload"
+  with open(tmp_path, "wb") as f:
     for chunk in uploaded_file.chunks():
       f.write(chunk)
       sha512.update(chunk)
+      hasher.update(chunk)
+  os.replace(tmp_path, save_path)
 
-  total_chunks = uploaded_file.size // (4 * 1024 * 1024)
-  if (uploaded_file.size % (4 * 1024 * 1024)) != 0:
-    total_chunks += 1
-
-  file_details = FileInfo.FileInfo(
-      sha512.hexdigest(), uploaded_file.size, int(time.time()), total_chunks
+  add_uploaded_file(
+      uploaded_file.name, uploaded_file.size, chunk_size, sha512.hexdigest(), hasher.hexdigests(), hasher.checksums()
   )
-  filelist.add(uploaded_file.name, file_details, downloaded=True)
-  filepath: str = Env.get("FILELIST_PATH")
-  filelist.save(filepath)
-
-  # Sending 4MiB chunk
-  if uploaded_file.size > (4 * 1024 * 1024):
-    tell_other_nodes(uploaded_file.name, file_details,
-                     0, (4 * 1024 * 1024) - 1)
-  else:
-    tell_other_nodes(uploaded_file.name, file_details,
-                     0, uploaded_file.size)
-
   return JsonResponse({"status": True})
 
 
+def add_uploaded_file(
+    filename: str, size: int, chunk_size: int, sha512: str, chunk_hashes: list[str], checksums: list[int] | None = None
+):
+  """
+  Function adds a file which is uploaded to the current node into the FileList, saves its manifest and tells other nodes about it. If the file exists already then the upload is its new version.
+  Args:
+    filename: The name of the file, already saved into the downloads
+    size: The size of the file (In Bytes)
+    chunk_size: The size of a chunk of the file (In Bytes)
+    sha512: The SHA-512 hash of the file
+    chunk_hashes: The SHA-1 hashes of the chunks of the file
+    checksums: The weak rolling checksums of the chunks of the file
+  """
+  total_chunks = len(chunk_hashes)
+  file_details = FileInfo.FileInfo(sha512, size, int(time.time()), total_chunks, merkle_root(chunk_hashes), chunk_size)
+  manifests: Manifest.ManifestStore = Env.get("MANIFESTS")
+  filelist: FileList.FileList = Env.get("FILES")
+  store: ChunkStore.ChunkStore | None = Env.get("CHUNK_STORE")
+
+  # Everything known about the previous version is forgotten, its bytes are replaced already
+  previous = ""
+  if filelist.exist(filename):
+    previous = filelist.get(filename).filehash
+    filelist.remove(filename)
+    if store is not None:
+      store.forget(filename)
+    manifests.remove(filename)
+    cache: Cache.ChunkCache = Env.get("CHUNK_CACHE")
+    cache.invalidate(filename)
+    Env.get("AVAILABILITY").remove(filename)
+    Env.get("FILE_DOWNLOADER").forget(filename)
+  manifests.save(filename, Manifest.Manifest(total_chunks, chunk_hashes, checksums))
+
+  # A file identical to a file held already shares its bytes, and its chunks can be found by their hash
+  if store is not None:
+    store.alias(filelist, manifests, filename, file_details)
+    for chunk, sha1 in enumerate(chunk_hashes, start=1):
+      store.add(sha1, filename, chunk)
+
+  filelist.add(filename, file_details, downloaded=True)
+
+  tell_other_nodes(filename, file_details, previous)
+
+
+def upload_state(session: Upload.UploadSession, status: int = 200, reason: str | None = None) -> JsonResponse:
+  """
+  Function gives the state of an upload session as the response
+  """
+  body = {
+      "status": reason is None,
+      "id": session.id,
+      "filename": session.filename,
+      "size": session.size,
+      "received": session.received(),
+      "missing": session.missing(),
+  }
+  if reason is not None:
+    body["reason"] = reason
+  return JsonResponse(body, status=status)
+
+
+@csrf_exempt
+def upload_session(response: HttpRequest):
+  """
+  Handles resumable uploads, the file is sent in byte ranges which can be retried after the connection drops:
+  - POST creates the upload, the body is `{"filename": <name_of_the_file>, "size": <size_in_bytes>}`, `?update=1` uploads a new version of a file which exists already
+  - PUT `?id=<upload_id>` writes the bytes given in the Content-Range header (`bytes <start>-<end>/<size>`), the body is the raw bytes. A range must start at a chunk boundary or where the received bytes of its chunk end, so parallel ranges should be aligned to the chunk size
+  - GET `?id=<upload_id>` gives the count of received bytes, and the missing ranges to send on resume
+  - DELETE `?id=<upload_id>` aborts the upload
+  The chunks are hashed while the bytes arrive, and `/uploadFinalize` adds the file.
+  """
+  uploads: Upload.UploadStore = Env.get("UPLOADS")
+  filelist: FileList.FileList = Env.get("FILES")
+
+  if response.method == "POST":
+    try:
+      data = json.loads(response.body)
+      filename, size = data["filename"], data["size"]
+    except (ValueError, KeyError, TypeError):
+      return JsonResponse({"status": False, "reason": "provide the filename and the size"}, status=400)
+    if not isinstance(filename, str) or not isinstance(size, int) or size < 0:
+      return JsonResponse({"status": False, "reason": "provide the filename and the size"}, status=400)
+    if filename in ("", ".", "..") or os.path.basename(filename) != filename:
+      return JsonResponse({"status": False, "reason": "invalid filename"}, status=400)
+    if filelist.exist(filename) and response.GET.get("update") != "1":
+      return JsonResponse(
+          {
+              "status": False,
+              "reason": "filename already exist, please choose another filename",
+          },
+          status=500,
+      )
+    try:
+      session = uploads.create(filename, size, FileInfo.choose_chunk_size(size, Env.get("CHUNK_SIZE")))
+    except Upload.UploadConflict as e:
+      return JsonResponse({"status": False, "reason": str(e)}, status=409)
+    return JsonResponse(
+        {"status": True, "id": session.id, "chunk_size": session.chunk_size}, status=201
+    )
+
+  if response.method not in ("PUT", "GET", "DELETE"):
+    return HttpResponseNotAllowed(["POST", "PUT", "GET", "DELETE"])
+
+  if (session := uploads.get(response.GET.get("id", ""))) is None:
+    return JsonResponse({"status": False, "reason": "upload not found"}, status=404)
+
+  if response.method == "GET":
+    return upload_state(session)
+
+  if response.method == "DELETE":
+    uploads.remove(session.id)
+    return JsonResponse({"status": True})
+
+  try:
+    start, end, size = Upload.parse_content_range(response.headers.get("Content-Range", ""))
+  except ValueError:
+    return JsonResponse({"status": False, "reason": "provide a valid Content-Range header"}, status=400)
+  if size != session.size:
+    return upload_state(session, 400, "size doesn't match the upload")
+
+  length = end - start + 1
+  try:
+    written = session.write(start, length, response.read)
+  except Upload.UploadConflict as e:
+    return upload_state(session, 409, str(e))
+  finally:
+    uploads.save(session)
+
+  if written < length:
+    return upload_state(session, 400, "body ended before the range")
+  return upload_state(session)
+
+
+@csrf_exempt
+def upload_finalize(response: HttpRequest):
+  """
+  Finishes a resumable upload (`?id=<upload_id>`) after all its bytes are received, the file is added and the add_file block is created. With `?update=1` the file replaces its previous version, and an update_file block is created.
+  """
+  if response.method != "POST":
+    return HttpResponseNotAllowed(["POST"])
+
+  uploads: Upload.UploadStore = Env.get("UPLOADS")
+  if (session := uploads.get(response.GET.get("id", ""))) is None:
+    return JsonResponse({"status": False, "reason": "upload not found"}, status=404)
+
+  try:
+    sha512, chunk_hashes = session.finalize()
+  except Upload.UploadConflict as e:
+    return upload_state(session, 409, str(e))
+
+  filelist: FileList.FileList = Env.get("FILES")
+  if filelist.exist(session.filename) and response.GET.get("update") != "1":
+    return upload_state(session, 500, "filename already exist, please choose another filename")
+
+  os.replace(session.path, os.path.join(Env.get("DOWNLOADS"), session.filename))
+  uploads.remove(session.id, keep_data=True)
+  add_uploaded_file(session.filename, session.size, session.chunk_size, sha512, chunk_hashes, session.checksums())
+  return JsonResponse({"status": True, "filehash": sha512})
+
+
+def held_range(filename: str, start_byte: int, end_byte: int) -> bool:
+  """
+  Function checks if the current node holds all the chunks of a range, a file being downloaded is served only for its downloaded chunks
+  Args:
+    filename: The name of the file
+    start_byte: The starting byte of the range
+    end_byte: The ending byte of the range
+  Returns:
+    bool: Returns True if all the chunks touched by the range are downloaded, otherwise False
+  """
+  filelist: FileList.FileList = Env.get("FILES")
+  fileinfo = filelist.get(filename)
+  first = start_byte // fileinfo.chunk_size + 1
+  last = min(end_byte // fileinfo.chunk_size + 1, fileinfo.total_chunks)
+  return all(filelist.hasChunk(filename, chunk) for chunk in range(first, last + 1))
+
+
+def cached_chunk(filename: str, start_byte: int, end_byte: int) -> bytes | None:
+  """
+  Function gives the bytes of a downloaded chunk from the cache of the recently served chunks, so that the peers asking for the same chunk at the same time share one read of the disk
+  Args:
+    filename: The name of the file
+    start_byte: The starting byte of the requested range
+    end_byte: The ending byte of the requested range
+  Returns:
+    bytes | None: The bytes of the chunk, None if the cache is disabled or the range is not exactly a downloaded chunk
+  """
+  cache: Cache.ChunkCache = Env.get("CHUNK_CACHE")
+  if cache.max_bytes == 0:
+    return None
+  filelist: FileList.FileList = Env.get("FILES")
+  fileinfo = filelist.get(filename)
+  chunk = start_byte // fileinfo.chunk_size + 1
+  if chunk > fileinfo.total_chunks or fileinfo.chunk_range(chunk) != (start_byte, end_byte):
+    return None
+  if not filelist.hasChunk(filename, chunk):
+    return None
+
+  def load() -> bytes:
+    with open(os.path.join(Env.get("DOWNLOADS"), filename), "rb") as f:
+      f.seek(start_byte)
+      return f.read(end_byte - start_byte + 1)
+
+  return cache.get(filename, start_byte, end_byte, load)
+
+
+def compressed_range(request: HttpRequest, filename: str, start_byte: int, end_byte: int) -> Iterator[bytes] | None:
+  """
+  Function gives the chunks of a range compressed, if the requesting node asks for it (`X-Chunk-Encoding`) and any of the chunks may be worth compressing. Only a range of whole downloaded chunks is compressed, the Content-Range of the response still counts the bytes of the chunks.
+  Args:
+    request: The download request
+    filename: The name of the file
+    start_byte: The starting byte of the requested range
+    end_byte: The ending byte of the requested range
+  Returns:
+    Iterator[bytes] | None: The parts of the zlib stream of the chunks, None if the range is sent as it is
+  """
+  compressor: Compression.Compressor | None = Env.get("COMPRESSOR")
+  if compressor is None or not Compression.accepts(request.headers.get(Compression.HEADER, "")):
+    return None
+  filelist: FileList.FileList = Env.get("FILES")
+  fileinfo = filelist.get(filename)
+  first = start_byte // fileinfo.chunk_size + 1
+  last = end_byte // fileinfo.chunk_size + 1
+  if last > fileinfo.total_chunks or fileinfo.chunk_range(first)[0] != start_byte or fileinfo.chunk_range(last)[1] != end_byte:
+    return None
+  if not all(filelist.hasChunk(filename, chunk) for chunk in range(first, last + 1)):
+    return None
+
+  def read(chunk: int) -> bytes:
+    chunk_start, chunk_end = fileinfo.chunk_range(chunk)
+    if (data := cached_chunk(filename, chunk_start, chunk_end)) is not None:
+      return data
+    with open(os.path.join(Env.get("DOWNLOADS"), filename), "rb") as f:
+      f.seek(chunk_start)
+      return f.read(chunk_end - chunk_start + 1)
+
+  return compressor.encode(filename, fileinfo, first, last, read)
+
+
 @csrf_exempt
 def download(response: HttpRequest):
   """
-  Handle download file requests
+  Handle download file requests, the file is streamed (With sendfile when the server supports it) instead of being read into memory.
+  Supports the Range header with closed, open ended and suffix ranges, and multiple ranges are sent as `multipart/byteranges`.
+  A single range of whole chunks is compressed (`X-Chunk-Encoding: deflate`) when a node asks for it through the same header and the chunks are worth compressing.
   """
   if response.method != "GET":
     return HttpResponseNotAllowed(["GET"])
@@ -173,30 +374,198 @@ def download(response: HttpRequest):
   if not filelist.exist(filename):
     return JsonResponse({"status": False, "reason": "file not found"}, status=404)
 
-  # Reading any Range header (For supporting of resume download)
+  # The file may be listed before its bytes are downloaded, or moved aside while its new version is downloaded
   file_path: str = os.path.join(Env.get("DOWNLOADS"), filename)
-  file_size = os.path.getsize(file_path)
+  try:
+    file_size = os.path.getsize(file_path)
+  except FileNotFoundError:
+    return JsonResponse({"status": False, "reason": "file is not held"}, status=404)
+  disposition = f"attachment; filename=\"{filename}\""
+
+  # Reading any Range header (For supporting of resume download)
+  ranges = None
   if (range_header := response.headers.get("Range")) is not None:
-    start, end = range_header.strip().split("=")[1].split("-")
-    start = int(start)
-    if end.isdigit():
-      end = int(end)
-
-    with open(file_path, "rb") as f:
-      f.seek(start)
-      if isinstance(end, int):
-        length = (end - start) + 1
-        data = f.read(length)
-      else:
-        data = f.read()
-      final_response = HttpResponse(data, status=206)
-      final_response["Content-Type"] = "application/octet-stream"
-      final_response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
-      final_response["Content-Disposition"] = f"attachment; filename=\"{filename}\""
+    try:
+      ranges = Range.parse_range(range_header, file_size)
+    except Range.UnsatisfiableRange:
+      final_response = HttpResponse(status=416)
+      final_response["Content-Range"] = f"bytes */{file_size}"
       return final_response
+
+  # Only the downloaded chunks are sent, the whole file only when all of it is downloaded
+  if ranges is None and not filelist.isDownloaded(filename):
+    return JsonResponse({"status": False, "reason": "file is not downloaded yet"}, status=404)
+  if ranges is not None and not all(held_range(filename, start, end) for start, end in ranges):
+    final_response = HttpResponse(status=416)
+    final_response["Content-Range"] = f"bytes */{file_size}"
+    return final_response
+
+  if ranges is None:
+    final_response = FileResponse(open(file_path, "rb"), status=200)
+    final_response.block_size = Range.BUFFER_SIZE
+    final_response["Content-Length"] = file_size
+  elif len(ranges) == 1 and (data := compressed_range(response, filename, *ranges[0])) is not None:
+    start, end = ranges[0]
+    final_response = StreamingHttpResponse(data, status=206)
+    final_response[Compression.HEADER] = Compression.ENCODING
+    final_response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+  elif len(ranges) == 1 and (data := cached_chunk(filename, *ranges[0])) is not None:
+    start, end = ranges[0]
+    final_response = HttpResponse(data, status=206)
+    final_response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+  elif len(ranges) == 1:
+    start, end = ranges[0]
+    final_response = FileResponse(
+        Range.RangeFile(open(file_path, "rb"), start, end - start + 1), status=206
+    )
+    final_response.block_size = Range.BUFFER_SIZE
+    final_response["Content-Length"] = end - start + 1
+    final_response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
   else:
-    with open(file_path, "rb") as f:
-      final_response = HttpResponse(f.read(), status=200)
-      final_response["Content-Type"] = "application/octet-stream"
-      final_response["Content-Disposition"] = f"attachment; filename=\"{filename}\""
-      return final_response
+    body = Range.MultipartRanges(file_path, ranges, file_size)
+    final_response = StreamingHttpResponse(body, status=206, content_type=body.content_type)
+    final_response["Content-Length"] = len(body)
+    final_response["Content-Disposition"] = disposition
+    final_response["Accept-Ranges"] = "bytes"
+    return final_response
+
+  final_response["Content-Type"] = "application/octet-stream"
+  final_response["Content-Disposition"] = disposition
+  final_response["Accept-Ranges"] = "bytes"
+  final_response["Vary"] = Compression.HEADER
+  return final_response
+
+
+def observe_sender(gossiper: Gossip.Gossip, response: HttpRequest):
+  """
+  Function gives the piggybacked headers of the gossip request to their observers
+  Args:
+    gossiper: The Gossip object
+    response: The gossip request sent by other node
+  """
+  sender_ip = response.headers.get("X-Gossip-Sender")
+  sender_port = response.headers.get("X-Gossip-Port", "")
+  if sender_ip is not None and sender_port.isdigit():
+    gossiper.observe(sender_ip, int(sender_port), response.headers)
+
+
+@csrf_exempt
+def gossip(response: HttpRequest):
+  """
+  Receives a message pushed by other node, the message id, kind, ttl, publish time and the IP Address of the pushing node are given in the `X-Gossip-*` headers, and the payload is the request body
+  """
+  if response.method != "POST":
+    return HttpResponseNotAllowed(["POST"])
+
+  try:
+    msg = Gossip.Message(
+        response.headers["X-Gossip-Id"],
+        response.headers["X-Gossip-Kind"],
+        response.body,
+        int(response.headers["X-Gossip-Ttl"]),
+        float(response.headers["X-Gossip-Time"]),
+    )
+  except (KeyError, ValueError):
+    return JsonResponse({"status": False, "reason": "invalid gossip headers"}, status=400)
+
+  gossiper: Gossip.Gossip = Env.get("GOSSIP")
+  observe_sender(gossiper, response)
+  new = gossiper.receive(msg, response.headers.get("X-Gossip-Sender"))
+  return JsonResponse({"status": True, "new": new}, headers=gossiper.piggyback_headers())
+
+
+@csrf_exempt
+def gossip_digest(response: HttpRequest):
+  """
+  Push-pull exchange of the gossip messages, the request body is the digest of the other node:
+  {
+    "ids": [<message_id>, ...]
+  }
+  The response contains the messages which the other node is missing, and the ids which the current node wants:
+  {
+    "messages": [<message>, ...],
+    "wants": [<message_id>, ...]
+  }
+  """
+  if response.method != "POST":
+    return HttpResponseNotAllowed(["POST"])
+
+  try:
+    ids = json.loads(response.body)["ids"]
+  except (ValueError, KeyError, TypeError):
+    return JsonResponse({"status": False, "reason": "invalid digest"}, status=400)
+
+  gossiper: Gossip.Gossip = Env.get("GOSSIP")
+  observe_sender(gossiper, response)
+  messages, wants = gossiper.exchange(ids)
+  return JsonResponse(
+      {"messages": [m.to_dict() for m in messages], "wants": wants},
+      headers=gossiper.piggyback_headers(),
+  )
+
+
+@csrf_exempt
+def gossip_stats(response: HttpRequest):
+  """
+  Returns the counters of the gossip, including the redundancy ratio and the delays of the messages
+  """
+  gossiper: Gossip.Gossip = Env.get("GOSSIP")
+  return JsonResponse(gossiper.stats())
+
+
+@csrf_exempt
+def cache_stats(response: HttpRequest):
+  """
+  Returns the counters of the cache of the recently served chunks, including the hit rate and the evictions
+  """
+  cache: Cache.ChunkCache = Env.get("CHUNK_CACHE")
+  return JsonResponse(cache.stats())
+
+
+@csrf_exempt
+def chunk_store_stats(response: HttpRequest):
+  """
+  Returns the counters of the chunk store, the distinct chunks held, the chunks copied from other files instead of downloaded, and the files linked to an identical file
+  """
+  store: ChunkStore.ChunkStore | None = Env.get("CHUNK_STORE")
+  if store is None:
+    return JsonResponse({"status": False, "reason": "chunk store is disabled"}, status=404)
+  return JsonResponse(store.stats())
+
+
+@csrf_exempt
+def compression_stats(response: HttpRequest):
+  """
+  Returns the counters of the compression of the sent chunks, the chunks compressed and skipped by the probe, and the ratio of the bytes sent to the bytes of the chunks
+  """
+  compressor: Compression.Compressor | None = Env.get("COMPRESSOR")
+  if compressor is None:
+    return JsonResponse({"status": False, "reason": "compression is disabled"}, status=404)
+  return JsonResponse(compressor.stats())
+
+
+@csrf_exempt
+def manifest(response: HttpRequest):
+  """
+  Gives the hashes of the chunks of a file, the hashes of the chunks which the current node doesn't know are null
+  The json response would look like this (The weak rolling checksums are only known for the uploaded files):
+  {
+    "status": true,
+    "total_chunks": 2,
+    "hashes": [<sha1_of_the_first_chunk>, null],
+    "checksums": [<checksum_of_the_first_chunk>, <checksum_of_the_second_chunk>]
+  }
+  """
+  if response.method != "GET":
+    return HttpResponseNotAllowed(["GET"])
+
+  if (filename := response.GET.get("file")) is None:
+    return JsonResponse(
+        {"status": False, "reason": "provide a file parameter"}, status=400
+    )
+
+  manifests: Manifest.ManifestStore = Env.get("MANIFESTS")
+  if (file_manifest := manifests.get(filename)) is None:
+    return JsonResponse({"status": False, "reason": "manifest not found"}, status=404)
+
+  return JsonResponse({"status": True, **file_manifest.to_dict()})